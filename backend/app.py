@@ -1,6 +1,15 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, redirect, request, stream_with_context, url_for
+import atexit
+import base64
+import bisect
+import gzip
+import hashlib
+import heapq
 import json
 import random
+import socket
+import sqlite3
+import threading
 import urllib.request
 import urllib.error
 import urllib.parse
@@ -15,9 +24,20 @@ import time
 from dotenv import load_dotenv
 import jwt
 from sqlalchemy.pool import NullPool
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import IntegrityError
 from werkzeug.security import generate_password_hash, check_password_hash
-from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # 未安装时仅提供 gzip
+    brotli = None
+
+try:
+    from markdown_it import MarkdownIt
+except ImportError:  # 未安装时 render=html 不可用，仍返回原始 markdown
+    MarkdownIt = None
 
 # 加载环境变量
 load_dotenv()
@@ -102,7 +122,26 @@ try:
     from security import security
 except ImportError:
     from backend.security import security
-security.init_app(app)
+try:
+    from related import RelatedPostsModel
+except ImportError:
+    from backend.related import RelatedPostsModel
+try:
+    from hll import HyperLogLog
+except ImportError:
+    from backend.hll import HyperLogLog
+try:
+    from background import BoundedExecutor, exit_on_sigterm
+except ImportError:
+    from backend.background import BoundedExecutor, exit_on_sigterm
+try:
+    from counters import create_counter_store
+except ImportError:
+    from backend.counters import create_counter_store
+
+# 限流计数的存储后端（COUNTER_BACKEND=memory|sqlite|redis），多 worker 部署时共享
+counter_store = create_counter_store()
+security.init_app(app, store=counter_store)
 
 cors_origins_env = os.getenv('CORS_ORIGINS', '')
 cors_origins_from_env = [o.strip() for o in str(cors_origins_env).split(',') if o.strip()]
@@ -178,24 +217,276 @@ def uses_sqlalchemy_queries() -> bool:
     return not uses_direct_sqlite_queries()
 
 
+# ============== 直连 SQLite 读连接 ==============
+# 每个 worker 线程复用一条只读连接：省去每次请求的 open/close 与 schema 解析，
+# 并借助 sqlite3 自带的语句缓存（cached_statements）复用已编译的 SQL
+_sqlite_local = threading.local()
+
+_SQLITE_READ_PRAGMAS = (
+    'PRAGMA busy_timeout = 5000',
+    'PRAGMA mmap_size = 268435456',
+    'PRAGMA cache_size = -16000',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA query_only = ON',
+)
+
+
+_sqlite_path_cache = {}
+
+
+def _sqlite_db_path() -> str:
+    """与 SQLALCHEMY_DATABASE_URI 指向同一个库文件（含 Vercel 的 /tmp 路径），按 URI 缓存解析结果"""
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+    path = _sqlite_path_cache.get(uri)
+    if path is None:
+        try:
+            # Flask-SQLAlchemy 会把相对路径改写到 instance 目录，以引擎实际使用的路径为准
+            with app.app_context():
+                path = db.engine.url.database
+        except Exception:
+            path = None
+        path = path or uri.split(':///', 1)[-1].split('?', 1)[0]
+        _sqlite_path_cache[uri] = path
+    return path
+
+
+def _get_read_connection():
+    """返回当前线程的只读连接；库路径变化或 fork 出新进程后重新打开"""
+    key = (_sqlite_db_path(), os.getpid())
+    conn = getattr(_sqlite_local, 'conn', None)
+    if conn is not None and getattr(_sqlite_local, 'key', None) == key:
+        return conn
+    if conn is not None and _sqlite_local.key[1] == key[1]:
+        try:
+            conn.close()
+        except Exception:
+            pass
+    conn = sqlite3.connect(key[0], timeout=20, cached_statements=256)
+    # WAL 由 ensure_sqlite_wal() 在启动时设置一次，读连接只设连接级参数
+    for pragma in _SQLITE_READ_PRAGMAS:
+        conn.execute(pragma)
+    _sqlite_local.conn = conn
+    _sqlite_local.key = key
+    return conn
+
+
 def _iso_or_none(value):
     return value.isoformat() if value else None
 
 
-# 浏览量异步写库线程池（单例，模块级创建）
-_view_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='view-counter')
+class ViewCounterBuffer:
+    """浏览量写回缓冲：按文章 id 在内存中累加，定时（interval 秒）或累计到 threshold 次时
+    合并成一次批量 UPDATE posts SET views = views + ?，避免每次阅读一个写事务争抢 SQLite 写锁。
+    带 reader（_hash_ip 结果）时同时记入该文章的 HyperLogLog 草图，flush 时与库里的草图合并写回。
+    缓冲最多容纳 max_posts 篇不同文章，超出的新文章 id 直接丢弃并计数，内存有上界。
+    进程退出（atexit / SIGTERM）时做最后一次 flush。"""
+
+    def __init__(self, interval=5.0, threshold=200, max_posts=10000):
+        self._interval = interval
+        self._threshold = threshold
+        self._max_posts = max_posts
+        self._stats = {'flushes': 0, 'failed_flushes': 0, 'flushed_views': 0, 'dropped_views': 0,
+                       'last_flush_ms': 0.0, 'max_flush_ms': 0.0}
+        self._pending = {}
+        self._pending_total = 0
+        self._sketches = {}  # post_id -> 自上次 flush 以来的读者草图
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def add(self, post_id, count=1, reader=None) -> bool:
+        with self._lock:
+            if post_id not in self._pending and len(self._pending) >= self._max_posts:
+                self._stats['dropped_views'] += count
+                return False
+            self._pending[post_id] = self._pending.get(post_id, 0) + count
+            self._pending_total += count
+            if reader:
+                self._sketches.setdefault(post_id, HyperLogLog()).add(reader)
+            reached = self._pending_total >= self._threshold
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='view-counter', daemon=True)
+                self._thread.start()
+        if reached:
+            self._wakeup.set()
+        return True
+
+    def pending(self) -> dict:
+        with self._lock:
+            return dict(self._pending)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, pending_posts=len(self._pending), pending_views=self._pending_total)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self._interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _requeue(self, pending, sketches=None):
+        with self._lock:
+            for post_id, count in pending.items():
+                self._pending[post_id] = self._pending.get(post_id, 0) + count
+                self._pending_total += count
+            for post_id, sketch in (sketches or {}).items():
+                current = self._sketches.get(post_id)
+                if current is None:
+                    self._sketches[post_id] = sketch
+                else:
+                    current.merge(sketch)
+
+    @staticmethod
+    def _write_sketches(sketches, post_ids):
+        """把本轮草图与库里已持久化的草图按寄存器取最大值合并，并刷新 unique_readers 估计值。
+        已有的草图行先 SELECT ... FOR UPDATE 加锁再读改写，多个 worker 并发 flush 时不会丢掉对方的寄存器
+        （SQLite 上前面的 UPDATE 已持有库级写锁）；两个进程同时插入同一篇新文章的草图时，
+        后插入的一方回滚保存点，改为加锁合并"""
+        now = datetime.now(timezone.utc)
+
+        def locked_rows(ids):
+            query = PostReaderSketch.query.filter(PostReaderSketch.post_id.in_(ids)).with_for_update()
+            return {row.post_id: row for row in query}
+
+        def merge_into(row, sketch):
+            sketch.merge(HyperLogLog.from_bytes(row.registers))
+            row.registers = sketch.to_bytes()
+            row.unique_readers = sketch.count()
+            row.updated_at = now
+
+        post_ids = [post_id for post_id in post_ids if post_id in sketches]
+        existing = locked_rows(post_ids)
+        raced = []
+        for post_id in post_ids:
+            sketch = sketches[post_id]
+            row = existing.get(post_id)
+            if row is not None:
+                merge_into(row, sketch)
+                continue
+            try:
+                with db.session.begin_nested():
+                    db.session.add(PostReaderSketch(post_id=post_id, registers=sketch.to_bytes(),
+                                                    unique_readers=sketch.count(), updated_at=now))
+            except IntegrityError:
+                raced.append(post_id)
+        if raced:
+            for post_id, row in locked_rows(raced).items():
+                merge_into(row, sketches[post_id])
+
+    def flush(self) -> int:
+        """把缓冲的增量一次写库并提交，返回写入的阅读次数；失败时增量放回缓冲，下次重试"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending, self._pending_total = self._pending, {}, 0
+                sketches, self._sketches = self._sketches, {}
+            if not pending:
+                return 0
+            started = time.monotonic()
+            try:
+                with app.app_context():
+                    table = Post.__table__
+                    db.session.execute(
+                        table.update()
+                        .where(table.c.id == bindparam('post_id'))
+                        .values(views=db.func.coalesce(table.c.views, 0) + bindparam('delta')),
+                        [{'post_id': post_id, 'delta': count} for post_id, count in pending.items()]
+                    )
+                    # 已删除的文章不再写草图与小时桶
+                    post_ids = [post_id for (post_id,) in
+                                db.session.query(Post.id).filter(Post.id.in_(list(pending)))]
+                    if sketches:
+                        # 草图是本轮增量，合并前复制一份，失败时原样放回缓冲
+                        self._write_sketches({post_id: HyperLogLog(s.precision, s.registers)
+                                              for post_id, s in sketches.items()}, post_ids)
+                    # 浏览量不计入内容版本：每次写回都换 ETag 会让条件请求与快照增量构建失效
+                    _bump_engagement({post_id: (pending[post_id], 0) for post_id in post_ids})
+                    db.session.commit()
+                    rows = (db.session.query(Post.id, Post.views)
+                            .filter(Post.id.in_(list(pending))).all())
+            except Exception as e:
+                app.logger.error(f"View counter flush failed ({len(pending)} posts), will retry: {e}")
+                self._requeue(pending, sketches)
+                with self._lock:
+                    self._stats['failed_flushes'] += 1
+                return 0
+            for post_id, views in rows:
+                post_summary_index.update_counters(post_id, views=views or 0)
+            elapsed_ms = round((time.monotonic() - started) * 1000, 2)
+            with self._lock:
+                stats = self._stats
+                stats['flushes'] += 1
+                stats['flushed_views'] += sum(pending.values())
+                stats['last_flush_ms'] = elapsed_ms
+                stats['max_flush_ms'] = max(stats['max_flush_ms'], elapsed_ms)
+            _ensure_trending_job()
+            return sum(pending.values())
+
+
+view_counter = ViewCounterBuffer(
+    interval=float(os.getenv('VIEW_FLUSH_INTERVAL', '5')),
+    threshold=int(os.getenv('VIEW_FLUSH_THRESHOLD', '200')),
+    max_posts=int(os.getenv('VIEW_BUFFER_MAX_POSTS', '10000')),
+)
 
 
-def _async_increment_view(post_id):
-    """后台线程：增加文章浏览量，独立 app context 避免跨线程问题"""
-    try:
-        with app.app_context():
-            p = Post.query.get(post_id)
-            if p is not None:
-                p.views = (p.views or 0) + 1
-                db.session.commit()
-    except Exception as e:
-        app.logger.error(f"Async view increment failed for post {post_id}: {e}")
+def _load_unique_readers(post_ids) -> dict:
+    """{post_id: 独立读者估计值}，一次主键 IN 查询；尚无草图的文章不出现在结果里"""
+    post_ids = list(post_ids)
+    if not post_ids:
+        return {}
+    if uses_sqlalchemy_queries():
+        rows = (PostReaderSketch.query
+                .with_entities(PostReaderSketch.post_id, PostReaderSketch.unique_readers)
+                .filter(PostReaderSketch.post_id.in_(post_ids))
+                .all())
+    else:
+        cursor = _get_read_connection().cursor()
+        try:
+            placeholders = ','.join('?' for _ in post_ids)
+            cursor.execute(
+                f"SELECT post_id, unique_readers FROM post_reader_sketches WHERE post_id IN ({placeholders})",
+                post_ids
+            )
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+    return {post_id: unique_readers or 0 for post_id, unique_readers in rows}
+
+
+def _engagement_hour(now=None) -> datetime:
+    """当前小时桶的起点（UTC，不带时区，与其他 DateTime 列的存储方式一致）"""
+    now = now or datetime.now(timezone.utc)
+    return now.astimezone(timezone.utc).replace(tzinfo=None, minute=0, second=0, microsecond=0)
+
+
+def _bump_engagement(deltas: dict, span='hour', bucket=None):
+    """在当前事务内把 {post_id: (views, likes)} 累加进时间桶（默认当前小时），不存在的桶先插入"""
+    table = PostEngagement.__table__
+    bucket = bucket or _engagement_hour()
+    for post_id, (views, likes) in deltas.items():
+        if not views and not likes:
+            continue
+        match = (table.c.post_id == post_id, table.c.span == span, table.c.bucket == bucket)
+        increment = table.update().where(*match).values(
+            views=table.c.views + views, likes=table.c.likes + likes)
+        if db.session.execute(increment).rowcount:
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert().values(
+                    post_id=post_id, span=span, bucket=bucket, views=views, likes=likes))
+        except IntegrityError:
+            # 其他进程刚插入了同一个桶
+            db.session.execute(increment)
+
+
+def _attach_unique_readers(items: list) -> list:
+    readers = _load_unique_readers(item['id'] for item in items)
+    for item in items:
+        item['unique_readers'] = readers.get(item['id'], 0)
+    return items
 
 
 # 列表接口字段顺序（与 with_entities / 原生 SQL SELECT 一致）
@@ -253,6 +544,69 @@ def _build_post_summary_item(row):
     }
 
 
+# 可投影字段（fields= 参数），顺序即默认输出顺序
+_POST_PROJECTABLE_FIELDS = (
+    'id', 'title', 'slug', 'content', 'excerpt', 'status', 'cover_url', 'category', 'tags',
+    'read_time', 'views', 'likes', 'published_at', 'created_at', 'updated_at'
+)
+
+
+def _parse_fields(raw, allowed):
+    """解析 fields=a,b,c（稀疏字段集）；未传时返回 None，id 始终返回。含未知字段时抛 ValueError"""
+    fields = [f.strip() for f in (raw or '').split(',') if f.strip()]
+    if not fields:
+        return None
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise ValueError(', '.join(unknown))
+    return tuple(dict.fromkeys(['id'] + fields))
+
+
+def _parse_post_fields(raw, default):
+    return _parse_fields(raw, _POST_PROJECTABLE_FIELDS) or tuple(default)
+
+
+class _ProjectedRow:
+    """with_entities 结果的属性视图：未查询的列读作 None，便于复用各 *_to_dict"""
+
+    def __init__(self, row):
+        self._values = dict(row._mapping)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return self._values.get(name)
+
+
+def _query_projected(query, model, fields, to_dict, columns=None) -> list:
+    """fields 为空时返回完整字典；否则只 SELECT 需要的列再交给 to_dict 转换并裁剪。
+    columns 为 fields 中对应真实列的部分（派生字段由调用方另行计算）"""
+    if not fields:
+        return [to_dict(obj) for obj in query.all()]
+    columns = fields if columns is None else columns
+    rows = query.with_entities(*[getattr(model, f) for f in columns]).all()
+    return [{k: v for k, v in to_dict(_ProjectedRow(row)).items() if k in fields} for row in rows]
+
+
+def _project_post_row(row, fields) -> dict:
+    """按 fields 顺序的元组/Row 转为字典；tags 兼容 JSON 字符串，时间字段统一为字符串"""
+    item = {}
+    for field, value in zip(fields, row):
+        if field == 'tags':
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except Exception:
+                    value = []
+            value = value if isinstance(value, list) else []
+        elif field in ('views', 'likes'):
+            value = value or 0
+        elif field in ('published_at', 'created_at', 'updated_at') and value is not None and not isinstance(value, str):
+            value = value.isoformat()
+        item[field] = value
+    return item
+
+
 def _serialize_post_summary(post):
     return {
         'id': post.id,
@@ -336,6 +690,120 @@ class Post(db.Model):
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
 
+    __table_args__ = (
+        # 前台列表与键集分页：status = 'published' ORDER BY published_at DESC, id DESC
+        db.Index('ix_posts_status_published_at_id', 'status', 'published_at', 'id'),
+        # 永久链接：slug 唯一（NULL 不受约束），同时服务批量解析与 by-slug 查询
+        db.Index('uq_posts_slug', 'slug', unique=True),
+    )
+
+
+class PostTag(db.Model):
+    """文章-标签关系，由 posts.tags 派生，标签筛选走 (tag, post_id) 索引"""
+    __tablename__ = 'post_tags'
+
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'), primary_key=True)
+    tag = db.Column(db.String(100), primary_key=True)
+
+    __table_args__ = (
+        db.Index('ix_post_tags_tag_post', 'tag', 'post_id'),
+    )
+
+
+class PostSlugHistory(db.Model):
+    """文章改名前用过的 slug，旧链接据此 301 到当前地址"""
+    __tablename__ = 'post_slug_history'
+
+    slug = db.Column(db.String(220), primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class PostRelated(db.Model):
+    """预计算的相关文章 top-k，(post_id, rank) 主键范围读取"""
+    __tablename__ = 'post_related'
+
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    related_id = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)
+
+
+class PostRender(db.Model):
+    """文章 markdown 渲染结果的持久缓存，render_key 对应 (正文哈希, 渲染器版本)"""
+    __tablename__ = 'post_renders'
+
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'), primary_key=True)
+    render_key = db.Column(db.String(64), nullable=False)
+    html = db.Column(db.Text, nullable=False, default='')
+    toc = db.Column(db.JSON)  # [{'level', 'text', 'id'}]
+
+
+class PostReaderSketch(db.Model):
+    """文章独立读者的 HyperLogLog 草图（见 hll.py），由浏览量缓冲定期合并写回；unique_readers 为最近一次估计值"""
+    __tablename__ = 'post_reader_sketches'
+
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'), primary_key=True)
+    registers = db.Column(db.LargeBinary, nullable=False)
+    unique_readers = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class PostEngagement(db.Model):
+    """文章互动的时间分桶：span='hour' 为小时桶，超过保留期后由热门榜任务按天合并为 span='day'"""
+    __tablename__ = 'post_engagement'
+
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'), primary_key=True)
+    span = db.Column(db.String(8), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)  # 桶起点（UTC）
+    views = db.Column(db.Integer, nullable=False, default=0)
+    likes = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_post_engagement_span_bucket', 'span', 'bucket'),
+    )
+
+
+class PostTrending(db.Model):
+    """后台任务预计算的热门文章，(period, rank) 主键范围读取"""
+    __tablename__ = 'post_trending'
+
+    period = db.Column(db.String(8), primary_key=True)  # 24h / 7d
+    rank = db.Column(db.Integer, primary_key=True)
+    post_id = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)
+
+
+class JobLease(db.Model):
+    """多 worker 部署时后台定时任务的租约：持有者在到期前续期，其他进程只在租约过期后接手"""
+    __tablename__ = 'job_leases'
+
+    name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(120), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
+class TaxonomyCount(db.Model):
+    """已发布文章的分类/标签计数，随发布、撤回、改分类、改标签、删除在同一事务内增量维护"""
+    __tablename__ = 'taxonomy_counts'
+
+    kind = db.Column(db.String(20), primary_key=True)  # category | tag
+    name = db.Column(db.String(100), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_taxonomy_counts_kind_count', 'kind', 'count'),
+    )
+
+
+class ContentVersion(db.Model):
+    """公开资源的内容版本号：后台写入在同一事务内 +1，用于生成 ETag / Last-Modified"""
+    __tablename__ = 'content_versions'
+
+    resource = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
 
 class Like(db.Model):
     __tablename__ = 'likes'
@@ -364,6 +832,19 @@ class GuestMessage(db.Model):
     is_approved = db.Column(db.Boolean, default=False, index=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
 
+    __table_args__ = (
+        # 按审核状态的 (created_at, id) 键集分页
+        db.Index('ix_guest_messages_approved_created_id', 'is_approved', 'created_at', 'id'),
+    )
+
+
+class GuestbookCount(db.Model):
+    """留言按审核状态（approved / pending）的条数，随创建、审核、删除在同一事务内增量维护"""
+    __tablename__ = 'guestbook_counts'
+
+    status = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
 
 class Album(db.Model):
     """相册"""
@@ -476,7 +957,10 @@ def jwt_required_admin(fn):
     return wrapper
 
 
-def _slugify(title: str) -> str:
+_SLUG_ALLOCATE_ATTEMPTS = 5
+
+
+def _slug_base(title: str) -> str:
     # 仅保留 ASCII 字母/数字（剥离 CJK / 全角字符），其他字符替换为 '-'
     base = ''.join(ch if (ch.isascii() and ch.isalnum()) else '-' for ch in (title or '').strip())
     while '--' in base:
@@ -489,10 +973,18 @@ def _slugify(title: str) -> str:
     # 截断到 100 字符（DB 字段 220，保留余量）
     if len(base) > 100:
         base = base[:100].rstrip('-') or 'post'
-    # 保证唯一
+    return base
+
+
+def _next_free_slug(base: str, taken=()) -> str:
+    """一次前缀查询取出 base 与 base-N 的已占用 slug，返回最小的空闲候选"""
+    rows = (db.session.query(Post.slug)
+            .filter(db.or_(Post.slug == base, Post.slug.like(f'{base}-%')))
+            .all())
+    used = {row[0] for row in rows} | set(taken)
     candidate = base
     i = 1
-    while Post.query.filter_by(slug=candidate).first() is not None:
+    while candidate in used:
         i += 1
         suffix = f'-{i}'
         # 拼上后缀再截断，确保总长不超 220
@@ -500,6 +992,38 @@ def _slugify(title: str) -> str:
     return candidate
 
 
+def _slugify(title: str) -> str:
+    return _next_free_slug(_slug_base(title))
+
+
+def _assign_post_slug(p, title: str):
+    """按标题分配唯一 slug。标题对应的 slug 未变时保留原值；并发写入撞上唯一索引时在保存点内换候选重试。
+    旧 slug 记入 post_slug_history，供旧链接 301"""
+    base = _slug_base(title)
+    if p.slug and re.fullmatch(re.escape(base) + r'(-\d+)?', p.slug):
+        return
+    old_slug = p.slug
+    # 其他字段先落库，保存点回滚时只撤销 slug
+    db.session.add(p)
+    db.session.flush()
+    tried = set()
+    for _ in range(_SLUG_ALLOCATE_ATTEMPTS):
+        candidate = _next_free_slug(base, tried)
+        tried.add(candidate)
+        try:
+            with db.session.begin_nested():
+                p.slug = candidate
+                db.session.flush()
+        except IntegrityError:
+            continue
+        history = PostSlugHistory.__table__
+        db.session.execute(history.delete().where(history.c.slug == candidate))
+        if old_slug:
+            db.session.merge(PostSlugHistory(slug=old_slug, post_id=p.id))
+        return
+    raise ValueError(f'无法为 "{title}" 分配唯一 slug')
+
+
 def _djb2(s: str) -> int:
     """32-bit djb2 哈希，与前端 slugify 保持一致，用于非 ASCII 标题的稳定后缀"""
     h = 5381
@@ -508,6 +1032,253 @@ def _djb2(s: str) -> int:
     return h
 
 
+# ============== 内容版本与条件请求 ==============
+# 部署新代码后响应结构可能变化，默认以 app.py 的修改时间参与 ETag 计算
+_ETAG_SALT = os.getenv('ETAG_SALT') or str(int(os.path.getmtime(__file__)))
+
+
+def _touch_content(*resources):
+    """后台写入在 commit 前调用：对应资源版本号 +1，随事务一起提交或回滚"""
+    table = ContentVersion.__table__
+    now = datetime.now(timezone.utc)
+    for resource in resources:
+        updated = db.session.execute(
+            table.update()
+            .where(table.c.resource == resource)
+            .values(version=table.c.version + 1, updated_at=now)
+        )
+        if updated.rowcount == 0:
+            db.session.execute(table.insert().values(resource=resource, version=1, updated_at=now))
+
+
+def _parse_db_datetime(value):
+    """直连 SQLite 读出的 DateTime 是字符串；统一转为带 UTC 时区的 datetime"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _content_versions(resources) -> dict:
+    """一次主键读取多个资源的 {resource: (version, updated_at)}，未写入过的资源为 (0, None)"""
+    resources = list(resources)
+    if uses_sqlalchemy_queries():
+        rows = (ContentVersion.query
+                .with_entities(ContentVersion.resource, ContentVersion.version, ContentVersion.updated_at)
+                .filter(ContentVersion.resource.in_(resources))
+                .all())
+    else:
+        cursor = _get_read_connection().cursor()
+        try:
+            placeholders = ','.join('?' for _ in resources)
+            cursor.execute(
+                f"SELECT resource, version, updated_at FROM content_versions WHERE resource IN ({placeholders})",
+                resources
+            )
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+    found = {resource: (int(version or 0), _parse_db_datetime(updated_at)) for resource, version, updated_at in rows}
+    return {resource: found.get(resource, (0, None)) for resource in resources}
+
+
+def conditional_get(*resources, daily=False, precompress=False, cache_control=None, per_host=False):
+    """公开 GET 接口的条件请求装饰器：
+
+    由资源版本号 + 请求路径与参数算出强 ETag，If-None-Match 命中时在查询与序列化之前直接 304；
+    daily=True 的“每日精选”类接口把 UTC 日期也计入 ETag。
+    precompress=True 时压缩后的字节按 ETag 缓存（见 compress_response）。
+    cache_control 同时用于 200 与 304，保证重新校验后缓存策略不变；未指定时为 no-cache。
+    per_host=True 的接口（正文里的绝对链接取自请求 Host）把 Host 也计入 ETag，不同域名互不命中。
+    """
+    from functools import wraps
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                versions = _content_versions(resources)
+            except Exception as e:
+                app.logger.warning(f"Content versions unavailable, skipping ETag: {e}")
+                return fn(*args, **kwargs)
+            g.content_versions = {resource: v[0] for resource, v in versions.items()}
+            g.precompress = precompress
+
+            key = [_ETAG_SALT, request.path, sorted(request.args.items(multi=True)),
+                   sorted(g.content_versions.items())]
+            if daily:
+                key.append(datetime.now(timezone.utc).date().isoformat())
+            if per_host:
+                key.append(request.host)
+            etag = hashlib.sha1(json.dumps(key, ensure_ascii=False).encode('utf-8')).hexdigest()[:24]
+            stamps = [v[1] for v in versions.values() if v[1] is not None]
+            last_modified = max(stamps).replace(microsecond=0) if stamps and not daily else None
+
+            # 压缩后的表示带 -gzip / -br 后缀，同样视为命中
+            matched = None
+            if request.if_none_match:
+                matched = next((tag for tag in (etag, f'{etag}-gzip', f'{etag}-br')
+                                if request.if_none_match.contains(tag)), None)
+                not_modified = matched is not None
+            else:
+                not_modified = (last_modified is not None and request.if_modified_since is not None
+                                and last_modified <= request.if_modified_since)
+
+            if not_modified:
+                response = app.response_class(status=304)
+                response.vary.add('Accept-Encoding')
+                response.set_etag(matched or etag)
+            else:
+                response = app.make_response(fn(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # 未声明缓存策略的接口要求客户端每次带 ETag 回源校验
+            response.headers.setdefault('Cache-Control', cache_control or 'no-cache')
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+_COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+_COMPRESSIBLE_MIMETYPES = {'application/json', 'application/xml', 'application/javascript', 'image/svg+xml'}
+_COMPRESSED_CACHE_SIZE = int(os.getenv('COMPRESSED_CACHE_SIZE', '256'))
+_compressed_cache = OrderedDict()
+_compressed_cache_lock = threading.Lock()
+
+
+def _negotiate_encoding():
+    """按 Accept-Encoding 的 q 值选择 br / gzip，同分优先 br；都不接受时返回 None"""
+    candidates = (['br'] if brotli is not None else []) + ['gzip']
+    best, best_q = None, 0
+    for encoding in candidates:
+        quality = request.accept_encodings[encoding]
+        if quality > best_q:
+            best, best_q = encoding, quality
+    return best
+
+
+def _compress_payload(data: bytes, encoding: str, cached: bool) -> bytes:
+    """会被缓存的负载用最高压缩率，其余用较快的级别"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if cached else 5)
+    return gzip.compress(data, compresslevel=9 if cached else 6)
+
+
+@app.after_request
+def compress_response(response):
+    """按 Accept-Encoding 压缩文本类响应；precompress 接口的压缩结果以 (ETag, 编码, Host) 为键做 LRU 缓存，
+    内容版本不变时热门文章不会被重复压缩。未设置 SITE_URL 时 sitemap 的链接随 Host 变化，键里要带上 Host"""
+    if (request.method == 'HEAD' or response.status_code != 200 or response.direct_passthrough
+            or response.is_streamed or 'Content-Encoding' in response.headers):
+        return response
+    if response.mimetype not in _COMPRESSIBLE_MIMETYPES and not response.mimetype.startswith('text/'):
+        return response
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < _COMPRESS_MIN_SIZE:
+        return response
+    encoding = _negotiate_encoding()
+    if encoding is None:
+        return response
+
+    etag, weak = response.get_etag()
+    cache_key = (etag, encoding, request.host) if (etag and not weak and g.get('precompress')) else None
+    body = None
+    if cache_key is not None:
+        with _compressed_cache_lock:
+            body = _compressed_cache.get(cache_key)
+            if body is not None:
+                _compressed_cache.move_to_end(cache_key)
+    if body is None:
+        body = _compress_payload(data, encoding, cached=cache_key is not None)
+        if cache_key is not None:
+            with _compressed_cache_lock:
+                _compressed_cache[cache_key] = body
+                while len(_compressed_cache) > _COMPRESSED_CACHE_SIZE:
+                    _compressed_cache.popitem(last=False)
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak)
+    return response
+
+
+def _admin_post_item(row, query=None) -> dict:
+    """后台列表条目；row 为 (id, title, slug, status, category, tags, updated_at, excerpt, content)"""
+    pid, title, slug, status, category, tags, updated_at, excerpt, content = row
+    if isinstance(tags, str):
+        try:
+            tags = json.loads(tags)
+        except Exception:
+            tags = []
+    if isinstance(updated_at, str):
+        try:
+            updated_at = datetime.fromisoformat(updated_at)
+        except ValueError:
+            updated_at = None
+    item = {
+        'id': pid,
+        'title': title,
+        'slug': slug,
+        'status': status,
+        'category': category,
+        'tags': tags or [],
+        'updated_at': updated_at.isoformat() if updated_at else None,
+    }
+    if query:
+        item['snippet'] = _search_snippet(query, content, excerpt, title)
+    return item
+
+
+def _admin_search_posts(query, match_expr, page, per_page, status=None, category=None) -> dict:
+    """后台检索走 posts_fts（覆盖草稿与已发布），按 bm25 排序，只为当前页读取正文生成摘要"""
+    where_conditions = ["posts_fts MATCH ?"]
+    params = [match_expr]
+    if status:
+        where_conditions.append("posts.status = ?")
+        params.append(status)
+    if category:
+        where_conditions.append("posts.category = ?")
+        params.append(category)
+    where_clause = " AND ".join(where_conditions)
+    from_clause = "posts_fts JOIN posts ON posts.id = posts_fts.rowid"
+
+    page = max(1, page)
+    cursor = _get_read_connection().cursor()
+    try:
+        cursor.execute(f"SELECT COUNT(*) FROM {from_clause} WHERE {where_clause}", params)
+        total = cursor.fetchone()[0]
+        cursor.execute(f"""
+            SELECT posts.id, posts.title, posts.slug, posts.status, posts.category, posts.tags,
+                   posts.updated_at, posts.excerpt, posts.content
+            FROM {from_clause}
+            WHERE {where_clause}
+            ORDER BY {_SEARCH_BM25_ORDER}, posts.updated_at DESC
+            LIMIT ? OFFSET ?
+        """, params + [per_page, (page - 1) * per_page])
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    return {
+        'items': [_admin_post_item(row, query) for row in rows],
+        'total': total,
+        'page': page,
+        'pages': (total + per_page - 1) // per_page if per_page else 0
+    }
+
+
 # 管理文章列表
 @app.route('/api/admin/posts', methods=['GET'])
 @jwt_required_admin
@@ -518,8 +1289,15 @@ def admin_list_posts():
     status = request.args.get('status')
     category = request.args.get('category')
 
+    match_expr = _build_search_match(q) if (q and _search_index_enabled()) else None
+    if match_expr:
+        result = _admin_search_posts(q, match_expr, page, per_page, status, category)
+        _attach_unique_readers(result['items'])
+        return jsonify({'success': True, 'data': result})
+
     query = Post.query
     if q:
+        # 非 SQLite 部署没有 posts_fts，仍按 LIKE 过滤
         like = f"%{q}%"
         query = query.filter(db.or_(Post.title.ilike(like), Post.excerpt.ilike(like), Post.content.ilike(like)))
     if status:
@@ -527,24 +1305,17 @@ def admin_list_posts():
     if category:
         query = query.filter_by(category=category)
 
-    # 用 with_entities 限制查询字段，减少数据传输
-    query = query.with_entities(
-        Post.id, Post.title, Post.slug, Post.status,
-        Post.category, Post.tags, Post.updated_at
-    )
+    # 用 with_entities 限制查询字段，减少数据传输；正文只在需要生成摘要时读取
+    columns = [Post.id, Post.title, Post.slug, Post.status, Post.category, Post.tags, Post.updated_at]
+    if q:
+        columns += [Post.excerpt, Post.content]
+    query = query.with_entities(*columns)
     posts = query.order_by(Post.updated_at.desc()).paginate(page=page, per_page=per_page, error_out=False)
     return jsonify({
         'success': True,
         'data': {
-            'items': [{
-                'id': pid,
-                'title': title,
-                'slug': slug,
-                'status': status,
-                'category': category,
-                'tags': tags or [],
-                'updated_at': updated_at.isoformat() if updated_at else None,
-            } for (pid, title, slug, status, category, tags, updated_at) in posts.items],
+            'items': _attach_unique_readers([_admin_post_item(tuple(row) if q else tuple(row) + (None, None), q)
+                                             for row in posts.items]),
             'total': posts.total,
             'page': page,
             'pages': posts.pages
@@ -567,6 +1338,8 @@ def admin_get_post(post_id):
         'category': p.category,
         'tags': p.tags or [],
         'read_time': p.read_time,
+        'views': p.views or 0,
+        'unique_readers': _load_unique_readers([p.id]).get(p.id, 0),
         'published_at': p.published_at.isoformat() if p.published_at else None,
         'created_at': p.created_at.isoformat(),
         'updated_at': p.updated_at.isoformat()
@@ -586,10 +1359,8 @@ def admin_create_post():
         return jsonify({'success': False, 'message': '摘要过长(<=500)'}), 400
 
     try:
-        slug = _slugify(title)
         p = Post(
             title=title,
-            slug=slug,
             content=data.get('content') or '',
             excerpt=data.get('excerpt') or '',
             status=data.get('status') or 'draft',
@@ -602,8 +1373,10 @@ def admin_create_post():
         p.read_time = max(1, words // 300)
         if p.status == 'published' and not p.published_at:
             p.published_at = datetime.now(timezone.utc)
-        db.session.add(p)
+        _assign_post_slug(p, title)
+        _sync_post_derived(p, before={})
         db.session.commit()
+        _after_posts_committed(p.id)
         return jsonify({'success': True, 'data': {'id': p.id}, 'message': '创建成功'})
     except Exception as e:
         db.session.rollback()
@@ -621,6 +1394,7 @@ def admin_create_post():
 def admin_update_post(post_id):
     p = Post.query.get_or_404(post_id)
     data = request.get_json() or {}
+    before = _post_taxonomy_state(p)
     try:
         if 'title' in data:
             title = (data.get('title') or '').strip()
@@ -628,8 +1402,9 @@ def admin_update_post(post_id):
                 return jsonify({'success': False, 'message': '标题不能为空'}), 400
             if len(title) > 200:
                 return jsonify({'success': False, 'message': '标题过长(<=200)'}), 400
-            p.title = title
-            p.slug = _slugify(title)
+            if title != p.title:
+                p.title = title
+                _assign_post_slug(p, title)
         for f in ['content', 'excerpt', 'cover_url', 'category']:
             if f in data:
                 if f == 'excerpt' and data.get('excerpt') and len(data.get('excerpt')) > 500:
@@ -647,7 +1422,9 @@ def admin_update_post(post_id):
         # 重算阅读时长
         words = len((p.content or '').replace('\n', ''))
         p.read_time = max(1, words // 300)
+        _sync_post_derived(p, before)
         db.session.commit()
+        _after_posts_committed(post_id)
         return jsonify({'success': True, 'message': '更新成功', 'data': {
             'id': p.id,
             'title': p.title,
@@ -672,8 +1449,10 @@ def admin_update_post(post_id):
 @jwt_required_admin
 def admin_delete_post(post_id):
     p = Post.query.get_or_404(post_id)
+    _remove_post_derived(p)
     db.session.delete(p)
     db.session.commit()
+    _after_posts_committed(post_id)
     return jsonify({'success': True, 'message': '已删除'})
 
 
@@ -681,9 +1460,11 @@ def admin_delete_post(post_id):
 @jwt_required_admin
 def admin_publish_post(post_id):
     p = Post.query.get_or_404(post_id)
+    before = _post_taxonomy_state(p)
     try:
         p.status = 'published'
         p.published_at = p.published_at or datetime.now(timezone.utc)
+        _sync_post_derived(p, before)
         
         duplicate_drafts = Post.query.filter(
             Post.title == p.title,
@@ -691,9 +1472,11 @@ def admin_publish_post(post_id):
             Post.id != p.id
         ).all()
         for draft in duplicate_drafts:
+            _remove_post_derived(draft)
             db.session.delete(draft)
         
         db.session.commit()
+        _after_posts_committed(post_id)
         deleted_count = len(duplicate_drafts)
         message = '已发布'
         if deleted_count > 0:
@@ -708,9 +1491,12 @@ def admin_publish_post(post_id):
 @jwt_required_admin
 def admin_unpublish_post(post_id):
     p = Post.query.get_or_404(post_id)
+    before = _post_taxonomy_state(p)
     try:
         p.status = 'draft'
+        _sync_post_derived(p, before)
         db.session.commit()
+        _after_posts_committed(post_id)
         return jsonify({'success': True, 'message': '已撤回为草稿'})
     except Exception as e:
         db.session.rollback()
@@ -730,30 +1516,117 @@ def _message_to_dict(m: GuestMessage) -> dict:
     }
 
 
+def _guestbook_state(m: GuestMessage) -> dict:
+    """留言对计数表的贡献：{'approved' | 'pending': 1}"""
+    return {'approved' if m.is_approved else 'pending': 1}
+
+
+def _apply_guestbook_deltas(before: dict, after: dict):
+    """把前后贡献之差写入 guestbook_counts：先 UPDATE，无行时 INSERT（并发插入冲突时改回 UPDATE）"""
+    table = GuestbookCount.__table__
+    for status in set(before) | set(after):
+        delta = after.get(status, 0) - before.get(status, 0)
+        if not delta:
+            continue
+        increment = table.update().where(table.c.status == status).values(count=table.c.count + delta)
+        if db.session.execute(increment).rowcount:
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert().values(status=status, count=delta))
+        except IntegrityError:
+            db.session.execute(increment)
+
+
+def _guestbook_counts() -> dict:
+    rows = GuestbookCount.query.with_entities(GuestbookCount.status, GuestbookCount.count).all()
+    counts = {'approved': 0, 'pending': 0}
+    counts.update({status: max(0, int(count or 0)) for status, count in rows})
+    return counts
+
+
+def ensure_guestbook_counts():
+    """为已有库补建留言分页索引，并在计数表为空时按现有留言重建 approved / pending 两行"""
+    try:
+        for index in GuestMessage.__table__.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+        table = GuestMessage.__table__
+        db.session.execute(table.update().where(table.c.created_at.is_(None))
+                           .values(created_at=datetime.now(timezone.utc)))
+        if db.session.query(GuestbookCount.status).first() is None:
+            totals = {'approved': 0, 'pending': 0}
+            for is_approved, count in (db.session.query(GuestMessage.is_approved, db.func.count(GuestMessage.id))
+                                       .group_by(GuestMessage.is_approved)):
+                totals['approved' if is_approved else 'pending'] += count
+            db.session.execute(GuestbookCount.__table__.insert(), [
+                {'status': status, 'count': count} for status, count in totals.items()
+            ])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.warning(f"Guestbook counts backfill failed: {e}")
+
+
+def _attach_referenced_posts(items: list) -> list:
+    """一次 IN 查询附上留言 @ 的文章标题"""
+    post_ids = list({it['referenced_post_id'] for it in items if it['referenced_post_id']})
+    posts_map = {}
+    if post_ids:
+        for p in Post.query.filter(Post.id.in_(post_ids)).with_entities(Post.id, Post.title, Post.slug):
+            posts_map[p.id] = {'id': p.id, 'title': p.title, 'slug': p.slug}
+    for it in items:
+        it['referenced_post'] = posts_map.get(it['referenced_post_id']) if it['referenced_post_id'] else None
+    return items
+
+
+def _guestbook_page(q, total):
+    """按 (created_at, id) 倒序分页：带 cursor 参数（可为空串）时走键集分页，否则兼容 page 偏移分页。
+    total 来自计数表，不再对留言表 count()"""
+    per_page = min(100, max(1, request.args.get('per_page', 20, type=int)))
+    cursor = request.args.get('cursor')
+    order = (GuestMessage.created_at.desc(), GuestMessage.id.desc())
+    if cursor is None:
+        page = max(1, request.args.get('page', 1, type=int))
+        rows = q.order_by(*order).offset((page - 1) * per_page).limit(per_page).all()
+        items = _attach_referenced_posts([_message_to_dict(c) for c in rows])
+        return {'items': items, 'total': total, 'page': page, 'per_page': per_page}
+
+    if cursor.strip():
+        created_at, msg_id = _decode_post_cursor(cursor.strip())
+        created_at = datetime.fromisoformat(created_at)
+        q = q.filter(db.or_(
+            GuestMessage.created_at < created_at,
+            db.and_(GuestMessage.created_at == created_at, GuestMessage.id < msg_id)
+        ))
+    rows = q.order_by(*order).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    next_cursor = _encode_post_cursor(rows[-1].created_at, rows[-1].id) if (has_more and rows) else None
+    items = _attach_referenced_posts([_message_to_dict(c) for c in rows])
+    return {'items': items, 'total': total, 'per_page': per_page, 'next_cursor': next_cursor, 'has_more': has_more}
+
+
 @app.route('/api/admin/guestbook/messages', methods=['GET'])
 @jwt_required_admin
 def admin_list_guestbook():
-    """留言管理列表"""
-    page = max(1, int(request.args.get('page', 1)))
-    per_page = min(100, max(1, int(request.args.get('per_page', 20))))
+    """留言管理列表；counts 为 approved / pending 计数"""
     is_approved = request.args.get('is_approved')
+    counts = _guestbook_counts()
     q = GuestMessage.query
     if is_approved == 'true':
         q = q.filter_by(is_approved=True)
+        total = counts['approved']
     elif is_approved == 'false':
         q = q.filter_by(is_approved=False)
-    total = q.count()
-    rows = q.order_by(GuestMessage.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
-    items = [_message_to_dict(c) for c in rows]
-    # 附关联文章标题
-    post_ids = list({c['referenced_post_id'] for c in items if c['referenced_post_id']})
-    posts_map = {}
-    if post_ids:
-        for p in Post.query.filter(Post.id.in_(post_ids)).all():
-            posts_map[p.id] = {'id': p.id, 'title': p.title, 'slug': p.slug}
-    for it in items:
-        it['referenced_post'] = posts_map.get(it['referenced_post_id']) if it['referenced_post_id'] else None
-    return jsonify({'success': True, 'data': {'items': items, 'total': total, 'page': page, 'per_page': per_page}})
+        total = counts['pending']
+    else:
+        total = counts['approved'] + counts['pending']
+    try:
+        data = _guestbook_page(q, total)
+    except ValueError:
+        return jsonify({'success': False, 'message': '无效的分页游标'}), 400
+    data['counts'] = counts
+    return jsonify({'success': True, 'data': data})
 
 
 @app.route('/api/admin/guestbook/messages/<int:msg_id>/approve', methods=['PUT'])
@@ -761,7 +1634,9 @@ def admin_list_guestbook():
 def admin_approve_guestbook(msg_id):
     m = GuestMessage.query.get_or_404(msg_id)
     try:
+        before = _guestbook_state(m)
         m.is_approved = True
+        _apply_guestbook_deltas(before, _guestbook_state(m))
         db.session.commit()
         return jsonify({'success': True, 'message': '已通过'})
     except Exception as e:
@@ -774,6 +1649,7 @@ def admin_approve_guestbook(msg_id):
 def admin_delete_guestbook(msg_id):
     m = GuestMessage.query.get_or_404(msg_id)
     try:
+        _apply_guestbook_deltas(_guestbook_state(m), {})
         db.session.delete(m)
         db.session.commit()
         return jsonify({'success': True, 'message': '已删除'})
@@ -783,7 +1659,16 @@ def admin_delete_guestbook(msg_id):
 
 
 # ============== 相册（公开 + 管理） ==============
-def _album_to_dict(a: Album, include_photos: bool = False) -> dict:
+_ALBUM_FIELDS = ('id', 'name', 'slug', 'description', 'cover_url', 'sort_order', 'created_at', 'photo_count')
+
+
+def _album_photo_counts() -> dict:
+    """一次 GROUP BY 统计各相册照片数，替代列表里逐个相册 count"""
+    rows = db.session.query(Photo.album_id, db.func.count(Photo.id)).group_by(Photo.album_id).all()
+    return {album_id: count for album_id, count in rows}
+
+
+def _album_to_dict(a: Album, include_photos: bool = False, photo_count=None) -> dict:
     data = {
         'id': a.id,
         'name': a.name,
@@ -792,7 +1677,7 @@ def _album_to_dict(a: Album, include_photos: bool = False) -> dict:
         'cover_url': a.cover_url,
         'sort_order': a.sort_order,
         'created_at': a.created_at.isoformat() if a.created_at else None,
-        'photo_count': Photo.query.filter_by(album_id=a.id).count(),
+        'photo_count': photo_count if photo_count is not None else Photo.query.filter_by(album_id=a.id).count(),
     }
     if include_photos:
         photos = Photo.query.filter_by(album_id=a.id).order_by(Photo.sort_order.asc(), Photo.id.asc()).all()
@@ -821,13 +1706,23 @@ def _photo_to_dict(p: Photo) -> dict:
 
 
 @app.route('/api/albums', methods=['GET'])
+@conditional_get('albums')
 def list_albums():
-    """公开：相册列表（不含照片）"""
-    rows = Album.query.order_by(Album.sort_order.asc(), Album.id.desc()).all()
-    return json_response({'success': True, 'data': [_album_to_dict(a, include_photos=False) for a in rows]})
+    """公开：相册列表（不含照片）；fields= 为稀疏字段集，不需要 photo_count 时不做统计"""
+    try:
+        fields = _parse_fields(request.args.get('fields'), _ALBUM_FIELDS)
+    except ValueError as e:
+        return json_response({'success': False, 'message': f'未知字段: {e}'}, 400)
+    counts = _album_photo_counts() if not fields or 'photo_count' in fields else {}
+    query = Album.query.order_by(Album.sort_order.asc(), Album.id.desc())
+    data = _query_projected(query, Album, fields,
+                            lambda a: _album_to_dict(a, photo_count=counts.get(a.id, 0)),
+                            columns=[f for f in fields or () if f != 'photo_count'])
+    return json_response({'success': True, 'data': data})
 
 
 @app.route('/api/albums/daily', methods=['GET'])
+@conditional_get('albums', daily=True)
 def daily_album():
     """公开：每日精选相册"""
     rows = Album.query.all()
@@ -840,6 +1735,7 @@ def daily_album():
 
 
 @app.route('/api/albums/<int:album_id>', methods=['GET'])
+@conditional_get('albums')
 def get_album(album_id):
     """公开：相册详情（含照片）"""
     a = Album.query.get_or_404(album_id)
@@ -868,6 +1764,7 @@ def admin_create_album():
         sort_order=int(data.get('sort_order') or 0),
     )
     db.session.add(a)
+    _touch_content('albums')
     db.session.commit()
     return jsonify({'success': True, 'data': _album_to_dict(a)})
 
@@ -891,6 +1788,7 @@ def admin_update_album(album_id):
             a.sort_order = int(data.get('sort_order') or 0)
         except (TypeError, ValueError):
             pass
+    _touch_content('albums')
     db.session.commit()
     return jsonify({'success': True, 'data': _album_to_dict(a)})
 
@@ -901,6 +1799,7 @@ def admin_delete_album(album_id):
     a = Album.query.get_or_404(album_id)
     try:
         db.session.delete(a)  # 照片级联删除（ondelete=CASCADE）
+        _touch_content('albums')
         db.session.commit()
         return jsonify({'success': True, 'message': '已删除'})
     except Exception as e:
@@ -934,6 +1833,7 @@ def admin_add_photos(album_id):
         # 若相册没有封面，取第一张
         if not a.cover_url and created:
             a.cover_url = created[0].url
+        _touch_content('albums')
         db.session.commit()
         return jsonify({'success': True, 'data': [_photo_to_dict(p) for p in created]})
     except Exception as e:
@@ -947,6 +1847,7 @@ def admin_delete_photo(photo_id):
     p = Photo.query.get_or_404(photo_id)
     try:
         db.session.delete(p)
+        _touch_content('albums')
         db.session.commit()
         return jsonify({'success': True, 'message': '已删除'})
     except Exception as e:
@@ -969,6 +1870,7 @@ def admin_reorder_photos(album_id):
             p = Photo.query.filter_by(id=pid, album_id=album_id).first()
             if p:
                 p.sort_order = sort_order
+        _touch_content('albums')
         db.session.commit()
         return jsonify({'success': True, 'message': '排序已保存'})
     except Exception as e:
@@ -986,6 +1888,7 @@ def admin_batch_delete_photos():
         return jsonify({'success': False, 'message': 'ids 必须是非空数组'}), 400
     try:
         deleted = Photo.query.filter(Photo.id.in_(ids)).delete(synchronize_session=False)
+        _touch_content('albums')
         db.session.commit()
         return jsonify({'success': True, 'message': f'已删除 {deleted} 张照片'})
     except Exception as e:
@@ -994,6 +1897,13 @@ def admin_batch_delete_photos():
 
 
 # ============== 百宝箱 - 音乐/电影/友链 ==============
+_MUSIC_FIELDS = ('id', 'title', 'artist', 'album', 'cover_url', 'source_url', 'description', 'tags', 'sort_order',
+                 'created_at')
+_MOVIE_FIELDS = ('id', 'title', 'director', 'year', 'cover_url', 'source_url', 'description', 'rating', 'tags',
+                 'sort_order', 'created_at')
+_FRIEND_FIELDS = ('id', 'name', 'url', 'logo_url', 'description', 'email', 'sort_order', 'is_featured', 'created_at')
+
+
 def _music_to_dict(m: MusicFavorite) -> dict:
     cover_url = m.cover_url
     if cover_url and cover_url.startswith('http://'):
@@ -1044,12 +1954,18 @@ def _friend_to_dict(f: FriendLink) -> dict:
 
 # --- 音乐 ---
 @app.route('/api/music-favorites', methods=['GET'])
+@conditional_get('music')
 def list_music_favorites():
-    rows = MusicFavorite.query.order_by(MusicFavorite.sort_order.asc(), MusicFavorite.id.desc()).all()
-    return json_response({'success': True, 'data': [_music_to_dict(m) for m in rows]})
+    try:
+        fields = _parse_fields(request.args.get('fields'), _MUSIC_FIELDS)
+    except ValueError as e:
+        return json_response({'success': False, 'message': f'未知字段: {e}'}, 400)
+    query = MusicFavorite.query.order_by(MusicFavorite.sort_order.asc(), MusicFavorite.id.desc())
+    return json_response({'success': True, 'data': _query_projected(query, MusicFavorite, fields, _music_to_dict)})
 
 
 @app.route('/api/music-favorites/daily', methods=['GET'])
+@conditional_get('music', daily=True)
 def daily_music_favorite():
     rows = MusicFavorite.query.all()
     if not rows:
@@ -1271,6 +2187,7 @@ def create_music_favorite_public():
         sort_order=int(data.get('sort_order') or 0),
     )
     db.session.add(m)
+    _touch_content('music')
     db.session.commit()
     return jsonify({'success': True, 'data': _music_to_dict(m)})
 
@@ -1301,6 +2218,7 @@ def admin_create_music():
         sort_order=int(data.get('sort_order') or 0),
     )
     db.session.add(m)
+    _touch_content('music')
     db.session.commit()
     return jsonify({'success': True, 'data': _music_to_dict(m)})
 
@@ -1325,6 +2243,7 @@ def admin_update_music(mid):
             m.sort_order = int(data.get('sort_order') or 0)
         except (TypeError, ValueError):
             pass
+    _touch_content('music')
     db.session.commit()
     return jsonify({'success': True, 'data': _music_to_dict(m)})
 
@@ -1335,6 +2254,7 @@ def admin_delete_music(mid):
     m = MusicFavorite.query.get_or_404(mid)
     try:
         db.session.delete(m)
+        _touch_content('music')
         db.session.commit()
         return jsonify({'success': True, 'message': '已删除'})
     except Exception as e:
@@ -1344,9 +2264,14 @@ def admin_delete_music(mid):
 
 # --- 电影 ---
 @app.route('/api/movie-favorites', methods=['GET'])
+@conditional_get('movies')
 def list_movie_favorites():
-    rows = MovieFavorite.query.order_by(MovieFavorite.sort_order.asc(), MovieFavorite.id.desc()).all()
-    return json_response({'success': True, 'data': [_movie_to_dict(m) for m in rows]})
+    try:
+        fields = _parse_fields(request.args.get('fields'), _MOVIE_FIELDS)
+    except ValueError as e:
+        return json_response({'success': False, 'message': f'未知字段: {e}'}, 400)
+    query = MovieFavorite.query.order_by(MovieFavorite.sort_order.asc(), MovieFavorite.id.desc())
+    return json_response({'success': True, 'data': _query_projected(query, MovieFavorite, fields, _movie_to_dict)})
 
 
 @app.route('/api/admin/movie-favorites', methods=['GET'])
@@ -1415,6 +2340,7 @@ def admin_create_movie():
             sort_order=int(data.get('sort_order') or 0),
         )
         db.session.add(m)
+        _touch_content('movies')
         db.session.commit()
         return jsonify({'success': True, 'data': _movie_to_dict(m)})
     except Exception as e:
@@ -1448,6 +2374,7 @@ def admin_update_movie(mid):
         try: m.sort_order = int(data.get('sort_order') or 0)
         except (TypeError, ValueError): pass
     try:
+        _touch_content('movies')
         db.session.commit()
         return jsonify({'success': True, 'data': _movie_to_dict(m)})
     except Exception as e:
@@ -1462,6 +2389,7 @@ def admin_delete_movie(mid):
     m = MovieFavorite.query.get_or_404(mid)
     try:
         db.session.delete(m)
+        _touch_content('movies')
         db.session.commit()
         return jsonify({'success': True, 'message': '已删除'})
     except Exception as e:
@@ -1471,18 +2399,24 @@ def admin_delete_movie(mid):
 
 # --- 友链 ---
 @app.route('/api/friend-links', methods=['GET'])
+@conditional_get('friend_links')
 def list_friend_links():
+    try:
+        fields = _parse_fields(request.args.get('fields'), _FRIEND_FIELDS)
+    except ValueError as e:
+        return json_response({'success': False, 'message': f'未知字段: {e}'}, 400)
     featured = request.args.get('featured')
     q = FriendLink.query
     if featured == 'true':
         q = q.filter_by(is_featured=True)
     elif featured == 'false':
         q = q.filter_by(is_featured=False)
-    rows = q.order_by(FriendLink.is_featured.desc(), FriendLink.sort_order.asc(), FriendLink.id.desc()).all()
-    return json_response({'success': True, 'data': [_friend_to_dict(f) for f in rows]})
+    q = q.order_by(FriendLink.is_featured.desc(), FriendLink.sort_order.asc(), FriendLink.id.desc())
+    return json_response({'success': True, 'data': _query_projected(q, FriendLink, fields, _friend_to_dict)})
 
 
 @app.route('/api/friend-links/daily', methods=['GET'])
+@conditional_get('friend_links', daily=True)
 def daily_friend_link():
     rows = FriendLink.query.all()
     if not rows:
@@ -1511,6 +2445,7 @@ def admin_create_friend():
         is_featured=bool(data.get('is_featured')),
     )
     db.session.add(f)
+    _touch_content('friend_links')
     db.session.commit()
     return jsonify({'success': True, 'data': _friend_to_dict(f)})
 
@@ -1533,6 +2468,7 @@ def admin_update_friend(fid):
         except (TypeError, ValueError): pass
     if 'is_featured' in data:
         f.is_featured = bool(data.get('is_featured'))
+    _touch_content('friend_links')
     db.session.commit()
     return jsonify({'success': True, 'data': _friend_to_dict(f)})
 
@@ -1543,6 +2479,7 @@ def admin_delete_friend(fid):
     f = FriendLink.query.get_or_404(fid)
     try:
         db.session.delete(f)
+        _touch_content('friend_links')
         db.session.commit()
         return jsonify({'success': True, 'message': '已删除'})
     except Exception as e:
@@ -2015,6 +2952,50 @@ def proxy_music_audio():
         return jsonify({'success': False, 'message': f'音频流代理失败: {str(e)}'}), 500
 
 
+# ============== 全量导出（NDJSON） ==============
+_EXPORT_BATCH_SIZE = max(1, int(os.getenv('EXPORT_BATCH_SIZE', '500')))
+
+
+def _ndjson_line(kind: str, data: dict) -> str:
+    return json.dumps({'type': kind, 'data': data}, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def _export_sources():
+    """导出的数据类型、查询与序列化函数，按此顺序依次输出"""
+    photo_counts = _album_photo_counts()
+    return (
+        ('post', Post.query.filter(Post.status == 'published').order_by(Post.id.asc()), _serialize_post_detail),
+        ('album', Album.query.order_by(Album.id.asc()),
+         lambda a: _album_to_dict(a, photo_count=photo_counts.get(a.id, 0))),
+        ('photo', Photo.query.order_by(Photo.id.asc()), _photo_to_dict),
+        ('music', MusicFavorite.query.order_by(MusicFavorite.id.asc()), _music_to_dict),
+        ('movie', MovieFavorite.query.order_by(MovieFavorite.id.asc()), _movie_to_dict),
+        ('friend_link', FriendLink.query.order_by(FriendLink.id.asc()), _friend_to_dict),
+    )
+
+
+def _iter_export_lines():
+    """逐行产出 NDJSON：每类数据走服务端游标（stream_results）按固定批次读取，读一行写一行"""
+    for kind, query, to_dict in _export_sources():
+        for obj in query.yield_per(_EXPORT_BATCH_SIZE):
+            yield _ndjson_line(kind, to_dict(obj))
+
+
+@app.route('/api/admin/export.ndjson', methods=['GET'])
+@jwt_required_admin
+def admin_export_ndjson():
+    """管理员：流式导出已发布文章、相册、照片、收藏与友链，每行一个 {"type", "data"} 对象"""
+    filename = f"export-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}.ndjson"
+    return Response(
+        stream_with_context(_iter_export_lines()),
+        mimetype='application/x-ndjson',
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'Cache-Control': 'no-store',
+        },
+    )
+
+
 def _get_site_url() -> str:
     site_url = (os.getenv('SITE_URL') or '').strip()
     if site_url:
@@ -2022,6 +3003,7 @@ def _get_site_url() -> str:
     return request.host_url.rstrip('/')
 
 @app.route('/sitemap.xml')
+@conditional_get('posts', daily=True, precompress=True, per_host=True)
 def sitemap():
     """生成 sitemap.xml"""
     from flask import make_response
@@ -2100,6 +3082,20 @@ def ensure_default_admin():
     db.session.commit()
 
 
+def ensure_sqlite_wal():
+    """SQLite 库切到 WAL（库级持久设置，读写互不阻塞），只需在初始化时执行一次；
+    只读文件系统等无法切换时保持原日志模式"""
+    if not uses_direct_sqlite_queries():
+        return
+    try:
+        with db.engine.connect() as conn:
+            mode = conn.exec_driver_sql('PRAGMA journal_mode = WAL').scalar()
+        if str(mode).lower() != 'wal':
+            app.logger.warning(f"SQLite journal_mode stays {mode}")
+    except Exception as e:
+        app.logger.warning(f"SQLite WAL setup failed: {e}")
+
+
 def ensure_mysql_utf8mb4():
     """当使用 MySQL 时，确保数据库与所有表使用 utf8mb4 编码与排序规则。
     仅在 MySQL 数据库下执行；对 SQLite 无影响。
@@ -2161,11 +3157,7 @@ def ensure_profile_schema():
         if not uses_direct_sqlite_queries():
             return
 
-        import sqlite3
-        import os
-
-        db_path = os.path.join(os.path.dirname(__file__), 'personal_blog.db')
-        conn = sqlite3.connect(db_path)
+        conn = sqlite3.connect(_sqlite_db_path())
         try:
             cur = conn.cursor()
             cur.execute("PRAGMA table_info(profiles)")
@@ -2190,84 +3182,470 @@ def create_access_token(username: str, role: str = 'admin', expires_minutes: int
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALG)
 
-def _build_post_query(category=None, tag=None, search=None):
-    """构建文章查询条件（共用函数）"""
-    query = Post.query.filter_by(status='published')
-    if category:
-        query = query.filter(Post.category == category)
-    if tag:
-        query = query.filter(Post.tags.contains([tag]))
-    if search:
-        like = f'%{search}%'
+# ============== 全文索引（SQLite FTS5） ==============
+# FTS5 内置 unicode61 分词器不切分中文，这里在 Python 侧预先分词：
+# 中文连续片段拆成单字 + 相邻双字（bigram），其余按词小写；写入与查询共用同一规则
+_CJK_RUN_RE = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+')
+_SEARCH_WORD_RE = re.compile(r'[^\W_]+')
+
+# bm25 列权重：title, excerpt, content, category, tags
+_SEARCH_BM25_WEIGHTS = (10.0, 4.0, 1.0, 3.0, 5.0)
+_SEARCH_BM25_ORDER = 'bm25(posts_fts, {})'.format(', '.join(str(w) for w in _SEARCH_BM25_WEIGHTS))
+
+# ensure_search_index() 成功建表后置为 True；SQLite 未编译 FTS5 时保持 False 并回退 LIKE
+_fts_available = False
+
+
+def _search_tokens(value, for_query: bool = False) -> list:
+    """切分检索文本；for_query=True 时中文只取 bigram（单字查询保留单字），保证查询词都能在索引中命中"""
+    text_value = str(value or '')
+    tokens = []
+    pos = 0
+    for m in _CJK_RUN_RE.finditer(text_value):
+        tokens.extend(_SEARCH_WORD_RE.findall(text_value[pos:m.start()].lower()))
+        run = m.group()
+        bigrams = [run[i:i + 2] for i in range(len(run) - 1)]
+        if for_query:
+            tokens.extend(bigrams or [run])
+        else:
+            tokens.extend(run)
+            tokens.extend(bigrams)
+        pos = m.end()
+    tokens.extend(_SEARCH_WORD_RE.findall(text_value[pos:].lower()))
+    return tokens
+
+
+def _build_search_match(query: str):
+    """把用户输入转换为 FTS5 MATCH 表达式；无有效词元时返回 None（调用方回退 LIKE）"""
+    tokens = _search_tokens(query, for_query=True)
+    if not tokens:
+        return None
+    # 搜索框边输入边查询：末尾的拉丁词按前缀匹配
+    prefix_token = None if _CJK_RUN_RE.fullmatch(tokens[-1]) else tokens[-1]
+    terms = [f'"{t}"*' if t == prefix_token else f'"{t}"' for t in dict.fromkeys(tokens)]
+    return ' '.join(terms)
+
+
+# 摘要用的 Markdown 去标记：按顺序替换，保留链接/图片文字与代码内容
+_MARKDOWN_TEXT_RULES = tuple((re.compile(pattern, re.MULTILINE), repl) for pattern, repl in (
+    (r'^\s*(```|~~~).*$', ''),                          # 代码围栏行
+    (r'<[^>\n]+>', ''),                                 # 内联 HTML 标签
+    (r'!\[([^\]]*)\]\([^)]*\)', r'\1'),                # 图片 → alt
+    (r'\[([^\]]*)\]\([^)]*\)', r'\1'),                 # 行内链接 → 文字
+    (r'\[([^\]]*)\]\[[^\]]*\]', r'\1'),                # 引用式链接 → 文字
+    (r'^\s{0,3}\[[^\]]+\]:\s*\S+.*$', ''),             # 链接定义
+    (r'^\s{0,3}(#{1,6}\s+|>\s?|[-*+]\s+|\d+[.)]\s+)', ''),  # 标题、引用、列表标记
+    (r'^\s{0,3}([-*_]\s*){3,}$', ''),                  # 分隔线
+    (r'^\s*\|?(\s*:?-+:?\s*\|)+\s*:?-*:?\s*$', ''),     # 表格对齐行
+    (r'\|', ' '),                                      # 表格竖线
+    (r'(\*\*|~~|`+|\*)', ''),                          # 强调与行内代码标记（不动下划线，避免误伤标识符）
+))
+
+
+def _markdown_to_text(value) -> str:
+    """把 Markdown 粗略转为纯文本（不做完整解析），空白压缩为单个空格"""
+    text_value = str(value or '')
+    for pattern, repl in _MARKDOWN_TEXT_RULES:
+        text_value = pattern.sub(repl, text_value)
+    return ' '.join(text_value.split())
+
+
+def _search_snippet(query, *texts, width=80) -> str:
+    """在 texts 中依次查找第一个命中的查询词，截取其前后约 width 个字符作为摘要（纯文本，先去掉 Markdown 标记）"""
+    terms = [t for t in dict.fromkeys(_search_tokens(query, for_query=True)) if t]
+    fallback = ''
+    for value in texts:
+        value = _markdown_to_text(value)
+        if not value:
+            continue
+        fallback = fallback or value
+        lowered = value.lower()
+        hits = [pos for pos in (lowered.find(t) for t in terms) if pos >= 0]
+        if hits:
+            start = max(0, min(hits) - width // 3)
+            end = min(len(value), start + width)
+            return ('…' if start > 0 else '') + value[start:end].strip() + ('…' if end < len(value) else '')
+    return fallback[:width] + ('…' if len(fallback) > width else '')
+
+
+def _search_index_enabled() -> bool:
+    return _fts_available and uses_direct_sqlite_queries()
+
+
+def _post_search_document(p) -> dict:
+    """索引行：各列为预分词文本；doc_hash（UNINDEXED）为原文指纹，启动时据此找出库外改动过的文章"""
+    tags_value = p.tags or []
+    if isinstance(tags_value, str):
+        try:
+            tags_value = json.loads(tags_value)
+        except Exception:
+            tags_value = []
+    if not isinstance(tags_value, list):
+        tags_value = []
+    source = json.dumps([p.title, p.excerpt, p.content, p.category, [str(t) for t in tags_value]],
+                        ensure_ascii=False)
+    return {
+        'id': p.id,
+        'doc_hash': hashlib.sha1(source.encode('utf-8')).hexdigest(),
+        'title': ' '.join(_search_tokens(p.title)),
+        'excerpt': ' '.join(_search_tokens(p.excerpt)),
+        'content': ' '.join(_search_tokens(p.content)),
+        'category': ' '.join(_search_tokens(p.category)),
+        'tags': ' '.join(_search_tokens(' '.join(str(t) for t in tags_value))),
+    }
+
+
+def _sync_post_search_index(p):
+    """在当前事务内刷新单篇文章的索引行（需在 commit 前调用，p.id 已分配）"""
+    if not _search_index_enabled():
+        return
+    db.session.execute(text('DELETE FROM posts_fts WHERE rowid = :id'), {'id': p.id})
+    db.session.execute(
+        text('INSERT INTO posts_fts(rowid, title, excerpt, content, category, tags, doc_hash) '
+             'VALUES (:id, :title, :excerpt, :content, :category, :tags, :doc_hash)'),
+        _post_search_document(p)
+    )
+
+
+def _remove_post_search_index(post_id):
+    if not _search_index_enabled():
+        return
+    db.session.execute(text('DELETE FROM posts_fts WHERE rowid = :id'), {'id': post_id})
+
+
+# ============== 文章派生数据 ==============
+def _normalize_post_tags(tags_value) -> list:
+    """posts.tags 兼容 list / JSON 字符串；去空、去重并截断到 post_tags.tag 的长度"""
+    if isinstance(tags_value, str):
+        try:
+            tags_value = json.loads(tags_value)
+        except Exception:
+            tags_value = []
+    if not isinstance(tags_value, list):
+        return []
+    tags = (str(t).strip()[:100] for t in tags_value if t is not None)
+    return list(dict.fromkeys(t for t in tags if t))
+
+
+def _sync_post_tags(p):
+    db.session.execute(PostTag.__table__.delete().where(PostTag.post_id == p.id))
+    tags = _normalize_post_tags(p.tags)
+    if tags:
+        db.session.execute(PostTag.__table__.insert(), [{'post_id': p.id, 'tag': t} for t in tags])
+
+
+def _post_taxonomy_state(p) -> dict:
+    """文章对计数表的贡献 {(kind, name): 1}；草稿不计数。修改文章前先取一次作为 before。
+    kind 为 category / tag / month（归档直方图，name 为 UTC 的 YYYY-MM）"""
+    if p is None or p.status != 'published':
+        return {}
+    state = {('tag', t): 1 for t in _normalize_post_tags(p.tags)}
+    if p.category:
+        state[('category', p.category[:100])] = 1
+    if p.published_at:
+        state[('month', p.published_at.strftime('%Y-%m'))] = 1
+    return state
+
+
+def _apply_taxonomy_deltas(before: dict, after: dict):
+    """把前后贡献之差写入 taxonomy_counts：先 UPDATE，无行时 INSERT，归零的行删除"""
+    table = TaxonomyCount.__table__
+    for kind, name in set(before) | set(after):
+        delta = after.get((kind, name), 0) - before.get((kind, name), 0)
+        if not delta:
+            continue
+        key = db.and_(table.c.kind == kind, table.c.name == name)
+        updated = db.session.execute(table.update().where(key).values(count=table.c.count + delta))
+        if updated.rowcount == 0 and delta > 0:
+            db.session.execute(table.insert().values(kind=kind, name=name, count=delta))
+        elif delta < 0:
+            db.session.execute(table.delete().where(db.and_(key, table.c.count <= 0)))
+
+
+def _sync_post_derived(p, before: dict):
+    """文章写入后、commit 前调用：在同一事务内刷新全文索引、post_tags 与计数表（p.id 需已分配）。
+    before 为修改前的 _post_taxonomy_state(p)，新建文章传 {}"""
+    _sync_post_search_index(p)
+    _sync_post_tags(p)
+    _apply_taxonomy_deltas(before, _post_taxonomy_state(p))
+    _touch_content('posts')
+
+
+def _remove_post_derived(p):
+    """删除文章前调用"""
+    _remove_post_search_index(p.id)
+    db.session.execute(PostTag.__table__.delete().where(PostTag.post_id == p.id))
+    db.session.execute(PostRelated.__table__.delete().where(PostRelated.post_id == p.id))
+    db.session.execute(PostRender.__table__.delete().where(PostRender.post_id == p.id))
+    db.session.execute(PostSlugHistory.__table__.delete().where(PostSlugHistory.post_id == p.id))
+    db.session.execute(PostReaderSketch.__table__.delete().where(PostReaderSketch.post_id == p.id))
+    db.session.execute(PostEngagement.__table__.delete().where(PostEngagement.post_id == p.id))
+    db.session.execute(Like.__table__.delete().where(Like.post_id == p.id))
+    _apply_taxonomy_deltas(_post_taxonomy_state(p), {})
+    _touch_content('posts')
+
+
+def ensure_taxonomy_counts():
+    """taxonomy_counts 缺少归档月份（空表或升级前的库）时按已发布文章全量重建"""
+    try:
+        if db.session.query(TaxonomyCount.kind).filter_by(kind='month').first() is not None:
+            return
+        db.session.execute(TaxonomyCount.__table__.delete())
+        totals = {}
+        for p in Post.query.filter_by(status='published').yield_per(200):
+            for key in _post_taxonomy_state(p):
+                totals[key] = totals.get(key, 0) + 1
+        if totals:
+            db.session.execute(TaxonomyCount.__table__.insert(), [
+                {'kind': kind, 'name': name, 'count': count} for (kind, name), count in totals.items()
+            ])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.warning(f"taxonomy_counts backfill failed: {e}")
+
+
+def ensure_post_tags():
+    """post_tags 为空时从 posts.tags 回填（升级已有库）"""
+    try:
+        if db.session.query(PostTag.post_id).first() is not None:
+            return
+        for p in Post.query.filter(Post.tags.isnot(None)).yield_per(200):
+            _sync_post_tags(p)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.warning(f"post_tags backfill failed: {e}")
+
+
+def _dedupe_post_slugs():
+    """建唯一索引前修复旧数据：空 slug 置 NULL，重复 slug 保留 id 最小的一篇，其余重新分配"""
+    db.session.execute(text("UPDATE posts SET slug = NULL WHERE slug = ''"))
+    duplicates = [row[0] for row in db.session.execute(text(
+        "SELECT slug FROM posts WHERE slug IS NOT NULL GROUP BY slug HAVING COUNT(*) > 1"
+    ))]
+    for slug in duplicates:
+        posts = Post.query.filter_by(slug=slug).order_by(Post.id.asc()).all()
+        for p in posts[1:]:
+            p.slug = None
+            db.session.flush()
+            p.slug = _next_free_slug(_slug_base(p.title))
+            db.session.flush()
+    db.session.commit()
+
+
+def ensure_post_listing_schema():
+    """为已有库补建文章列表索引（含唯一 slug），并回填已发布但缺少 published_at 的旧数据（键集分页要求非空）"""
+    try:
+        _dedupe_post_slugs()
+        from sqlalchemy import inspect
+        if 'ix_posts_slug' in {ix['name'] for ix in inspect(db.engine).get_indexes('posts')}:
+            # 早期版本的非唯一 slug 索引，由 uq_posts_slug 取代
+            drop_sql = 'DROP INDEX ix_posts_slug ON posts' if db.engine.dialect.name == 'mysql' else 'DROP INDEX ix_posts_slug'
+            db.session.execute(text(drop_sql))
+            db.session.commit()
+        for index in Post.__table__.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+        db.session.execute(text(
+            "UPDATE posts SET published_at = COALESCE(created_at, CURRENT_TIMESTAMP) "
+            "WHERE status = 'published' AND published_at IS NULL"
+        ))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.warning(f"Post listing schema upgrade failed: {e}")
+
+
+def ensure_search_index():
+    """SQLite 下创建 posts_fts，并按 doc_hash 逐篇核对：缺失、内容不一致（含绕过应用直接改库）的文章重新入索引，
+    已删除文章的索引行清除（草稿也入索引，状态由查询时 JOIN 过滤）。早期没有 doc_hash 列的索引表整体重建"""
+    global _fts_available
+    if not uses_direct_sqlite_queries():
+        return
+    try:
+        columns = [row[1] for row in db.session.execute(text("PRAGMA table_info('posts_fts')"))]
+        if columns and 'doc_hash' not in columns:
+            db.session.execute(text('DROP TABLE posts_fts'))
+        db.session.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5("
+            "title, excerpt, content, category, tags, doc_hash UNINDEXED, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        ))
+        _fts_available = True
+        indexed = dict(db.session.execute(text('SELECT rowid, doc_hash FROM posts_fts')).all())
+        for p in Post.query.yield_per(200):
+            if indexed.pop(p.id, None) != _post_search_document(p)['doc_hash']:
+                _sync_post_search_index(p)
+        for post_id in indexed:
+            _remove_post_search_index(post_id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        _fts_available = False
+        app.logger.warning(f"FTS5 search index unavailable, falling back to LIKE: {e}")
+
+
+def _build_post_query(category=None, tag=None, search=None):
+    """构建文章查询条件（共用函数）"""
+    query = Post.query.filter_by(status='published')
+    if category:
+        query = query.filter(Post.category == category)
+    if tag:
+        query = query.join(PostTag, db.and_(PostTag.post_id == Post.id, PostTag.tag == tag))
+    if search:
+        like = f'%{search}%'
         query = query.filter(db.or_(
             Post.title.ilike(like),
             Post.category.ilike(like),
-            Post.tags.contains([search])
+            db.session.query(PostTag.post_id).filter(PostTag.post_id == Post.id, PostTag.tag == search).exists()
         ))
     return query
 
-def _execute_post_list_query(page, per_page, category=None, tag=None, search=None):
-    """执行文章列表查询并返回分页结果（共用函数）"""
+# 列表总数缓存：{(category, tag, search): (expires_at, total)}；文章写入后清空，其余进程靠 TTL 收敛。
+# 搜索词由访客决定，按 LRU 限制条目数，避免不同关键词把内存撑大
+_POST_COUNT_TTL = 60
+_POST_COUNT_CACHE_SIZE = int(os.getenv('POST_COUNT_CACHE_SIZE', '512'))
+_post_count_cache = OrderedDict()
+_post_count_cache_lock = threading.Lock()
+
+
+def _cached_post_count(key, compute):
+    now = time.time()
+    with _post_count_cache_lock:
+        hit = _post_count_cache.get(key)
+        if hit and hit[0] > now:
+            _post_count_cache.move_to_end(key)
+            return hit[1]
+    total = compute()
+    with _post_count_cache_lock:
+        _post_count_cache[key] = (now + _POST_COUNT_TTL, total)
+        _post_count_cache.move_to_end(key)
+        while len(_post_count_cache) > _POST_COUNT_CACHE_SIZE:
+            _post_count_cache.popitem(last=False)
+    return total
+
+
+def _clear_post_count_cache():
+    with _post_count_cache_lock:
+        _post_count_cache.clear()
+
+
+def _after_posts_committed(*post_ids):
+    """文章写入 commit 之后调用：清空列表总数缓存，增量修补进程内的摘要索引，并提交相关文章的后台重算"""
+    _clear_post_count_cache()
+    for post_id in post_ids:
+        post_summary_index.refresh_post(post_id)
+    if post_ids:
+        _submit_related_refresh(post_ids)
+
+
+def _encode_post_cursor(published_at, post_id) -> str:
+    """游标 = base64url(JSON[published_at, id])，对前端不透明"""
+    if published_at is not None and not isinstance(published_at, str):
+        published_at = published_at.isoformat()
+    payload = json.dumps([published_at, post_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_post_cursor(cursor: str):
+    """解析游标，返回 (published_at 原值, id)；格式非法时抛 ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        published_at, post_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError('invalid cursor')
+    if not isinstance(published_at, str) or not isinstance(post_id, int):
+        raise ValueError('invalid cursor')
+    return published_at, post_id
+
+
+def _sqlite_post_filters(category=None, tag=None, search=None):
+    """直连 SQLite 路径的 FROM / WHERE 片段，返回 (from_clause, where_conditions, params, match_expr)"""
+    where_conditions = ["posts.status = 'published'"]
+    params = []
+    from_clause = "posts"
+
+    if category:
+        where_conditions.append("posts.category = ?")
+        params.append(category)
+
+    if tag:
+        # (tag, post_id) 索引取出文章 id，再按主键回表
+        where_conditions.append("posts.id IN (SELECT post_id FROM post_tags WHERE tag = ?)")
+        params.append(tag)
+
+    match_expr = _build_search_match(search) if (search and _search_index_enabled()) else None
+    if match_expr:
+        # FTS5 倒排索引命中，替代全表 LIKE 扫描
+        from_clause = "posts_fts JOIN posts ON posts.id = posts_fts.rowid"
+        where_conditions.append("posts_fts MATCH ?")
+        params.append(match_expr)
+    elif search:
+        where_conditions.append("(posts.title LIKE ? OR posts.category LIKE ? OR posts.tags LIKE ?)")
+        search_pattern = f'%{search}%'
+        params.extend([search_pattern, search_pattern, search_pattern])
+
+    return from_clause, where_conditions, params, match_expr
+
+
+_POST_LIST_SQL_COLUMNS = ', '.join(f'posts.{f}' for f in _POST_LIST_FIELDS)
+
+
+def _post_row_builder(fields):
+    """fields 为空时构造完整的 12 字段摘要，否则按稀疏字段集投影"""
+    if not fields:
+        return _build_post_summary_item
+    return lambda row: _project_post_row(row, fields)
+
+
+def _execute_post_list_query(page, per_page, category=None, tag=None, search=None, fields=None):
+    """执行文章列表查询并返回分页结果（共用函数）；fields 下推到 SELECT 列"""
+    count_key = (category or None, tag or None, search or None)
+    select_fields = fields or _POST_LIST_FIELDS
+    build_item = _post_row_builder(fields)
     if uses_sqlalchemy_queries():
         query = _build_post_query(category, tag, search)
-        query = query.with_entities(
-            Post.id, Post.title, Post.slug, Post.excerpt, Post.category, Post.tags,
-            Post.cover_url, Post.read_time, Post.views, Post.likes,
-            Post.published_at, Post.created_at
-        )
-        posts = query.order_by(Post.published_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        items = [_build_post_summary_item(r) for r in posts.items]
+        total = _cached_post_count(count_key, query.count)
+        rows = (query.with_entities(*[getattr(Post, f) for f in select_fields])
+                .order_by(Post.published_at.desc(), Post.id.desc())
+                .offset((page - 1) * per_page)
+                .limit(per_page)
+                .all())
         return {
-            'items': items,
-            'total': posts.total,
-            'pages': posts.pages,
+            'items': [build_item(r) for r in rows],
+            'total': total,
+            'pages': (total + per_page - 1) // per_page,
             'current_page': page
         }
 
-    import sqlite3
-    import os
-
-    db_path = os.path.join(os.path.dirname(__file__), 'personal_blog.db')
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    cursor = _get_read_connection().cursor()
 
     try:
-        where_conditions = ["status = 'published'"]
-        params = []
+        from_clause, where_conditions, params, match_expr = _sqlite_post_filters(category, tag, search)
+        order_clause = "posts.published_at DESC, posts.id DESC"
+        if match_expr:
+            order_clause = f"{_SEARCH_BM25_ORDER}, posts.published_at DESC"
 
-        if category:
-            where_conditions.append("category = ?")
-            params.append(category)
+        where_clause = " AND ".join(where_conditions)
 
-        if tag:
-            where_conditions.append("tags LIKE ?")
-            params.append(f'%"{tag}"%')
+        def _count():
+            cursor.execute(f"SELECT COUNT(*) FROM {from_clause} WHERE {where_clause}", params)
+            return cursor.fetchone()[0]
 
-        if search:
-            where_conditions.append("(title LIKE ? OR category LIKE ? OR tags LIKE ?)")
-            search_pattern = f'%{search}%'
-            params.extend([search_pattern, search_pattern, search_pattern])
-
-        where_clause = " AND ".join(where_conditions)
-        count_sql = f"SELECT COUNT(*) FROM posts WHERE {where_clause}"
-        cursor.execute(count_sql, params)
-        total = cursor.fetchone()[0]
+        total = _cached_post_count(count_key, _count)
 
         offset = (page - 1) * per_page
         query_sql = f"""
-            SELECT id, title, slug, excerpt, category, tags, cover_url, read_time,
-                   views, likes, published_at, created_at
-            FROM posts
+            SELECT {', '.join(f'posts.{f}' for f in select_fields)}
+            FROM {from_clause}
             WHERE {where_clause}
-            ORDER BY published_at DESC, created_at DESC
+            ORDER BY {order_clause}
             LIMIT ? OFFSET ?
         """
         cursor.execute(query_sql, params + [per_page, offset])
         posts = cursor.fetchall()
 
-        items = [_build_post_summary_item(post) for post in posts]
+        items = [build_item(post) for post in posts]
         pages = (total + per_page - 1) // per_page
 
         return {
@@ -2279,57 +3657,952 @@ def _execute_post_list_query(page, per_page, category=None, tag=None, search=Non
 
     finally:
         cursor.close()
-        conn.close()
+
+
+def _execute_post_cursor_query(per_page, cursor=None, category=None, tag=None, search=None, with_total=False,
+                               fields=None):
+    """按 (published_at, id) 的键集分页：每页代价与翻页深度无关，total 仅在 with_total 时返回（走缓存）。
+    带关键词时同样按发布时间倒序，不按 bm25 相关度（相关度排序请用 page 分页）"""
+    after = _decode_post_cursor(cursor) if cursor else None
+    count_key = (category or None, tag or None, search or None)
+    # 游标需要 published_at 与 id，稀疏字段集里没有时补在末尾（投影时被裁掉）
+    select_fields = tuple(fields or _POST_LIST_FIELDS)
+    if 'published_at' not in select_fields:
+        select_fields += ('published_at',)
+    at_index, id_index = select_fields.index('published_at'), select_fields.index('id')
+    build_item = _post_row_builder(fields)
+
+    if uses_sqlalchemy_queries():
+        query = _build_post_query(category, tag, search)
+        total = _cached_post_count(count_key, query.count) if with_total else None
+        page_query = query.with_entities(*[getattr(Post, f) for f in select_fields])
+        if after:
+            after_at = datetime.fromisoformat(after[0])
+            page_query = page_query.filter(db.or_(
+                Post.published_at < after_at,
+                db.and_(Post.published_at == after_at, Post.id < after[1])
+            ))
+        rows = (page_query.order_by(Post.published_at.desc(), Post.id.desc())
+                .limit(per_page + 1)
+                .all())
+    else:
+        cur = _get_read_connection().cursor()
+        try:
+            from_clause, where_conditions, params, _ = _sqlite_post_filters(category, tag, search)
+            total = None
+            if with_total:
+                count_where = " AND ".join(where_conditions)
+
+                def _count():
+                    cur.execute(f"SELECT COUNT(*) FROM {from_clause} WHERE {count_where}", params)
+                    return cur.fetchone()[0]
+
+                total = _cached_post_count(count_key, _count)
+            page_params = list(params)
+            if after:
+                where_conditions = where_conditions + [
+                    "(posts.published_at < ? OR (posts.published_at = ? AND posts.id < ?))"
+                ]
+                page_params.extend([after[0], after[0], after[1]])
+            cur.execute(f"""
+                SELECT {', '.join(f'posts.{f}' for f in select_fields)}
+                FROM {from_clause}
+                WHERE {" AND ".join(where_conditions)}
+                ORDER BY posts.published_at DESC, posts.id DESC
+                LIMIT ?
+            """, page_params + [per_page + 1])
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+
+    # 多取一行判断是否还有下一页，游标取本页最后一行的原始 published_at
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    next_cursor = _encode_post_cursor(rows[-1][at_index], rows[-1][id_index]) if (has_more and rows) else None
+    result = {
+        'items': [build_item(r) for r in rows],
+        'next_cursor': next_cursor,
+        'per_page': per_page
+    }
+    if total is not None:
+        result['total'] = total
+    return result
+
+
+def _load_post_summary_rows(post_id=None):
+    """读取已发布文章的 12 个列表字段；post_id 不为空时只读该篇（用于增量修补）"""
+    if uses_sqlalchemy_queries():
+        query = Post.query.filter_by(status='published')
+        if post_id is not None:
+            query = query.filter(Post.id == post_id)
+        return query.with_entities(*[getattr(Post, f) for f in _POST_LIST_FIELDS]).all()
+
+    cursor = _get_read_connection().cursor()
+    try:
+        sql = f"SELECT {_POST_LIST_SQL_COLUMNS} FROM posts WHERE posts.status = 'published'"
+        if post_id is None:
+            cursor.execute(sql)
+        else:
+            cursor.execute(sql + " AND posts.id = ?", [post_id])
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+_SUGGEST_SCAN_LIMIT = 500
+_SUGGEST_KINDS = ('category', 'tag', 'post')
+
+
+def _suggest_fold(value) -> str:
+    """联想匹配用的归一化：casefold 并压缩空白"""
+    return ' '.join(str(value or '').casefold().split())
+
+
+def _summary_sort_key(published_at, post_id):
+    """索引排序键 (published_at, id)；datetime 统一转 isoformat，与游标编码保持一致"""
+    if published_at is not None and not isinstance(published_at, str):
+        published_at = published_at.isoformat()
+    return (published_at or '', post_id)
+
+
+class PostSummaryIndex:
+    """已发布文章摘要的进程内物化视图。
+
+    按 (published_at, id) 升序保存排序键，另有按分类、标签的二级索引；列表、分类、标签筛选与
+    页码/游标分页都在内存完成。写入方在 commit 后调用 refresh_post / remove_post 增量修补，
+    其他 worker 进程的写入靠 ttl 到期后整体重建来收敛。快照只整体替换，读路径无需加锁。
+    快照同时带一份按归一化文本排序的联想数组（分类、标签、标题及标题内各词起点），供前缀检索。
+    """
+
+    def __init__(self, loader, ttl=60):
+        self._loader = loader
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._loaded_at = 0.0
+        self._reloading = False
+        # 每次 mark_stale / invalidate / 增量修补递增；重建期间它变化说明读到的行可能早于那次写入
+        self._generation = 0
+
+    @staticmethod
+    def _title_entries(key, item):
+        """文章标题的联想条目 (归一化文本, 2, 标题, 浏览量, 排序键)：整题及题内各词起点各一条"""
+        title = item['title'] or ''
+        folded = _suggest_fold(title)
+        starts = {0} | {m.start() for m in _SEARCH_WORD_RE.finditer(folded)}
+        return [(folded[start:], 2, title, item.get('views') or 0, key) for start in sorted(starts) if folded[start:]]
+
+    @staticmethod
+    def _suggest_rank(entry):
+        """与前缀无关的排名（类别、权重倒序、文本），末尾补上归一化文本与排序键使其全序"""
+        folded, kind, text_value, weight, post_key = entry
+        return (kind, -weight, text_value, folded, post_key or ())
+
+    @classmethod
+    def _build(cls, items):
+        keys = sorted(items)
+        by_category = {}
+        by_tag = {}
+        for key in keys:
+            item = items[key]
+            if item['category']:
+                by_category.setdefault(item['category'], []).append(key)
+            for tag in dict.fromkeys(str(t) for t in item['tags']):
+                by_tag.setdefault(tag, []).append(key)
+
+        # 联想条目 (归一化文本, 类别序号, 展示文本, 权重, 文章排序键)，按整条元组排序（首项即归一化文本）
+        suggest = []
+        for kind, groups in ((0, by_category), (1, by_tag)):
+            for name, group in groups.items():
+                suggest.append((_suggest_fold(name), kind, name, len(group), None))
+        title_entries = {key: cls._title_entries(key, items[key]) for key in keys}
+        for entries in title_entries.values():
+            suggest.extend(entries)
+        suggest.sort()
+        return {
+            'keys': keys,
+            'items': items,
+            'by_id': {key[1]: key for key in keys},
+            'by_category': by_category,
+            'by_tag': by_tag,
+            'suggest': suggest,
+            # 匹配区间过大时按此顺序挑前几名
+            'suggest_ranked': sorted(cls._suggest_rank(entry) for entry in suggest),
+            'title_entries': title_entries,
+        }
+
+    @staticmethod
+    def _rows_to_items(rows):
+        return {_summary_sort_key(row[10], row[0]): _build_post_summary_item(row) for row in rows}
+
+    def reload(self):
+        """全量重建。开始时记下代数，结束时若代数已变（重建期间有写入或被标记过期），
+        不覆盖现有快照；没有快照可用时仍装入结果但保持过期，下次读取会再重建"""
+        generation = self._generation
+        items = self._rows_to_items(self._loader())
+        snapshot = self._build(items)
+        with self._lock:
+            if generation != self._generation:
+                if self._snapshot is None:
+                    self._snapshot = snapshot
+                    self._loaded_at = 0.0
+                return
+            self._snapshot = snapshot
+            self._loaded_at = time.time()
+
+    def _current(self):
+        snapshot = self._snapshot
+        if snapshot is None or time.time() - self._loaded_at > self._ttl:
+            self.reload()
+            snapshot = self._snapshot
+        return snapshot
+
+    @staticmethod
+    def _sorted_remove(seq, value):
+        i = bisect.bisect_left(seq, value)
+        if i < len(seq) and seq[i] == value:
+            del seq[i]
+
+    def _patch(self, post_id, rows):
+        """单篇文章的增量修补：只改动该文章所在的分类 / 标签桶、排序键与联想条目（二分删除 / 插入），
+        不重建其余索引。各容器先浅拷贝再修改，最后整体替换快照，读路径仍无需加锁"""
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None:
+                return
+            new_items = self._rows_to_items(rows)
+            old_key = snapshot['by_id'].get(post_id)
+            if old_key is None and not new_items:
+                return
+            old_item = snapshot['items'].get(old_key) if old_key is not None else None
+            new_key, new_item = next(iter(new_items.items()), (None, None))
+
+            keys = list(snapshot['keys'])
+            items = dict(snapshot['items'])
+            by_id = dict(snapshot['by_id'])
+            groups = (dict(snapshot['by_category']), dict(snapshot['by_tag']))
+            suggest = list(snapshot['suggest'])
+            ranked = list(snapshot['suggest_ranked'])
+            title_entries = dict(snapshot['title_entries'])
+
+            def names(item):
+                if item is None:
+                    return [], []
+                return ([item['category']] if item['category'] else [],
+                        list(dict.fromkeys(str(t) for t in item['tags'])))
+
+            def drop_entry(entry):
+                self._sorted_remove(suggest, entry)
+                self._sorted_remove(ranked, self._suggest_rank(entry))
+
+            def add_entry(entry):
+                bisect.insort(suggest, entry)
+                bisect.insort(ranked, self._suggest_rank(entry))
+
+            # 受影响的分类 / 标签：先撤下旧的联想条目（权重即桶大小），改桶后按新大小放回
+            old_names, new_names = names(old_item), names(new_item)
+            for kind, bucket_map in enumerate(groups):
+                for name in dict.fromkeys(old_names[kind] + new_names[kind]):
+                    bucket = list(bucket_map.get(name, ()))
+                    if bucket:
+                        drop_entry((_suggest_fold(name), kind, name, len(bucket), None))
+                    if name in old_names[kind]:
+                        self._sorted_remove(bucket, old_key)
+                    if name in new_names[kind]:
+                        bisect.insort(bucket, new_key)
+                    if bucket:
+                        bucket_map[name] = bucket
+                        add_entry((_suggest_fold(name), kind, name, len(bucket), None))
+                    else:
+                        bucket_map.pop(name, None)
+
+            if old_key is not None:
+                self._sorted_remove(keys, old_key)
+                items.pop(old_key, None)
+                by_id.pop(post_id, None)
+                for entry in title_entries.pop(old_key, ()):
+                    drop_entry(entry)
+            if new_key is not None:
+                bisect.insort(keys, new_key)
+                items[new_key] = new_item
+                by_id[post_id] = new_key
+                title_entries[new_key] = self._title_entries(new_key, new_item)
+                for entry in title_entries[new_key]:
+                    add_entry(entry)
+
+            self._snapshot = {
+                'keys': keys,
+                'items': items,
+                'by_id': by_id,
+                'by_category': groups[0],
+                'by_tag': groups[1],
+                'suggest': suggest,
+                'suggest_ranked': ranked,
+                'title_entries': title_entries,
+            }
+            self._generation += 1
+
+    def refresh_post(self, post_id):
+        """重新读取单篇文章；已撤回或已删除时从索引移除"""
+        if self._snapshot is None:
+            return
+        try:
+            rows = self._loader(post_id)
+        except Exception as e:
+            app.logger.warning(f"Post summary index refresh failed for {post_id}: {e}")
+            self.invalidate()
+            return
+        self._patch(post_id, rows)
+
+    def remove_post(self, post_id):
+        self._patch(post_id, [])
+
+    def get(self, post_id):
+        """按 id 取单条摘要，未发布或不存在时返回 None"""
+        snapshot = self._current()
+        key = snapshot['by_id'].get(post_id)
+        return dict(snapshot['items'][key]) if key is not None else None
+
+    def update_counters(self, post_id, **counters):
+        """浏览量/点赞数变化时只替换该条目的字典，不重建索引"""
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None:
+                return
+            key = snapshot['by_id'].get(post_id)
+            if key is None:
+                return
+            item = dict(snapshot['items'][key])
+            item.update(counters)
+            snapshot['items'][key] = item
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+            self._generation += 1
+
+    def mark_stale(self):
+        """保留当前快照但视为过期：列表读路径会同步重建，联想读路径继续用旧快照并在后台重建"""
+        with self._lock:
+            self._loaded_at = 0.0
+            self._generation += 1
+
+    def _reload_in_background(self):
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+
+        def run():
+            try:
+                with app.app_context():
+                    self.reload()
+            except Exception as e:
+                app.logger.warning(f"Post summary index background reload failed: {e}")
+            finally:
+                self._reloading = False
+
+        threading.Thread(target=run, name='post-index-reload', daemon=True).start()
+
+    def suggest(self, prefix, limit=8) -> list:
+        """标题 / 标签 / 分类前缀联想：二分定位匹配区间，只读内存快照。
+        区间不超过 _SUGGEST_SCAN_LIMIT 时整段排名；更大时完全相等的条目优先，其余按快照里预排的
+        全局排名顺序挑出落在区间内的前 limit 个，结果与整段排名一致。
+        快照过期时照常作答并在后台重建，仅进程首次调用时同步加载"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._current()
+        elif time.time() - self._loaded_at > self._ttl:
+            self._reload_in_background()
+        prefix = _suggest_fold(prefix)
+        if not prefix:
+            return []
+
+        entries = snapshot['suggest']
+        start = bisect.bisect_left(entries, (prefix,))
+        end = bisect.bisect_left(entries, (prefix + '\U0010ffff',), start)
+        best = {}
+
+        def consider(entry):
+            folded, kind, text_value, weight, post_key = entry
+            ident = (kind, post_key if kind == 2 else text_value)
+            rank = (folded != prefix, kind, -weight, text_value)
+            if ident not in best or rank < best[ident][0]:
+                best[ident] = (rank, entry)
+
+        if end - start <= _SUGGEST_SCAN_LIMIT:
+            for i in range(start, end):
+                consider(entries[i])
+        else:
+            for i in range(start, bisect.bisect_left(entries, (prefix + '\x00',), start, end)):
+                consider(entries[i])
+            for kind, weight, text_value, folded, post_key in snapshot['suggest_ranked']:
+                if len(best) >= limit:
+                    break
+                if folded.startswith(prefix):
+                    consider((folded, kind, text_value, -weight, post_key or None))
+
+        result = []
+        for _, (_, kind, text_value, weight, post_key) in sorted(best.values(), key=lambda m: m[0])[:limit]:
+            entry = {'type': _SUGGEST_KINDS[kind], 'text': text_value}
+            if kind == 2:
+                item = snapshot['items'][post_key]
+                entry.update({'id': item['id'], 'slug': item['slug']})
+            else:
+                entry['count'] = weight
+            result.append(entry)
+        return result
+
+    @staticmethod
+    def _select(snapshot, category=None, tag=None):
+        if category and tag:
+            items = snapshot['items']
+            return [k for k in snapshot['by_category'].get(category, []) if tag in items[k]['tags']]
+        if category:
+            return snapshot['by_category'].get(category, [])
+        if tag:
+            return snapshot['by_tag'].get(tag, [])
+        return snapshot['keys']
+
+    @staticmethod
+    def _project(item, fields):
+        """按稀疏字段集只拷出所需字段；fields 为空时拷贝完整摘要"""
+        return {f: item[f] for f in fields} if fields else dict(item)
+
+    def page(self, page, per_page, category=None, tag=None, fields=None) -> dict:
+        """返回结构与 _execute_post_list_query 相同"""
+        page = max(1, page)
+        per_page = max(1, per_page)
+        snapshot = self._current()
+        keys = self._select(snapshot, category, tag)
+        total = len(keys)
+        end = max(0, total - (page - 1) * per_page)
+        window = keys[max(0, end - per_page):end][::-1]
+        return {
+            'items': [self._project(snapshot['items'][k], fields) for k in window],
+            'total': total,
+            'pages': (total + per_page - 1) // per_page,
+            'current_page': page
+        }
+
+    def after(self, per_page, cursor=None, category=None, tag=None, with_total=False, fields=None) -> dict:
+        """返回结构与 _execute_post_cursor_query 相同"""
+        snapshot = self._current()
+        return self._cursor_window(snapshot, self._select(snapshot, category, tag), per_page, cursor, with_total,
+                                   fields)
+
+    def archive(self, per_page, period_start, period_end, cursor=None, with_total=False) -> dict:
+        """归档分桶：published_at 落在 [period_start, period_end) 的文章（按前缀比较，如 '2025-03' ~ '2025-04'）。
+        排序键本身按时间有序，桶是连续区间，二分即可取出"""
+        snapshot = self._current()
+        keys = snapshot['keys']
+        lo = bisect.bisect_left(keys, (period_start,))
+        hi = bisect.bisect_left(keys, (period_end,))
+        return self._cursor_window(snapshot, keys[lo:hi], per_page, cursor, with_total)
+
+    @classmethod
+    def _cursor_window(cls, snapshot, keys, per_page, cursor, with_total, fields=None) -> dict:
+        end = len(keys)
+        if cursor:
+            end = bisect.bisect_left(keys, _summary_sort_key(*_decode_post_cursor(cursor)))
+        start = max(0, end - per_page)
+        window = keys[start:end][::-1]
+        result = {
+            'items': [cls._project(snapshot['items'][k], fields) for k in window],
+            'next_cursor': _encode_post_cursor(*window[-1]) if (start > 0 and window) else None,
+            'per_page': per_page
+        }
+        if with_total:
+            result['total'] = len(keys)
+        return result
+
+
+post_summary_index = PostSummaryIndex(_load_post_summary_rows, ttl=int(os.getenv('POST_INDEX_TTL', '60')))
+_seen_posts_version = None
+
+
+def _observe_posts_version(version):
+    """列表接口拿到的 posts 版本号变化时（含其他 worker 的写入），丢弃本进程的总数缓存与摘要索引，
+    保证新 ETag 不会配上旧内容"""
+    global _seen_posts_version
+    if version is None:
+        return
+    if _seen_posts_version is not None and version != _seen_posts_version:
+        _clear_post_count_cache()
+        post_summary_index.mark_stale()
+    _seen_posts_version = version
+
+
+# ============== 相关文章 ==============
+_RELATED_TOP_K = int(os.getenv('RELATED_TOP_K', '8'))
+_RELATED_MODEL_TTL = int(os.getenv('RELATED_MODEL_TTL', '3600'))
+# 相关文章重算任务按 key 合并：排队中的任务把文章 id 并入，None（全量）吸收一切增量
+_related_executor = BoundedExecutor('related-posts', max_workers=1, max_queue=16, overflow='coalesce')
+_BACKGROUND_DRAIN_TIMEOUT = float(os.getenv('BACKGROUND_DRAIN_TIMEOUT', '10'))
+
+
+def _shutdown_background():
+    """进程退出前：通知热门榜线程不再开始新一轮，写回缓冲的浏览量，
+    再在 BACKGROUND_DRAIN_TIMEOUT 秒内排空后台任务队列、等正在进行的热门榜重算做完"""
+    deadline = time.monotonic() + _BACKGROUND_DRAIN_TIMEOUT
+    _trending_state['stop'].set()
+    view_counter.flush()
+    _related_executor.drain(_BACKGROUND_DRAIN_TIMEOUT)
+    thread = _trending_state['thread']
+    if thread is not None:
+        thread.join(max(0.0, deadline - time.monotonic()))
+
+
+# SIGTERM 只负责抛出 SystemExit，写回与排空统一在 atexit 中完成
+atexit.register(_shutdown_background)
+exit_on_sigterm()
+# version：模型反映到的 posts 内容版本号，其他 worker 写入文章后与之对不上，增量更新前先全量重建
+_related_state = {'model': None, 'built_at': 0.0, 'version': None}
+
+
+def _load_related_docs(post_ids=None) -> dict:
+    """读取已发布文章的相似度特征字段；post_ids 为空时读全部"""
+    query = Post.query.filter_by(status='published').with_entities(
+        Post.id, Post.title, Post.excerpt, Post.content, Post.tags, Post.category
+    )
+    if post_ids is not None:
+        query = query.filter(Post.id.in_(list(post_ids)))
+    return {
+        pid: {'title': title, 'excerpt': excerpt, 'content': content,
+              'tags': _normalize_post_tags(tags), 'category': category}
+        for pid, title, excerpt, content, tags, category in query.all()
+    }
+
+
+def _write_related_rows(top: dict, post_ids=None):
+    """把 top-k 写回 post_related；post_ids 为空时整表替换"""
+    table = PostRelated.__table__
+    if post_ids is None:
+        db.session.execute(table.delete())
+        post_ids = list(top)
+    elif post_ids:
+        db.session.execute(table.delete().where(table.c.post_id.in_(list(post_ids))))
+    rows = [
+        {'post_id': pid, 'rank': rank, 'related_id': related_id, 'score': round(score, 6)}
+        for pid in post_ids
+        for rank, (score, related_id) in enumerate(top.get(pid, []))
+    ]
+    if rows:
+        db.session.execute(table.insert(), rows)
+    _touch_content('related')
+    db.session.commit()
+
+
+def _refresh_related_posts(post_ids=None, commits=0):
+    """后台任务：模型未加载、已过期或 post_ids 为空时全量构建；否则只重算这些文章及受影响的 top-k。
+    commits 为本进程这批写入提升 posts 版本的次数（每篇文章一次），版本号对不上说明其他 worker 也改过文章，
+    内存模型已过时，同样全量构建"""
+    try:
+        with app.app_context():
+            model = _related_state['model']
+            version = _content_versions(['posts'])['posts'][0]
+            known = _related_state['version']
+            if (post_ids is None or model is None or known is None or version != known + commits
+                    or time.time() - _related_state['built_at'] > _RELATED_MODEL_TTL):
+                model = RelatedPostsModel(lambda value: _search_tokens(value, for_query=True), top_k=_RELATED_TOP_K)
+                model.build(_load_related_docs())
+                _write_related_rows(model.top)
+                _related_state.update(model=model, built_at=time.time(), version=version)
+                return
+            docs = _load_related_docs(post_ids)
+            changed = set()
+            for post_id in post_ids:
+                changed |= model.update(post_id, docs.get(post_id))
+            _write_related_rows(model.top, changed)
+            _related_state['version'] = version
+    except Exception as e:
+        _related_state['model'] = None
+        app.logger.error(f"Related posts refresh failed: {e}")
+
+
+def _merge_related_refresh(queued_args, new_args):
+    (queued, queued_commits), (new, new_commits) = queued_args, new_args
+    if queued is None or new is None:
+        return (None, 0)
+    return (list(dict.fromkeys(queued + new)), queued_commits + new_commits)
+
+
+def _submit_related_refresh(post_ids=None):
+    args = (list(post_ids), len(post_ids)) if post_ids is not None else (None, 0)
+    accepted = _related_executor.submit(_refresh_related_posts, *args, key='refresh', merge=_merge_related_refresh)
+    if not accepted:
+        app.logger.warning("Related posts refresh dropped: background queue full or shutting down")
+
+
+def ensure_related_posts():
+    """post_related 为空且已有文章发布时，在后台做一次全量构建（升级已有库）"""
+    try:
+        if db.session.query(PostRelated.post_id).first() is None and \
+                Post.query.filter_by(status='published').first() is not None:
+            _submit_related_refresh()
+    except Exception as e:
+        app.logger.warning(f"post_related backfill failed: {e}")
+
+
+def _load_related_rows(post_id) -> list:
+    if uses_sqlalchemy_queries():
+        return (PostRelated.query
+                .with_entities(PostRelated.related_id, PostRelated.score)
+                .filter(PostRelated.post_id == post_id)
+                .order_by(PostRelated.rank.asc())
+                .all())
+    cursor = _get_read_connection().cursor()
+    try:
+        cursor.execute(
+            "SELECT related_id, score FROM post_related WHERE post_id = ? ORDER BY rank",
+            [post_id]
+        )
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+# 热门榜窗口：{window: (窗口长度, 时间衰减半衰期小时数)}
+_TRENDING_WINDOWS = {
+    '24h': (timedelta(hours=24), 6.0),
+    '7d': (timedelta(days=7), 48.0),
+}
+_TRENDING_TOP_K = 20
+_TRENDING_LIKE_WEIGHT = 5
+_TRENDING_REFRESH_INTERVAL = int(os.getenv('TRENDING_REFRESH_INTERVAL', '300'))
+# 小时桶保留天数，需覆盖最长窗口，更早的按天合并
+_ENGAGEMENT_HOURLY_RETENTION_DAYS = max(8, int(os.getenv('ENGAGEMENT_HOURLY_RETENTION_DAYS', '8')))
+_trending_state = {'thread': None, 'lock': threading.Lock(), 'stop': threading.Event()}
+
+
+def _compact_engagement(now):
+    """把保留期之前（按整天对齐）的小时桶合并为天桶；删除行数对不上说明另一进程在合并，本轮放弃"""
+    table = PostEngagement.__table__
+    cutoff = (now - timedelta(days=_ENGAGEMENT_HOURLY_RETENTION_DAYS)).replace(
+        hour=0, minute=0, second=0, microsecond=0)
+    old = db.session.execute(
+        db.select(table.c.post_id, table.c.bucket, table.c.views, table.c.likes)
+        .where(table.c.span == 'hour', table.c.bucket < cutoff)
+    ).all()
+    if not old:
+        return
+    days = {}
+    for post_id, bucket, views, likes in old:
+        day = bucket.replace(hour=0, minute=0, second=0, microsecond=0)
+        totals = days.setdefault(day, {}).setdefault(post_id, [0, 0])
+        totals[0] += views or 0
+        totals[1] += likes or 0
+    deleted = db.session.execute(
+        table.delete().where(table.c.span == 'hour', table.c.bucket < cutoff)
+    ).rowcount
+    if deleted != len(old):
+        db.session.rollback()
+        return
+    for day, deltas in days.items():
+        _bump_engagement(deltas, span='day', bucket=day)
+    db.session.commit()
+
+
+def _trending_scores(rows, now) -> dict:
+    """rows 为 (post_id, span, bucket, views, likes)；返回 {window: [(score, post_id)]}（降序 top-k）。
+    每个桶按其中点距今的时长做指数衰减：score = Σ (views + likes × 权重) × 0.5^(age / 半衰期)"""
+    scores = {window: {} for window in _TRENDING_WINDOWS}
+    for post_id, span, bucket, views, likes in rows:
+        midpoint = bucket + (timedelta(hours=12) if span == 'day' else timedelta(minutes=30))
+        age_hours = max(0.0, (now - midpoint).total_seconds() / 3600)
+        weight = (views or 0) + (likes or 0) * _TRENDING_LIKE_WEIGHT
+        for window, (length, half_life) in _TRENDING_WINDOWS.items():
+            if bucket + (timedelta(days=1) if span == 'day' else timedelta(hours=1)) <= now - length:
+                continue
+            totals = scores[window]
+            totals[post_id] = totals.get(post_id, 0.0) + weight * 0.5 ** (age_hours / half_life)
+    return {
+        window: heapq.nlargest(_TRENDING_TOP_K, ((score, post_id) for post_id, score in totals.items() if score > 0))
+        for window, totals in scores.items()
+    }
+
+
+def _acquire_job_lease(name, ttl) -> bool:
+    """抢占或续期名为 name 的租约（ttl 秒）并提交，返回本进程是否持有"""
+    table = JobLease.__table__
+    owner = f'{socket.gethostname()}:{os.getpid()}'
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    values = {'owner': owner, 'expires_at': now + timedelta(seconds=ttl)}
+    held = db.session.execute(
+        table.update()
+        .where(table.c.name == name, db.or_(table.c.owner == owner, table.c.expires_at < now))
+        .values(**values)
+    ).rowcount > 0
+    if not held:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert().values(name=name, **values))
+            held = True
+        except IntegrityError:
+            # 其他进程持有未过期的租约
+            held = False
+    db.session.commit()
+    return held
+
+
+def _refresh_trending():
+    """后台任务：合并过期小时桶，再按各窗口重算热门榜并整表替换 post_trending。
+    每个 worker 都有重算线程，但只有持有 'trending' 租约的进程执行；
+    排名（各窗口的文章顺序）不变时不重写榜单、不提升 trending 版本，分数沿用上次排名变化时的值"""
+    try:
+        with app.app_context():
+            if not _acquire_job_lease('trending', _TRENDING_REFRESH_INTERVAL * 2):
+                return
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            _compact_engagement(now)
+            table = PostEngagement.__table__
+            earliest = now - max(length for length, _ in _TRENDING_WINDOWS.values()) - timedelta(days=1)
+            rows = db.session.execute(
+                db.select(table.c.post_id, table.c.span, table.c.bucket, table.c.views, table.c.likes)
+                .join(Post.__table__, Post.__table__.c.id == table.c.post_id)
+                .where(table.c.bucket >= earliest, Post.__table__.c.status == 'published')
+            ).all()
+            ranked = _trending_scores(rows, now)
+            trending = PostTrending.__table__
+            new_rows = [
+                {'period': window, 'rank': rank, 'post_id': post_id, 'score': round(score, 6)}
+                for window, top in ranked.items()
+                for rank, (score, post_id) in enumerate(top)
+            ]
+            current = db.session.execute(db.select(trending.c.period, trending.c.rank, trending.c.post_id)).all()
+            if sorted(tuple(row) for row in current) == sorted(
+                    (row['period'], row['rank'], row['post_id']) for row in new_rows):
+                db.session.commit()
+                return
+            db.session.execute(trending.delete())
+            if new_rows:
+                db.session.execute(trending.insert(), new_rows)
+            _touch_content('trending')
+            db.session.commit()
+    except Exception as e:
+        app.logger.error(f"Trending refresh failed: {e}")
+        try:
+            with app.app_context():
+                db.session.rollback()
+        except Exception:
+            pass
+
+
+def _trending_loop():
+    stop = _trending_state['stop']
+    while not stop.is_set():
+        _refresh_trending()
+        stop.wait(_TRENDING_REFRESH_INTERVAL)
+
+
+def _ensure_trending_job():
+    """首次有阅读写库或热门榜请求时启动后台重算线程（每 TRENDING_REFRESH_INTERVAL 秒一次）"""
+    if _trending_state['thread'] is not None or _trending_state['stop'].is_set():
+        return
+    with _trending_state['lock']:
+        if _trending_state['thread'] is None:
+            thread = threading.Thread(target=_trending_loop, name='trending', daemon=True)
+            thread.start()
+            _trending_state['thread'] = thread
+
+
+def _load_trending_rows(window) -> list:
+    if uses_sqlalchemy_queries():
+        return (PostTrending.query
+                .with_entities(PostTrending.post_id, PostTrending.score)
+                .filter(PostTrending.period == window)
+                .order_by(PostTrending.rank.asc())
+                .all())
+    cursor = _get_read_connection().cursor()
+    try:
+        cursor.execute("SELECT post_id, score FROM post_trending WHERE period = ? ORDER BY rank", [window])
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _post_list_response(category, tag, search):
+    """/api/posts/published 与 /api/search 共用：带 cursor 参数（可为空串）时走键集分页。
+    无关键词时由内存摘要索引作答，关键词检索仍走数据库（FTS5 / LIKE）；fields= 为稀疏字段集"""
+    _observe_posts_version(g.get('content_versions', {}).get('posts'))
+    try:
+        fields = _parse_fields(request.args.get('fields'), _POST_LIST_FIELDS)
+    except ValueError as e:
+        return json_response({'success': False, 'message': f'未知字段: {e}'}, 400)
+
+    per_page = request.args.get('per_page', 10, type=int)
+    cursor = request.args.get('cursor')
+    if cursor is None:
+        page = request.args.get('page', 1, type=int)
+        result = None
+        if not search:
+            try:
+                result = post_summary_index.page(page, per_page, category, tag, fields)
+            except Exception as e:
+                app.logger.warning(f"Post summary index unavailable, querying database: {e}")
+        if result is None:
+            result = _execute_post_list_query(page, per_page, category, tag, search, fields)
+        return json_response({'success': True, 'data': result})
+
+    per_page = min(100, max(1, per_page))
+    with_total = request.args.get('with_total') in ('1', 'true')
+    try:
+        if search:
+            result = _execute_post_cursor_query(per_page, cursor.strip(), category, tag, search, with_total, fields)
+        else:
+            result = post_summary_index.after(per_page, cursor.strip(), category, tag, with_total, fields)
+    except ValueError:
+        return json_response({'success': False, 'message': '无效的分页游标'}, 400)
+    return json_response({'success': True, 'data': result})
 
 # API路由
 @app.route('/api/posts/published', methods=['GET'])
+@conditional_get('posts', 'post_stats')
 def get_published_posts():
     """获取已发布的文章列表（用于前台展示）"""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
     category = request.args.get('category')
     tag = request.args.get('tag')
     search = request.args.get('search')
-    
-    result = _execute_post_list_query(page, per_page, category, tag, search)
-    return json_response({
-        'success': True,
-        'data': result
-    })
+    return _post_list_response(category, tag, search)
 
 
 @app.route('/api/search', methods=['GET'])
+@conditional_get('posts', 'post_stats')
 def search_published_posts():
     """搜索已发布的文章"""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
     category = (request.args.get('category') or '').strip()
     tag = (request.args.get('tag') or '').strip()
     search = (request.args.get('search') or '').strip()
+    return _post_list_response(category, tag, search)
 
-    result = _execute_post_list_query(page, per_page, category, tag, search)
-    return json_response({
-        'success': True,
-        'data': result
-    })
+
+@app.route('/api/search/suggest', methods=['GET'])
+def suggest_published_posts():
+    """搜索联想：标题 / 标签 / 分类前缀匹配，只读进程内摘要索引，不访问数据库"""
+    q = (request.args.get('q') or '').strip()[:100]
+    limit = min(20, max(1, request.args.get('limit', 8, type=int)))
+    if not q:
+        return json_response({'success': True, 'data': []})
+    try:
+        data = post_summary_index.suggest(q, limit)
+    except Exception as e:
+        app.logger.warning(f"Suggest index unavailable: {e}")
+        data = []
+    return json_response({'success': True, 'data': data}, cache_control='public, max-age=60')
+
+
+# ============== 服务端 markdown 渲染 ==============
+# 渲染规则变化时递增，旧缓存按 render_key 不匹配自动失效
+_MARKDOWN_RENDERER_VERSION = 1
+_markdown_renderer = None
+
+
+def _get_markdown_renderer():
+    """与前端 utils/markdown.ts 对齐：禁用原始 HTML（输出无需再消毒）、启用排版替换；linkify 依赖 linkify-it-py"""
+    global _markdown_renderer
+    if _markdown_renderer is None:
+        try:
+            import linkify_it  # noqa: F401
+            linkify = True
+        except ImportError:
+            linkify = False
+        md = MarkdownIt('js-default', {'html': False, 'linkify': linkify, 'typographer': True})
+        if not linkify:
+            md.disable('linkify')
+        _markdown_renderer = md
+    return _markdown_renderer
+
+
+def _heading_anchor(text_value: str, seen: dict) -> str:
+    base = re.sub(r'[^\w]+', '-', text_value.casefold()).strip('-') or 'section'
+    count = seen.get(base, 0)
+    seen[base] = count + 1
+    return base if count == 0 else f'{base}-{count + 1}'
+
+
+def _render_markdown(content: str):
+    """markdown → (html, toc)；为每个标题写入锚点 id，toc 为按文档顺序的标题大纲"""
+    md = _get_markdown_renderer()
+    env = {}
+    tokens = md.parse(content or '', env)
+    toc = []
+    seen = {}
+    for i, token in enumerate(tokens):
+        if token.type != 'heading_open' or i + 1 >= len(tokens):
+            continue
+        inline = tokens[i + 1]
+        title = ''.join(child.content for child in (inline.children or [])
+                        if child.type in ('text', 'code_inline')).strip()
+        anchor = _heading_anchor(title, seen)
+        token.attrSet('id', anchor)
+        toc.append({'level': int(token.tag[1]), 'text': title, 'id': anchor})
+    return md.renderer.render(tokens, md.options, env), toc
+
+
+def _post_render_key(content) -> str:
+    """按正文内容哈希取键：浏览量、点赞等计数更新也会刷新 updated_at，不能作为缓存键"""
+    digest = hashlib.sha1((content or '').encode('utf-8')).hexdigest()[:32]
+    return f"{digest}#v{_MARKDOWN_RENDERER_VERSION}"
+
+
+def _load_post_render(post_id):
+    if uses_sqlalchemy_queries():
+        row = PostRender.query.get(post_id)
+        return (row.render_key, row.html, row.toc) if row else None
+    cursor = _get_read_connection().cursor()
+    try:
+        cursor.execute("SELECT render_key, html, toc FROM post_renders WHERE post_id = ?", [post_id])
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    if row is None:
+        return None
+    render_key, html, toc = row
+    try:
+        toc = json.loads(toc) if isinstance(toc, str) else toc
+    except Exception:
+        toc = []
+    return render_key, html, toc
+
+
+def _apply_rendered_content(data: dict):
+    """render=html：按 (id, 正文哈希) 读取持久缓存，未命中时渲染一次并写回；用 content_html + toc 替换 content"""
+    if MarkdownIt is None:
+        return
+    post_id = data['id']
+    render_key = _post_render_key(data.get('content'))
+    cached = _load_post_render(post_id)
+    if cached is not None and cached[0] == render_key:
+        html, toc = cached[1], cached[2] or []
+    else:
+        html, toc = _render_markdown(data.get('content') or '')
+        try:
+            db.session.merge(PostRender(post_id=post_id, render_key=render_key, html=html, toc=toc))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.warning(f"Post render cache write failed for {post_id}: {e}")
+    data.pop('content', None)
+    data['content_html'] = html
+    data['toc'] = toc
 
 
 @app.route('/api/posts/<int:post_id>', methods=['GET'])
+@conditional_get('posts', 'post_stats', precompress=True)
 def get_post(post_id):
-    """获取单篇博客文章"""
+    """获取单篇博客文章；render=html 时返回服务端渲染的 content_html 与标题大纲 toc"""
+    render_html = request.args.get('render') == 'html'
     if uses_sqlalchemy_queries():
         post = Post.query.filter_by(id=post_id, status='published').first()
         if not post:
             return jsonify({'success': False, 'message': 'Post not found or unpublished'}), 404
-        return json_response({'success': True, 'data': _serialize_post_detail(post)})
+        data = _serialize_post_detail(post)
+        data['unique_readers'] = _load_unique_readers([post_id]).get(post_id, 0)
+        if render_html:
+            _apply_rendered_content(data)
+        return json_response({'success': True, 'data': data})
     # 使用直接SQL查询避免SQLAlchemy编码问题
-    import sqlite3
-    import os
-    import json
-    
-    db_path = os.path.join(os.path.dirname(__file__), 'personal_blog.db')
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    cursor = _get_read_connection().cursor()
     
     try:
         cursor.execute("""
@@ -2354,171 +4627,258 @@ def get_post(post_id):
         except:
             tags_list = []
         
-        return json_response({
-            'success': True,
-            'data': {
-                'id': post_id,
-                'title': title,
-                'slug': slug,
-                'content': content,
-                'excerpt': excerpt,
-                'status': status,
-                'cover_url': cover_url,
-                'category': category,
-                'tags': tags_list,
-                'read_time': read_time,
-                'published_at': published_at,
-                'created_at': created_at,
-                'updated_at': updated_at
-            }
-        })
-        
+        data = {
+            'id': post_id,
+            'title': title,
+            'slug': slug,
+            'content': content,
+            'excerpt': excerpt,
+            'status': status,
+            'cover_url': cover_url,
+            'category': category,
+            'tags': tags_list,
+            'read_time': read_time,
+            'published_at': published_at,
+            'created_at': created_at,
+            'updated_at': updated_at
+        }
     finally:
         cursor.close()
-        conn.close()
 
-@app.route('/api/categories/published', methods=['GET'])
-def get_published_categories():
-    if uses_sqlalchemy_queries():
-        rows = (
-            db.session.query(Post.category, db.func.count(Post.id))
-            .filter(Post.status == 'published', Post.category.isnot(None), Post.category != '')
-            .group_by(Post.category)
-            .order_by(db.func.count(Post.id).desc())
-            .all()
-        )
-        return json_response({
-            'success': True,
-            'data': [{'name': category, 'count': count} for category, count in rows]
-        }, cache_control='public, max-age=60, stale-while-revalidate=300')
+    data['unique_readers'] = _load_unique_readers([post_id]).get(post_id, 0)
+    if render_html:
+        _apply_rendered_content(data)
+    return json_response({'success': True, 'data': data})
 
-    """获取已发布文章的分类列表（带文章数量）"""
-    # 使用直接SQL查询避免SQLAlchemy编码问题
-    import sqlite3
-    import os
-    
-    db_path = os.path.join(os.path.dirname(__file__), 'personal_blog.db')
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
+_POST_BATCH_LIMIT = 50
+
+
+@app.route('/api/posts/batch', methods=['GET'])
+@conditional_get('posts', 'post_stats')
+def get_posts_batch():
+    """批量获取已发布文章：ids=1,2&slugs=a,b 一次索引查询解析，结果按 ids 再 slugs 的请求顺序排列，
+    未找到或未发布的位置为 null；fields= 投影返回字段（默认为列表摘要字段）"""
     try:
-        # 统计每个分类下的已发布文章数量
-        cursor.execute("""
-            SELECT category, COUNT(*) as count 
-            FROM posts 
-            WHERE status = 'published' AND category IS NOT NULL AND category != ''
-            GROUP BY category 
-            ORDER BY count DESC
-        """)
-        categories_with_count = cursor.fetchall()
-        
-        return json_response({
-            'success': True,
-            'data': [{
-                'name': cat[0],
-                'count': cat[1]
-            } for cat in categories_with_count]
-        })
-        
+        ids = [int(v) for v in (request.args.get('ids') or '').split(',') if v.strip()]
+    except ValueError:
+        return json_response({'success': False, 'message': 'ids 必须是逗号分隔的整数'}, 400)
+    slugs = [v.strip() for v in (request.args.get('slugs') or '').split(',') if v.strip()]
+    if not ids and not slugs:
+        return json_response({'success': False, 'message': '请提供 ids 或 slugs'}, 400)
+    if len(ids) + len(slugs) > _POST_BATCH_LIMIT:
+        return json_response({'success': False, 'message': f'单次最多 {_POST_BATCH_LIMIT} 篇'}, 400)
+    try:
+        fields = _parse_post_fields(request.args.get('fields'), _POST_LIST_FIELDS)
+    except ValueError as e:
+        return json_response({'success': False, 'message': f'未知字段: {e}'}, 400)
+
+    # 多取 slug 用于按 slug 回填
+    select_fields = fields if 'slug' in fields else fields + ('slug',)
+    unique_ids = list(dict.fromkeys(ids))
+    unique_slugs = list(dict.fromkeys(slugs))
+    if uses_sqlalchemy_queries():
+        conditions = []
+        if unique_ids:
+            conditions.append(Post.id.in_(unique_ids))
+        if unique_slugs:
+            conditions.append(Post.slug.in_(unique_slugs))
+        rows = (Post.query
+                .filter(Post.status == 'published', db.or_(*conditions))
+                .with_entities(*[getattr(Post, f) for f in select_fields])
+                .order_by(Post.published_at.desc())
+                .all())
+    else:
+        conditions = []
+        params = []
+        if unique_ids:
+            conditions.append(f"id IN ({','.join('?' for _ in unique_ids)})")
+            params.extend(unique_ids)
+        if unique_slugs:
+            conditions.append(f"slug IN ({','.join('?' for _ in unique_slugs)})")
+            params.extend(unique_slugs)
+        cursor = _get_read_connection().cursor()
+        try:
+            cursor.execute(f"""
+                SELECT {', '.join(select_fields)} FROM posts
+                WHERE status = 'published' AND ({' OR '.join(conditions)})
+                ORDER BY published_at DESC
+            """, params)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+    by_id = {}
+    by_slug = {}
+    slug_index = select_fields.index('slug')
+    for row in rows:
+        item = _project_post_row(row, fields)
+        by_id[row[0]] = item
+        # slug 重复时取最近发布的一篇
+        by_slug.setdefault(row[slug_index], item)
+    items = [by_id.get(i) for i in ids] + [by_slug.get(slug) for slug in slugs]
+    return json_response({'success': True, 'data': {'items': items}})
+
+
+def _resolve_post_slug(slug: str):
+    """slug → (id, 当前 slug)；先查 posts 唯一索引，未命中再查改名历史，均未命中返回 (None, None)"""
+    if uses_sqlalchemy_queries():
+        row = (Post.query.filter_by(slug=slug, status='published')
+               .with_entities(Post.id, Post.slug).first())
+        if row is None:
+            row = (db.session.query(Post.id, Post.slug)
+                   .join(PostSlugHistory, PostSlugHistory.post_id == Post.id)
+                   .filter(PostSlugHistory.slug == slug, Post.status == 'published')
+                   .first())
+        return (row[0], row[1]) if row else (None, None)
+    cursor = _get_read_connection().cursor()
+    try:
+        cursor.execute("SELECT id, slug FROM posts WHERE slug = ? AND status = 'published'", [slug])
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute("""
+                SELECT posts.id, posts.slug FROM post_slug_history
+                JOIN posts ON posts.id = post_slug_history.post_id
+                WHERE post_slug_history.slug = ? AND posts.status = 'published'
+            """, [slug])
+            row = cursor.fetchone()
     finally:
         cursor.close()
-        conn.close()
+    return (row[0], row[1]) if row else (None, None)
+
+
+@app.route('/api/posts/by-slug/<slug>', methods=['GET'])
+@conditional_get('posts', 'post_stats', precompress=True)
+def get_post_by_slug(slug):
+    """按 slug 获取文章（参数与 /api/posts/<id> 相同）；旧 slug 301 到当前地址"""
+    post_id, current_slug = _resolve_post_slug(slug)
+    if post_id is None:
+        return jsonify({'success': False, 'message': '文章不存在或未发布'}), 404
+    if current_slug != slug:
+        response = redirect(url_for('get_post_by_slug', slug=current_slug, **request.args.to_dict()), code=301)
+        response.headers['Cache-Control'] = 'public, max-age=300'
+        return response
+    return get_post.__wrapped__(post_id)
 
 
-@app.route('/api/tags/published', methods=['GET'])
-def get_published_tags():
-    """获取已发布文章的标签列表（带文章数量），优先使用 SQL 原生聚合"""
+def _load_taxonomy_counts(kind: str) -> list:
+    """单次索引读取计数表，各数据库后端代价一致"""
     if uses_sqlalchemy_queries():
-        # SQLAlchemy 路径（MySQL/PostgreSQL）：优先用 text() 执行 JSON_TABLE，失败回退 Python 聚合
-        tag_counts = {}
+        rows = (TaxonomyCount.query
+                .with_entities(TaxonomyCount.name, TaxonomyCount.count)
+                .filter(TaxonomyCount.kind == kind, TaxonomyCount.count > 0)
+                .order_by(TaxonomyCount.count.desc(), TaxonomyCount.name.asc())
+                .all())
+    else:
+        cursor = _get_read_connection().cursor()
         try:
-            if 'mysql' in db_uri:
-                # MySQL 8+: JSON_TABLE 拆分 tags JSON 数组后 GROUP BY
-                sql = text(
-                    "SELECT jt.tag AS tag, COUNT(*) AS cnt "
-                    "FROM posts, JSON_TABLE(posts.tags, '$[*]' "
-                    "  COLUMNS (tag VARCHAR(100) PATH '$')) AS jt "
-                    "WHERE posts.status = 'published' AND posts.tags IS NOT NULL "
-                    "GROUP BY jt.tag "
-                    "ORDER BY cnt DESC"
-                )
-                rows = db.session.execute(sql).fetchall()
-            else:
-                # PostgreSQL 等其他：fallback 到 Python 聚合（暂无 JSON_TABLE 通用方案）
-                raise RuntimeError('JSON_TABLE not supported on this dialect')
-            for row in rows:
-                tag_counts[row.tag] = int(row.cnt)
-        except Exception as e:
-            app.logger.warning(f"SQL tag aggregation failed, falling back to Python: {e}")
-            # Fallback: 加载已发布文章的 tags 字段后在 Python 聚合
-            rows = Post.query.with_entities(Post.tags).filter(
-                Post.status == 'published',
-                Post.tags.isnot(None)
-            ).all()
-            for row in rows:
-                tags_value = row[0] or []
-                if isinstance(tags_value, str):
-                    try:
-                        tags_value = json.loads(tags_value)
-                    except Exception:
-                        tags_value = []
-                for tag in (tags_value or []):
-                    tag_counts[str(tag)] = tag_counts.get(str(tag), 0) + 1
-
-        tags_with_count = [{'name': tag, 'count': count} for tag, count in tag_counts.items()]
-        return json_response({
-            'success': True,
-            'data': sorted(tags_with_count, key=lambda x: x['count'], reverse=True)
-        }, cache_control='public, max-age=60, stale-while-revalidate=300')
+            cursor.execute(
+                "SELECT name, count FROM taxonomy_counts WHERE kind = ? AND count > 0 "
+                "ORDER BY count DESC, name ASC",
+                [kind]
+            )
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+    return [{'name': name, 'count': int(count)} for name, count in rows]
+
+
+@app.route('/api/posts/<int:post_id>/related', methods=['GET'])
+@conditional_get('posts', 'post_stats', 'related')
+def get_related_posts(post_id):
+    """相关文章：读取预计算的 top-k，摘要字段取自进程内索引"""
+    limit = min(_RELATED_TOP_K, max(1, request.args.get('limit', 5, type=int)))
+    items = []
+    for related_id, score in _load_related_rows(post_id):
+        item = post_summary_index.get(related_id)
+        if item is None:
+            continue
+        item['score'] = round(float(score), 4)
+        items.append(item)
+        if len(items) >= limit:
+            break
+    return json_response({'success': True, 'data': items})
+
+
+@app.route('/api/posts/trending', methods=['GET'])
+@conditional_get('posts', 'post_stats', 'trending')
+def get_trending_posts():
+    """热门文章：window=24h|7d，读取后台任务按时间衰减分数预计算的榜单，摘要字段取自进程内索引"""
+    window = request.args.get('window', '24h')
+    if window not in _TRENDING_WINDOWS:
+        return json_response({'success': False, 'message': f"window 仅支持 {', '.join(_TRENDING_WINDOWS)}"}, 400)
+    limit = min(_TRENDING_TOP_K, max(1, request.args.get('limit', 10, type=int)))
+    _ensure_trending_job()
+    items = []
+    for post_id, score in _load_trending_rows(window):
+        item = post_summary_index.get(post_id)
+        if item is None:
+            continue
+        item['score'] = round(float(score), 4)
+        items.append(item)
+        if len(items) >= limit:
+            break
+    return json_response({'success': True, 'data': items})
 
-    """获取已发布文章的标签列表（带文章数量）"""
-    # 直接 SQLite 路径：使用 SQLite 原生 json_each 完成拆分 + 聚合
-    import sqlite3
-    import os
 
-    db_path = os.path.join(os.path.dirname(__file__), 'personal_blog.db')
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+@app.route('/api/categories/published', methods=['GET'])
+@conditional_get('posts', precompress=True, cache_control='public, max-age=60, stale-while-revalidate=300')
+def get_published_categories():
+    """获取已发布文章的分类列表（带文章数量）"""
+    return json_response({
+        'success': True,
+        'data': _load_taxonomy_counts('category')
+    })
 
-    try:
-        # SQLite 3.38+ 内置 json_each，单条 SQL 完成 tag 拆分 + GROUP BY + COUNT
-        cursor.execute(
-            "SELECT j.value AS tag, COUNT(*) AS cnt "
-            "FROM posts, json_each(posts.tags) j "
-            "WHERE posts.status = 'published' AND posts.tags IS NOT NULL "
-            "GROUP BY j.value "
-            "ORDER BY cnt DESC"
-        )
-        tag_rows = cursor.fetchall()
-
-        # 当 json_each 不可用（极老 SQLite < 3.38）时回退到 Python 聚合
-        if not tag_rows:
-            cursor.execute("SELECT tags FROM posts WHERE status = 'published' AND tags IS NOT NULL AND tags != ''")
-            posts_with_tags = cursor.fetchall()
-            tag_counts = {}
-            for post in posts_with_tags:
-                tags_str = post[0]
-                if tags_str:
-                    try:
-                        tags_list = json.loads(tags_str)
-                        for tag in (tags_list or []):
-                            tag_counts[str(tag)] = tag_counts.get(str(tag), 0) + 1
-                    except Exception:
-                        continue
-            tags_with_count = [{'name': tag, 'count': count} for tag, count in tag_counts.items()]
-        else:
-            tags_with_count = [{'name': row[0], 'count': int(row[1])} for row in tag_rows]
 
+@app.route('/api/tags/published', methods=['GET'])
+@conditional_get('posts', precompress=True, cache_control='public, max-age=60, stale-while-revalidate=300')
+def get_published_tags():
+    """获取已发布文章的标签列表（带文章数量）"""
+    return json_response({
+        'success': True,
+        'data': _load_taxonomy_counts('tag')
+    })
+
+
+@app.route('/api/archive', methods=['GET'])
+@conditional_get('posts', 'post_stats')
+def get_archive():
+    """归档：无参数时返回按年/月分组的直方图；带 year（可选 month）时按游标分页返回该桶的文章摘要"""
+    year = request.args.get('year', type=int)
+    month = request.args.get('month', type=int)
+    if year is None:
+        years = {}
+        for bucket in _load_taxonomy_counts('month'):
+            y, m = (int(part) for part in bucket['name'].split('-'))
+            entry = years.setdefault(y, {'year': y, 'count': 0, 'months': []})
+            entry['count'] += bucket['count']
+            entry['months'].append({'month': m, 'count': bucket['count']})
+        data = sorted(years.values(), key=lambda e: e['year'], reverse=True)
+        for entry in data:
+            entry['months'].sort(key=lambda e: e['month'], reverse=True)
         return json_response({
             'success': True,
-            'data': sorted(tags_with_count, key=lambda x: x['count'], reverse=True)
-        }, cache_control='public, max-age=60, stale-while-revalidate=300')
+            'data': {'years': data, 'total': sum(e['count'] for e in data)}
+        })
 
-    finally:
-        cursor.close()
-        conn.close()
+    if not 1970 <= year <= 9999 or (month is not None and not 1 <= month <= 12):
+        return json_response({'success': False, 'message': '无效的归档年月'}, 400)
+    if month is None:
+        period_start, period_end = f'{year:04d}', f'{year + 1:04d}'
+    else:
+        period_start = f'{year:04d}-{month:02d}'
+        period_end = f'{year + month // 12:04d}-{month % 12 + 1:02d}'
+    per_page = min(100, max(1, request.args.get('per_page', 20, type=int)))
+    try:
+        result = post_summary_index.archive(per_page, period_start, period_end,
+                                            (request.args.get('cursor') or '').strip() or None, with_total=True)
+    except ValueError:
+        return json_response({'success': False, 'message': '无效的分页游标'}, 400)
+    result.update({'year': year, 'month': month})
+    return json_response({'success': True, 'data': result})
 
 @app.route('/api/profile', methods=['GET'])
+@conditional_get('profile')
 def get_profile():
     """获取个人资料"""
     profile = Profile.query.first()
@@ -2609,6 +4969,7 @@ def update_profile():
     profile.updated_at = datetime.now(timezone.utc)
     
     try:
+        _touch_content('profile')
         db.session.commit()
         return jsonify({'message': '个人资料更新成功', 'success': True})
     except Exception as e:
@@ -2661,28 +5022,61 @@ def _hash_ip(ip: str) -> str:
 
 @app.route('/api/posts/<int:post_id>/like', methods=['POST'])
 def like_post(post_id):
-    """点赞文章（公开接口）"""
-    post = Post.query.get_or_404(post_id)
-    ip = _get_client_ip()
-    ip_hash = _hash_ip(ip)
+    """点赞 / 取消点赞（公开接口）：先 DELETE 本人的点赞记录，命中即为取消；未命中再 INSERT。
+    随后一条 UPDATE likes = likes ± 1 同时确认文章存在，支持 RETURNING 的方言直接带回新计数。
+    取消点赞两条语句，点赞三条；并发重复点击由 (post_id, ip_hash) 唯一约束兜底"""
+    ip_hash = _hash_ip(_get_client_ip())
+    likes_table = Like.__table__
+    posts_table = Post.__table__
+
+    def not_found():
+        # 回滚同时撤销未强制外键的库上可能插入的孤儿点赞记录
+        db.session.rollback()
+        return json_response({'success': False, 'message': '文章不存在'}, 404)
 
     try:
-        existing = Like.query.filter_by(post_id=post_id, ip_hash=ip_hash).first()
-        if existing:
-            Like.query.filter_by(post_id=post_id, ip_hash=ip_hash).delete()
-            post.likes = max(0, (post.likes or 0) - 1)
-            liked = False
+        deleted = db.session.execute(
+            likes_table.delete()
+            .where(likes_table.c.post_id == post_id, likes_table.c.ip_hash == ip_hash)
+        ).rowcount
+        if deleted:
+            liked, delta = False, -1
+        else:
+            liked, delta = True, 1
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(likes_table.insert().values(
+                        post_id=post_id, ip_hash=ip_hash, created_at=datetime.now(timezone.utc)))
+            except IntegrityError:
+                # 并发请求已插入同一条点赞记录（计数由它更新），或强制外键的库上文章不存在：
+                # 下面以 +0 的 UPDATE 区分两者
+                delta = 0
+
+        new_likes = db.func.coalesce(posts_table.c.likes, 0) + delta
+        update = (posts_table.update()
+                  .where(posts_table.c.id == post_id)
+                  .values(likes=db.case((new_likes < 0, 0), else_=new_likes)))
+        if db.session.get_bind().dialect.update_returning:
+            row = db.session.execute(update.returning(posts_table.c.likes)).first()
         else:
-            like = Like(post_id=post_id, ip_hash=ip_hash)
-            db.session.add(like)
-            post.likes = (post.likes or 0) + 1
-            liked = True
+            row = None
+            if db.session.execute(update).rowcount:
+                row = db.session.execute(
+                    db.select(posts_table.c.likes).where(posts_table.c.id == post_id)
+                ).first()
+        if row is None:
+            return not_found()
+        if delta:
+            _bump_engagement({post_id: (0, delta)})
+            _touch_content('post_stats')
         db.session.commit()
+        count = row[0] or 0
+        post_summary_index.update_counters(post_id, likes=count)
         return json_response({
             'success': True,
             'data': {
                 'liked': liked,
-                'count': post.likes
+                'count': count
             }
         })
     except Exception as e:
@@ -2690,31 +5084,67 @@ def like_post(post_id):
         return json_response({'success': False, 'message': str(e)}, 500)
 
 
+def _load_like_states(post_ids, ip_hash) -> dict:
+    """{post_id: (liked, count)}：posts 主键 IN 左连接 likes 的 (post_id, ip_hash) 唯一索引，一次查询"""
+    post_ids = list(dict.fromkeys(post_ids))
+    if uses_sqlalchemy_queries():
+        rows = (db.session.query(Post.id, Post.likes, Like.id)
+                .outerjoin(Like, db.and_(Like.post_id == Post.id, Like.ip_hash == ip_hash))
+                .filter(Post.id.in_(post_ids))
+                .all())
+    else:
+        cursor = _get_read_connection().cursor()
+        try:
+            cursor.execute(f"""
+                SELECT posts.id, posts.likes, likes.id
+                FROM posts
+                LEFT JOIN likes ON likes.post_id = posts.id AND likes.ip_hash = ?
+                WHERE posts.id IN ({','.join('?' for _ in post_ids)})
+            """, [ip_hash] + post_ids)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+    return {post_id: (like_id is not None, likes or 0) for post_id, likes, like_id in rows}
+
+
 @app.route('/api/posts/<int:post_id>/like', methods=['GET'])
 def get_like_status(post_id):
     """获取点赞状态（公开接口）"""
-    post = Post.query.get_or_404(post_id)
-    ip = _get_client_ip()
-    ip_hash = _hash_ip(ip)
-
-    existing = Like.query.filter_by(post_id=post_id, ip_hash=ip_hash).first()
+    state = _load_like_states([post_id], _hash_ip(_get_client_ip())).get(post_id)
+    if state is None:
+        return json_response({'success': False, 'message': '文章不存在'}, 404)
     return json_response({
         'success': True,
         'data': {
-            'liked': existing is not None,
-            'count': post.likes or 0
+            'liked': state[0],
+            'count': state[1]
         }
     })
 
 
+@app.route('/api/posts/likes', methods=['GET'])
+def get_like_statuses():
+    """批量获取点赞状态：ids=1,2,3 一次查询返回整页文章卡片的 liked / count，
+    按请求顺序排列，不存在的文章为 null"""
+    try:
+        ids = [int(v) for v in (request.args.get('ids') or '').split(',') if v.strip()]
+    except ValueError:
+        return json_response({'success': False, 'message': 'ids 必须是逗号分隔的整数'}, 400)
+    if not ids:
+        return json_response({'success': False, 'message': '请提供 ids'}, 400)
+    if len(ids) > _POST_BATCH_LIMIT:
+        return json_response({'success': False, 'message': f'单次最多 {_POST_BATCH_LIMIT} 篇'}, 400)
+
+    states = _load_like_states(ids, _hash_ip(_get_client_ip()))
+    items = [{'id': post_id, 'liked': states[post_id][0], 'count': states[post_id][1]}
+             if post_id in states else None for post_id in ids]
+    return json_response({'success': True, 'data': items})
+
+
 @app.route('/api/posts/<int:post_id>/view', methods=['POST'])
 def view_post(post_id):
-    """记录阅读（公开接口）：主请求立即返回 202，写库推到线程池异步执行"""
-    # 主线程不查 DB、不 commit，立即入队后台任务
-    try:
-        _view_executor.submit(_async_increment_view, post_id)
-    except Exception as e:
-        app.logger.error(f"Failed to submit view task: {e}")
+    """记录阅读（公开接口）：主请求立即返回 202，只在内存里累加，由 view_counter 批量写库"""
+    view_counter.add(post_id, reader=_hash_ip(_get_client_ip()))
     return json_response({
         'success': True,
         'data': {
@@ -2735,40 +5165,27 @@ def _sanitize_message(text: str) -> str:
     return t.strip()
 
 
-# 留言频率限制（内存版，单实例生效；多实例需要 Redis 替换）
-_guest_rate = {}
+# 留言频率限制（滑动窗口，存放在 counter_store 中，多 worker 共享）
 def _check_guest_rate(ip_hash: str, window_sec: int = 60, limit: int = 2) -> bool:
-    import time
-    now = time.time()
-    arr = _guest_rate.get(ip_hash, [])
-    arr = [t for t in arr if now - t < window_sec]
-    if len(arr) >= limit:
-        _guest_rate[ip_hash] = arr
-        return False
-    arr.append(now)
-    _guest_rate[ip_hash] = arr
-    return True
+    # 计数存储出错时放行：留言本身要经过审核，不因限流后端故障让留言接口 500
+    try:
+        allowed, _ = counter_store.hit(f'guest:{ip_hash}', limit, window_sec)
+    except Exception as e:
+        app.logger.warning(f"Guestbook rate limit skipped, counter store ({counter_store.backend}) error: {e}")
+        return True
+    return allowed
 
 
 # ============== 留言板（公开） ==============
 @app.route('/api/guestbook/messages', methods=['GET'])
 def list_guestbook():
-    """公开：获取已审核留言（分页）"""
-    page = max(1, int(request.args.get('page', 1)))
-    per_page = min(100, max(1, int(request.args.get('per_page', 20))))
+    """公开：获取已审核留言（cursor 键集分页或 page 分页）"""
     q = GuestMessage.query.filter_by(is_approved=True)
-    total = q.count()
-    rows = q.order_by(GuestMessage.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
-    items = [_message_to_dict(c) for c in rows]
-    # 附关联文章
-    post_ids = list({it['referenced_post_id'] for it in items if it['referenced_post_id']})
-    posts_map = {}
-    if post_ids:
-        for p in Post.query.filter(Post.id.in_(post_ids)).all():
-            posts_map[p.id] = {'id': p.id, 'title': p.title, 'slug': p.slug}
-    for it in items:
-        it['referenced_post'] = posts_map.get(it['referenced_post_id']) if it['referenced_post_id'] else None
-    return json_response({'success': True, 'data': {'items': items, 'total': total, 'page': page, 'per_page': per_page}})
+    try:
+        data = _guestbook_page(q, _guestbook_counts()['approved'])
+    except ValueError:
+        return json_response({'success': False, 'message': '无效的分页游标'}, 400)
+    return json_response({'success': True, 'data': data})
 
 
 @app.route('/api/guestbook/messages', methods=['POST'])
@@ -2812,6 +5229,7 @@ def create_guestbook():
             is_approved=False,
         )
         db.session.add(m)
+        _apply_guestbook_deltas({}, _guestbook_state(m))
         db.session.commit()
         return json_response({'success': True, 'message': '留言提交成功，等待审核后显示', 'data': {'id': m.id}})
     except Exception as e:
@@ -2971,6 +5389,16 @@ def get_blog_stats():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
+@app.route('/api/admin/background/stats', methods=['GET'])
+@jwt_required_admin
+def get_background_stats():
+    """后台任务观测：浏览量写回缓冲与后台执行器的队列深度、丢弃 / 合并计数与耗时"""
+    return jsonify({'success': True, 'data': {
+        'view_counter': view_counter.stats(),
+        'executors': [_related_executor.stats()],
+    }})
+
+
 # 安全管理接口
 @app.route('/api/admin/security/stats', methods=['GET'])
 @jwt_required_admin
@@ -2982,7 +5410,7 @@ def get_security_stats():
 @app.route('/api/admin/security/blacklist', methods=['GET'])
 @jwt_required_admin
 def get_blacklist():
-    blacklist = [{'ip': ip, **info} for ip, info in security.ip_blacklist.items()]
+    blacklist = [{'ip': ip, **info} for ip, info in security.get_blacklist().items()]
     return jsonify({'success': True, 'data': blacklist})
 
 
@@ -3118,8 +5546,15 @@ def bootstrap():
 
         with app.app_context():
             db.create_all()
+            ensure_sqlite_wal()
             ensure_mysql_utf8mb4()
             ensure_profile_schema()
+            ensure_post_listing_schema()
+            ensure_search_index()
+            ensure_post_tags()
+            ensure_taxonomy_counts()
+            ensure_guestbook_counts()
+            ensure_related_posts()
             ensure_default_admin()
     except Exception as e:
         try:
@@ -0,0 +1,163 @@
+"""有界后台执行器：固定容量的任务队列 + 显式溢出策略 + 队列深度 / 等待与执行耗时指标 + 退出时限时排空。
+
+溢出策略：
+- coalesce：带 key 的任务若已有同 key 任务在排队，则合并进排队中的那一个（merge 合并参数，缺省保留原任务），
+  不占新的队列位置；队列已满且无法合并时丢弃并计数；
+- drop：队列已满时丢弃新任务并计数。
+
+submit 从不阻塞调用方，请求线程可以放心在返回前提交任务。
+"""
+import collections
+import logging
+import signal
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class _Task:
+    __slots__ = ('fn', 'args', 'key', 'enqueued_at')
+
+    def __init__(self, fn, args, key):
+        self.fn = fn
+        self.args = args
+        self.key = key
+        self.enqueued_at = time.monotonic()
+
+
+class BoundedExecutor:
+    def __init__(self, name, max_workers=1, max_queue=1000, overflow='drop'):
+        if overflow not in ('coalesce', 'drop'):
+            raise ValueError('overflow 仅支持 coalesce / drop')
+        self.name = name
+        self._max_workers = max_workers
+        self._max_queue = max_queue
+        self._overflow = overflow
+        self._queue = collections.deque()
+        self._queued_by_key = {}
+        self._cond = threading.Condition()
+        self._workers = []
+        self._running = 0
+        self._closed = False
+        self._stats = {
+            'submitted': 0, 'completed': 0, 'failed': 0, 'dropped': 0, 'coalesced': 0,
+            'max_depth': 0, 'wait_total': 0.0, 'wait_max': 0.0, 'run_total': 0.0, 'run_max': 0.0,
+        }
+
+    def submit(self, fn, *args, key=None, merge=None) -> bool:
+        """入队一个任务，返回是否被接受（合并进已排队任务也算接受）"""
+        with self._cond:
+            if self._closed:
+                self._stats['dropped'] += 1
+                return False
+            if self._overflow == 'coalesce' and key is not None and key in self._queued_by_key:
+                queued = self._queued_by_key[key]
+                if merge is not None:
+                    queued.args = merge(queued.args, args)
+                self._stats['coalesced'] += 1
+                return True
+            if len(self._queue) >= self._max_queue:
+                self._stats['dropped'] += 1
+                return False
+            task = _Task(fn, args, key)
+            self._queue.append(task)
+            if key is not None:
+                self._queued_by_key[key] = task
+            self._stats['submitted'] += 1
+            self._stats['max_depth'] = max(self._stats['max_depth'], len(self._queue))
+            self._ensure_workers()
+            self._cond.notify()
+            return True
+
+    def _ensure_workers(self):
+        if len(self._workers) < min(self._max_workers, self._running + len(self._queue)):
+            worker = threading.Thread(target=self._work, name=f'{self.name}-{len(self._workers)}', daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                task = self._queue.popleft()
+                if task.key is not None and self._queued_by_key.get(task.key) is task:
+                    del self._queued_by_key[task.key]
+                self._running += 1
+                waited = time.monotonic() - task.enqueued_at
+            started = time.monotonic()
+            failed = False
+            try:
+                task.fn(*task.args)
+            except Exception:
+                failed = True
+                logger.exception(f'Background task failed in {self.name}')
+            elapsed = time.monotonic() - started
+            with self._cond:
+                self._running -= 1
+                stats = self._stats
+                stats['failed' if failed else 'completed'] += 1
+                stats['wait_total'] += waited
+                stats['wait_max'] = max(stats['wait_max'], waited)
+                stats['run_total'] += elapsed
+                stats['run_max'] = max(stats['run_max'], elapsed)
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            depth, running = len(self._queue), self._running
+        finished = stats['completed'] + stats['failed']
+        return {
+            'name': self.name,
+            'overflow': self._overflow,
+            'queue_depth': depth,
+            'queue_capacity': self._max_queue,
+            'running': running,
+            'max_depth': stats['max_depth'],
+            'submitted': stats['submitted'],
+            'completed': stats['completed'],
+            'failed': stats['failed'],
+            'dropped': stats['dropped'],
+            'coalesced': stats['coalesced'],
+            'avg_wait_ms': round(stats['wait_total'] / finished * 1000, 2) if finished else 0.0,
+            'max_wait_ms': round(stats['wait_max'] * 1000, 2),
+            'avg_run_ms': round(stats['run_total'] / finished * 1000, 2) if finished else 0.0,
+            'max_run_ms': round(stats['run_max'] * 1000, 2),
+        }
+
+    def drain(self, timeout=10.0) -> int:
+        """停止接收新任务并等待已排队与执行中的任务完成，最多等 timeout 秒；返回未完成的任务数"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            while (self._queue or self._running) and self._workers:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            left = len(self._queue) + self._running
+        if left:
+            logger.warning(f'{self.name}: {left} background task(s) unfinished at shutdown')
+        return left
+
+
+def exit_on_sigterm():
+    """SIGTERM 仍是默认处理时（flask run / 直接 python app.py），收到信号抛出 SystemExit 正常退出，
+    写回与排空交给 atexit。处理函数本身不做这些工作：信号会在主线程任意位置打断执行，
+    主线程若正持有某个非重入锁，处理函数里再去获取同一把锁就会死锁。
+    gunicorn 等已自行接管 SIGTERM 的进程会在退出时走 atexit，这里不覆盖它们的处理函数"""
+    if threading.current_thread() is not threading.main_thread():
+        return False
+    if signal.getsignal(signal.SIGTERM) not in (signal.SIG_DFL, None):
+        return False
+
+    def handler(signum, frame):
+        raise SystemExit(128 + signum)
+
+    signal.signal(signal.SIGTERM, handler)
+    return True
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+公开 API 静态快照构建脚本
+
+把公开 GET 接口（文章列表各页、分类、标签、归档、个人资料、每篇文章、相册、收藏、友链、sitemap）
+渲染成磁盘上的 JSON / XML 文件，供 CDN 或静态文件服务器直接响应读流量，无需启动 Python。
+
+文件路径与接口路径一一对应：/api/posts/12 -> api/posts/12.json，
+/api/posts/published?page=2 -> api/posts/published/page/2.json（第 1 页另存为 api/posts/published.json）。
+
+增量构建：_manifest.json 记录每个文件上次的 ETag 与站点根地址，重建时带 If-None-Match 请求，
+资源版本未变的接口直接 304（不查库、不序列化）；内容没变的文件不重写，已下线的文章 / 相册对应文件会被删除。
+站点根地址变化时自动全量重建。
+
+sitemap 中的链接取自站点根地址：--base-url，缺省为环境变量 SITE_URL，两者都没有时拒绝构建
+（否则会写出 http://localhost/ 链接）。
+
+静态服务器需把带查询参数的分页请求改写到对应文件，其余路径直接加 .json，例如 nginx：
+
+    location = /api/posts/published {
+        if ($arg_page ~ "^[0-9]+$") { rewrite ^ /api/posts/published/page/$arg_page.json? last; }
+        try_files /api/posts/published.json =404;
+    }
+    location /api/ {
+        default_type application/json;
+        try_files $uri.json @backend;
+    }
+
+用法：
+    python build_snapshot.py [--out DIR] [--full] [--base-url https://example.com]
+"""
+
+import argparse
+import json
+import os
+import urllib.parse
+
+try:
+    from app import Album, Post, app
+except ImportError:
+    from backend.app import Album, Post, app
+
+MANIFEST_NAME = '_manifest.json'
+DEFAULT_OUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshot')
+
+# 与数据无关的固定接口：(接口 URL, 输出文件)
+STATIC_TARGETS = (
+    ('/api/posts/published', 'api/posts/published.json'),
+    ('/api/categories/published', 'api/categories/published.json'),
+    ('/api/tags/published', 'api/tags/published.json'),
+    ('/api/archive', 'api/archive.json'),
+    ('/api/profile', 'api/profile.json'),
+    ('/api/albums', 'api/albums.json'),
+    ('/api/music-favorites', 'api/music-favorites.json'),
+    ('/api/movie-favorites', 'api/movie-favorites.json'),
+    ('/api/friend-links', 'api/friend-links.json'),
+    ('/sitemap.xml', 'sitemap.xml'),
+)
+
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'files': {}}
+
+
+def write_file(out_dir, rel_path, body):
+    """内容不变时不重写（保留 mtime，方便 rsync / CDN 同步只推送变化的文件）；写入走临时文件 + 原子替换"""
+    path = os.path.join(out_dir, rel_path)
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == body:
+                return False
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(body)
+    os.replace(tmp_path, path)
+    return True
+
+
+def collect_targets(client, base_url='http://localhost'):
+    """固定接口 + 按当前数据展开的文章分页、文章详情与相册详情"""
+    targets = list(STATIC_TARGETS)
+    with app.app_context():
+        posts = (Post.query.with_entities(Post.id, Post.slug)
+                 .filter(Post.status == 'published').order_by(Post.id.asc()).all())
+        album_ids = [album_id for (album_id,) in Album.query.with_entities(Album.id).order_by(Album.id.asc()).all()]
+
+    first_page = client.get('/api/posts/published', base_url=base_url).get_json() or {}
+    pages = (first_page.get('data') or {}).get('pages') or 1
+    for page in range(1, pages + 1):
+        targets.append((f'/api/posts/published?page={page}', f'api/posts/published/page/{page}.json'))
+    for post_id, slug in posts:
+        targets.append((f'/api/posts/{post_id}', f'api/posts/{post_id}.json'))
+        if slug:
+            quoted = urllib.parse.quote(slug, safe='')
+            targets.append((f'/api/posts/by-slug/{quoted}', f'api/posts/by-slug/{quoted}.json'))
+    for album_id in album_ids:
+        targets.append((f'/api/albums/{album_id}', f'api/albums/{album_id}.json'))
+    return targets
+
+
+def build_snapshot(out_dir=DEFAULT_OUT_DIR, full=False, base_url=None):
+    """base_url 为站点根地址，作为渲染请求的 host；缺省取 SITE_URL"""
+    base_url = (base_url or os.getenv('SITE_URL') or '').strip().rstrip('/')
+    if not base_url:
+        raise ValueError('需要 --base-url 或环境变量 SITE_URL，否则 sitemap 会写出 localhost 链接')
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {} if full else load_manifest(out_dir)
+    previous = manifest.get('files', {}) if manifest.get('base_url') == base_url else {}
+    client = app.test_client()
+    files = {}
+    stats = {'written': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+
+    for url, rel_path in collect_targets(client, base_url):
+        old = previous.get(rel_path)
+        headers = {}
+        if old and old.get('etag') and os.path.exists(os.path.join(out_dir, rel_path)):
+            headers['If-None-Match'] = f'"{old["etag"]}"'
+        response = client.get(url, headers=headers, base_url=base_url)
+        if response.status_code == 304:
+            files[rel_path] = old
+            stats['unchanged'] += 1
+            continue
+        if response.status_code != 200:
+            print(f"❌ {url}: HTTP {response.status_code}")
+            stats['failed'] += 1
+            continue
+        etag, _ = response.get_etag()
+        files[rel_path] = {'url': url, 'etag': etag}
+        if write_file(out_dir, rel_path, response.get_data()):
+            print(f"✅ {rel_path}")
+            stats['written'] += 1
+        else:
+            stats['unchanged'] += 1
+
+    # 本次没有生成的旧文件（文章撤回 / 删除、页数减少）从快照中移除
+    for rel_path in set(manifest.get('files', {})) - set(files):
+        try:
+            os.remove(os.path.join(out_dir, rel_path))
+            print(f"🗑️  {rel_path}")
+            stats['removed'] += 1
+        except OSError:
+            pass
+
+    write_file(out_dir, MANIFEST_NAME,
+               json.dumps({'base_url': base_url, 'files': files},
+                          ensure_ascii=False, indent=2, sort_keys=True).encode('utf-8'))
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='把公开 API 渲染为静态 JSON 快照')
+    parser.add_argument('--out', default=DEFAULT_OUT_DIR, help='输出目录（默认 backend/snapshot）')
+    parser.add_argument('--full', action='store_true', help='忽略 _manifest.json，全部重新渲染')
+    parser.add_argument('--base-url', help='站点根地址，用于 sitemap 链接（默认取 SITE_URL）')
+    args = parser.parse_args()
+
+    base_url = args.base_url or os.getenv('SITE_URL')
+    if not base_url:
+        parser.error('需要 --base-url 或环境变量 SITE_URL，否则 sitemap 会写出 localhost 链接')
+    # sitemap 优先读 SITE_URL，命令行指定的地址要覆盖它
+    os.environ['SITE_URL'] = base_url
+    stats = build_snapshot(args.out, full=args.full, base_url=base_url)
+    print(f"📦 快照完成：写入 {stats['written']}，未变 {stats['unchanged']}，"
+          f"删除 {stats['removed']}，失败 {stats['failed']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,276 @@
+"""计数与限流的存储后端：滑动窗口计数器 + 带过期时间的键值（登录锁定、IP 黑名单），
+供多个 gunicorn worker 共享同一份限流状态。
+
+- memory：进程内字典，仅单进程有效（开发 / 测试默认）；
+- sqlite：本机共享的 SQLite 文件，BEGIN IMMEDIATE 保证同机多 worker 的原子性；
+- redis：Lua 脚本在服务端原子执行，适合多机部署。
+
+所有后端提供相同接口：
+    hit(key, limit, window)  -> (allowed, count)  窗口内未达 limit 时记一次并放行，否则拒绝且不记录
+    get(key) / put(key, value, ttl) / delete(key) / scan(prefix) / clear(prefix)
+"""
+import collections
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCounterStore:
+    backend = 'memory'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hits = {}    # key -> deque[时间戳]
+        self._values = {}  # key -> (value, 过期时间 | None)
+
+    def hit(self, key, limit, window):
+        now = time.time()
+        with self._lock:
+            hits = self._hits.setdefault(key, collections.deque())
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+            if len(hits) >= limit:
+                return False, len(hits)
+            hits.append(now)
+            return True, len(hits)
+
+    def _live(self, key, now):
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires <= now:
+            del self._values[key]
+            return None
+        return value
+
+    def get(self, key):
+        with self._lock:
+            return self._live(key, time.time())
+
+    def put(self, key, value, ttl=None):
+        with self._lock:
+            self._values[key] = (value, time.time() + ttl if ttl else None)
+
+    def delete(self, key):
+        with self._lock:
+            existed = self._live(key, time.time()) is not None
+            self._values.pop(key, None)
+            self._hits.pop(key, None)
+            return existed
+
+    def scan(self, prefix):
+        now = time.time()
+        with self._lock:
+            found = {key: self._live(key, now) for key in list(self._values) if key.startswith(prefix)}
+        return {key: value for key, value in found.items() if value is not None}
+
+    def clear(self, prefix):
+        with self._lock:
+            for table in (self._values, self._hits):
+                for key in [k for k in table if k.startswith(prefix)]:
+                    del table[key]
+
+
+class SQLiteCounterStore:
+    """同一台机器上的多个 worker 共享一个 SQLite 文件；每次 hit 在 BEGIN IMMEDIATE 写事务内完成清理、计数与记录"""
+    backend = 'sqlite'
+    _PURGE_EVERY = 500
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        # 多个请求线程共用下面两个字段，读改写在锁内完成
+        self._purge_lock = threading.Lock()
+        self._hits_since_purge = 0
+        self._max_window = 0
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS counter_hits (key TEXT NOT NULL, ts REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_counter_hits_key_ts ON counter_hits (key, ts)")
+        conn.execute("CREATE TABLE IF NOT EXISTS counter_values "
+                     "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL)")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, fn):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _due_for_purge(self, window):
+        """记一次 hit；每 _PURGE_EVERY 次恰好返回一次 (True, 最大窗口)，其余返回 (False, 最大窗口)"""
+        with self._purge_lock:
+            self._max_window = max(self._max_window, window)
+            self._hits_since_purge += 1
+            if self._hits_since_purge < self._PURGE_EVERY:
+                return False, self._max_window
+            self._hits_since_purge = 0
+            return True, self._max_window
+
+    def hit(self, key, limit, window):
+        now = time.time()
+        purge, max_window = self._due_for_purge(window)
+
+        def apply(conn):
+            if purge:
+                # 其他 key 的过期记录顺带清理，避免表无限增长
+                conn.execute("DELETE FROM counter_hits WHERE ts <= ?", [now - max_window])
+                conn.execute("DELETE FROM counter_values WHERE expires IS NOT NULL AND expires <= ?", [now])
+            conn.execute("DELETE FROM counter_hits WHERE key = ? AND ts <= ?", [key, now - window])
+            count = conn.execute("SELECT COUNT(*) FROM counter_hits WHERE key = ?", [key]).fetchone()[0]
+            if count >= limit:
+                return False, count
+            conn.execute("INSERT INTO counter_hits (key, ts) VALUES (?, ?)", [key, now])
+            return True, count + 1
+
+        return self._write(apply)
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM counter_values WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            [key, time.time()]
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, value, ttl=None):
+        expires = time.time() + ttl if ttl else None
+        self._write(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO counter_values (key, value, expires) VALUES (?, ?, ?)",
+            [key, json.dumps(value, ensure_ascii=False), expires]
+        ))
+
+    def delete(self, key):
+        existed = self.get(key) is not None
+
+        def apply(conn):
+            conn.execute("DELETE FROM counter_values WHERE key = ?", [key])
+            conn.execute("DELETE FROM counter_hits WHERE key = ?", [key])
+
+        self._write(apply)
+        return existed
+
+    def scan(self, prefix):
+        rows = self._conn().execute(
+            "SELECT key, value FROM counter_values "
+            "WHERE substr(key, 1, ?) = ? AND (expires IS NULL OR expires > ?)",
+            [len(prefix), prefix, time.time()]
+        ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def clear(self, prefix):
+        def apply(conn):
+            for table in ('counter_values', 'counter_hits'):
+                conn.execute(f"DELETE FROM {table} WHERE substr(key, 1, ?) = ?", [len(prefix), prefix])
+
+        self._write(apply)
+
+
+# KEYS[1] = 计数键；ARGV = 当前毫秒时间戳、窗口毫秒数、上限、本次记录的唯一成员
+_REDIS_HIT_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', tonumber(ARGV[1]) - tonumber(ARGV[2]))
+local count = redis.call('ZCARD', KEYS[1])
+if count >= tonumber(ARGV[3]) then
+    return {0, count}
+end
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[4])
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+return {1, count + 1}
+"""
+
+
+class RedisCounterStore:
+    """滑动窗口用有序集合（成员为唯一 id、分数为时间戳），清理 + 计数 + 记录在 Lua 脚本中一次原子完成"""
+    backend = 'redis'
+
+    def __init__(self, client, namespace='blog:'):
+        self._client = client
+        self._namespace = namespace
+        self._hit_script = client.register_script(_REDIS_HIT_SCRIPT)
+
+    def _key(self, key):
+        return f'{self._namespace}{key}'
+
+    def hit(self, key, limit, window):
+        now_ms = int(time.time() * 1000)
+        allowed, count = self._hit_script(
+            keys=[self._key(f'hits:{key}')],
+            args=[now_ms, int(window * 1000), limit, f'{now_ms}-{uuid.uuid4().hex}'],
+        )
+        return bool(int(allowed)), int(count)
+
+    def get(self, key):
+        raw = self._client.get(self._key(f'value:{key}'))
+        return json.loads(raw) if raw is not None else None
+
+    def put(self, key, value, ttl=None):
+        self._client.set(self._key(f'value:{key}'), json.dumps(value, ensure_ascii=False),
+                         px=int(ttl * 1000) if ttl else None)
+
+    def delete(self, key):
+        removed = self._client.delete(self._key(f'value:{key}'), self._key(f'hits:{key}'))
+        return bool(removed)
+
+    def scan(self, prefix):
+        keys = list(self._client.scan_iter(match=self._key(f'value:{prefix}*')))
+        if not keys:
+            return {}
+        strip = len(self._key('value:'))
+        result = {}
+        for raw_key, raw in zip(keys, self._client.mget(keys)):
+            if raw is not None:
+                raw_key = raw_key.decode('utf-8') if isinstance(raw_key, bytes) else raw_key
+                result[raw_key[strip:]] = json.loads(raw)
+        return result
+
+    def clear(self, prefix):
+        for pattern in (f'value:{prefix}*', f'hits:{prefix}*'):
+            keys = list(self._client.scan_iter(match=self._key(pattern)))
+            if keys:
+                self._client.delete(*keys)
+
+
+def create_counter_store(backend=None, redis_url=None, sqlite_path=None):
+    """按 COUNTER_BACKEND（memory / sqlite / redis）创建后端；未指定时有 REDIS_URL 用 redis，否则进程内存。
+    redis 不可用时退回进程内存并记录警告"""
+    redis_url = redis_url if redis_url is not None else os.getenv('REDIS_URL')
+    backend = (backend or os.getenv('COUNTER_BACKEND') or ('redis' if redis_url else 'memory')).lower()
+    if backend == 'redis':
+        if redis is None or not redis_url:
+            logger.warning('COUNTER_BACKEND=redis but redis package or REDIS_URL is missing; using memory store')
+            return MemoryCounterStore()
+        try:
+            client = redis.Redis.from_url(redis_url, socket_timeout=1, socket_connect_timeout=1)
+            client.ping()
+            return RedisCounterStore(client)
+        except Exception as e:
+            logger.warning(f'Redis counter store unavailable ({e}); using memory store')
+            return MemoryCounterStore()
+    if backend == 'sqlite':
+        import tempfile
+        path = sqlite_path or os.getenv('COUNTER_SQLITE_PATH') or os.path.join(tempfile.gettempdir(), 'blog_counters.db')
+        return SQLiteCounterStore(path)
+    return MemoryCounterStore()
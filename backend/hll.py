@@ -0,0 +1,57 @@
+"""HyperLogLog 基数估计：用固定 2^precision 个 1 字节寄存器估计不同元素个数（默认 4096 个寄存器，标准误差约 1.6%）。
+
+每篇文章的独立读者只需一份草图，内存与读者数无关；草图可按寄存器取最大值合并，
+合并满足交换律且幂等，多个进程各自累积后写回同一份持久化草图不会重复计数。
+序列化为 zlib 压缩的 [precision, 寄存器...]，读者少时大部分寄存器为 0，压缩后只有几十字节。
+"""
+import hashlib
+import math
+import zlib
+
+_INVERSE_POWERS = [2.0 ** -rank for rank in range(65)]
+
+
+class HyperLogLog:
+    def __init__(self, precision=12, registers=None):
+        if not 4 <= precision <= 16:
+            raise ValueError('precision 必须在 4 到 16 之间')
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.size)
+        if len(self.registers) != self.size:
+            raise ValueError('寄存器数量与 precision 不一致')
+
+    def add(self, value: str) -> bool:
+        """加入一个元素，返回寄存器是否发生变化"""
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest()
+        hashed = int.from_bytes(digest, 'big')
+        bits = 64 - self.precision
+        index = hashed >> bits
+        rank = bits - (hashed & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def merge(self, other: 'HyperLogLog'):
+        if other.precision != self.precision:
+            raise ValueError('precision 不同的草图不能合并')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        size = self.size
+        alpha = 0.7213 / (1 + 1.079 / size) if size >= 128 else {16: 0.673, 32: 0.697, 64: 0.709}[size]
+        estimate = alpha * size * size / sum(_INVERSE_POWERS[r] for r in self.registers)
+        zeros = self.registers.count(0)
+        # 小基数时改用线性计数
+        if estimate <= 2.5 * size and zeros:
+            estimate = size * math.log(size / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(bytes([self.precision]) + bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> 'HyperLogLog':
+        raw = zlib.decompress(blob)
+        return cls(raw[0], raw[1:])
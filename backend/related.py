@@ -0,0 +1,156 @@
+"""相关文章引擎：稀疏 TF-IDF（标题、摘要、正文词元 + 标签、分类特征）的余弦相似度，维护每篇文章的 top-k。
+
+向量用 {term: weight} 字典表示，相似度通过倒排表做稀疏矩阵乘（只累加共享词元的文章），
+不依赖 NumPy / SciPy。单篇文章变化时只重算它自己的向量与受影响文章的 top-k；
+增量更新时其他文章的向量沿用旧的 IDF；文章数相对上次全量构建变化超过 drift_threshold（比例）时，
+用已有词频就地重算全部向量与 top-k，避免相似度逐渐偏离全量构建的结果。
+"""
+import heapq
+import math
+
+
+class RelatedPostsModel:
+    def __init__(self, tokenize, top_k=8, max_terms=200, max_df=0.5,
+                 title_weight=3, tag_weight=3, category_weight=2, drift_threshold=0.1):
+        self._tokenize = tokenize
+        self.top_k = top_k
+        self._max_terms = max_terms
+        self._max_df = max_df
+        self._title_weight = title_weight
+        self._tag_weight = tag_weight
+        self._category_weight = category_weight
+        self._drift_threshold = drift_threshold
+        self._indexed_size = 0  # 上次全量计算向量时的文章数
+        self._counts = {}    # post_id -> {term: 词频}
+        self._df = {}        # term -> 文档频率
+        self._vectors = {}   # post_id -> {term: 归一化权重}
+        self._postings = {}  # term -> {post_id: 权重}
+        self.top = {}        # post_id -> [(score, related_id)]，按 score 降序
+
+    def _term_counts(self, doc) -> dict:
+        counts = {}
+
+        def add(term, times=1):
+            counts[term] = counts.get(term, 0) + times
+
+        for term in self._tokenize(doc.get('title') or ''):
+            add(term, self._title_weight)
+        for field in ('excerpt', 'content'):
+            for term in self._tokenize(doc.get(field) or ''):
+                add(term)
+        for tag in doc.get('tags') or []:
+            add(f'tag:{tag}', self._tag_weight)
+        if doc.get('category'):
+            add(f"category:{doc['category']}", self._category_weight)
+        return counts
+
+    def _vectorize(self, counts) -> dict:
+        n = len(self._counts)
+        df_limit = max(2, self._max_df * n)
+        weights = {}
+        for term, tf in counts.items():
+            df = self._df.get(term, 0)
+            # 过于常见的词当作停用词
+            if df > df_limit:
+                continue
+            weights[term] = (1.0 + math.log(tf)) * (math.log((1.0 + n) / (1.0 + df)) + 1.0)
+        if len(weights) > self._max_terms:
+            weights = dict(heapq.nlargest(self._max_terms, weights.items(), key=lambda kv: kv[1]))
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        return {term: w / norm for term, w in weights.items()} if norm else {}
+
+    def _index(self, post_id):
+        vector = self._vectorize(self._counts[post_id])
+        self._vectors[post_id] = vector
+        for term, weight in vector.items():
+            self._postings.setdefault(term, {})[post_id] = weight
+
+    def _unindex(self, post_id):
+        for term in self._vectors.pop(post_id, {}):
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(post_id, None)
+                if not posting:
+                    del self._postings[term]
+
+    def _similarities(self, post_id) -> dict:
+        scores = {}
+        for term, weight in self._vectors.get(post_id, {}).items():
+            for other, other_weight in self._postings.get(term, {}).items():
+                if other != post_id:
+                    scores[other] = scores.get(other, 0.0) + weight * other_weight
+        return scores
+
+    def _rank(self, scores) -> list:
+        return heapq.nlargest(self.top_k, ((score, other) for other, score in scores.items() if score > 0))
+
+    def build(self, docs: dict):
+        """全量构建：docs 为 {post_id: {'title','excerpt','content','tags','category'}}"""
+        self._counts = {post_id: self._term_counts(doc) for post_id, doc in docs.items()}
+        self._df = {}
+        for counts in self._counts.values():
+            for term in counts:
+                self._df[term] = self._df.get(term, 0) + 1
+        self._reindex()
+
+    def _reindex(self):
+        """按当前词频与文档频率重算全部向量与 top-k"""
+        self._vectors = {}
+        self._postings = {}
+        for post_id in self._counts:
+            self._index(post_id)
+        self.top = {post_id: self._rank(self._similarities(post_id)) for post_id in self._counts}
+        self._indexed_size = len(self._counts)
+
+    def _drifted(self) -> bool:
+        return abs(len(self._counts) - self._indexed_size) > self._drift_threshold * max(1, self._indexed_size)
+
+    def update(self, post_id, doc=None) -> set:
+        """单篇文章新增 / 修改（doc）或移除（doc=None）；返回 top 列表发生变化的文章 id"""
+        old_counts = self._counts.pop(post_id, None)
+        if old_counts is not None:
+            for term in old_counts:
+                self._df[term] -= 1
+                if not self._df[term]:
+                    del self._df[term]
+            self._unindex(post_id)
+        self.top.pop(post_id, None)
+
+        changed = set()
+        if doc is not None:
+            counts = self._term_counts(doc)
+            self._counts[post_id] = counts
+            for term in counts:
+                self._df[term] = self._df.get(term, 0) + 1
+
+        if self._drifted():
+            previous = self.top
+            self._reindex()
+            changed = {pid for pid in set(previous) | set(self.top) if previous.get(pid) != self.top.get(pid)}
+            return changed | {post_id}
+
+        if doc is not None:
+            self._index(post_id)
+            scores = self._similarities(post_id)
+            self.top[post_id] = self._rank(scores)
+            changed.add(post_id)
+        else:
+            # 移除的文章自己的 top 行也要删掉
+            scores = {}
+            changed.add(post_id)
+
+        for other, ranked in self.top.items():
+            if other == post_id:
+                continue
+            score = scores.get(other, 0.0)
+            if any(related == post_id for _, related in ranked):
+                # 原列表里有这篇：分数可能下降，整行重算
+                new_ranked = self._rank(self._similarities(other))
+            elif score > 0 and (len(ranked) < self.top_k or score > ranked[-1][0]):
+                new_ranked = heapq.nlargest(self.top_k, ranked + [(score, post_id)])
+            else:
+                continue
+            if new_ranked != ranked:
+                self.top[other] = new_ranked
+                changed.add(other)
+        return changed
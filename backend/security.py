@@ -6,11 +6,16 @@ from datetime import datetime, timezone
 from flask import request, jsonify, make_response
 from functools import wraps
 
+try:
+    from counters import MemoryCounterStore
+except ImportError:
+    from backend.counters import MemoryCounterStore
+
 class SecurityMiddleware:
     def __init__(self, app=None):
         self.app = app
-        self.ip_blacklist = {}       # 已禁用 IP 自动封锁
-        self.login_attempts = {}
+        # 限流计数、登录锁定与 IP 黑名单都存放在 store 中（见 counters.py），多 worker 部署时共享
+        self.store = MemoryCounterStore()
         self.honeypot_captures = []  # 已禁用蜜罐捕获
         self.attack_log = []
         
@@ -65,8 +70,10 @@ class SecurityMiddleware:
         if app:
             self.init_app(app)
     
-    def init_app(self, app):
+    def init_app(self, app, store=None):
         self.app = app
+        if store is not None:
+            self.store = store
         app.before_request(self._security_check)
         app.after_request(self._add_security_headers)
     
@@ -96,18 +103,14 @@ class SecurityMiddleware:
             self.app.logger.warning(f"[SECURITY] {attack_type}: {json.dumps(details)}")
     
     def _is_ip_blacklisted(self, ip):
-        if ip in self.ip_blacklist:
-            if self.ip_blacklist[ip]['expires'] > time.time():
-                return True
-            else:
-                del self.ip_blacklist[ip]
-        return False
+        # 过期由 store 的 TTL 处理
+        return self.store.get(f'blacklist:{ip}') is not None
     
     def _blacklist_ip(self, ip, duration_seconds=3600):
-        self.ip_blacklist[ip] = {
+        self.store.put(f'blacklist:{ip}', {
             'expires': time.time() + duration_seconds,
             'reason': 'Automatic blacklist due to malicious activity',
-        }
+        }, ttl=duration_seconds)
         self._log_attack('IP_BLACKLISTED', {'ip': ip, 'duration': duration_seconds})
     
     def _detect_sql_injection(self, data):
@@ -128,52 +131,39 @@ class SecurityMiddleware:
                 return True
         return False
     
+    def _log_store_error(self, check, error):
+        if self.app:
+            self.app.logger.warning(f"[SECURITY] {check} skipped, counter store ({self.store.backend}) error: {error}")
+    
     def _check_rate_limit(self, key, max_requests, window_seconds):
-        now = time.time()
-        if key not in self.login_attempts:
-            self.login_attempts[key] = {'count': 0, 'first_time': now}
-        
-        attempts = self.login_attempts[key]
-        
-        if now - attempts['first_time'] > window_seconds:
-            attempts['count'] = 1
-            attempts['first_time'] = now
+        # 计数存储出错（SQLite 锁超时、Redis 断开）时放行：限流暂时失效，好过所有写接口都返回 500
+        try:
+            allowed, _ = self.store.hit(f"rate:{key}", max_requests, window_seconds)
+        except Exception as e:
+            self._log_store_error('rate limit', e)
             return True
-        
-        if attempts['count'] >= max_requests:
-            return False
-        
-        attempts['count'] += 1
-        return True
+        return allowed
     
     def _check_login_attempts(self, username, ip):
-        key = f"login_{username}_{ip}"
+        key = f"login:{username}:{ip}"
         now = time.time()
+        limits = self.RATE_LIMITS['login']
         
-        if key not in self.login_attempts:
-            self.login_attempts[key] = {
-                'count': 0,
-                'first_time': now,
-                'locked_until': 0,
-            }
-        
-        attempts = self.login_attempts[key]
-        
-        if attempts['locked_until'] > now:
-            remaining = int(attempts['locked_until'] - now)
-            return False, f"账户已锁定，请 {remaining} 秒后再试"
-        
-        if now - attempts['first_time'] > self.RATE_LIMITS['login']['window_seconds']:
-            attempts['count'] = 1
-            attempts['first_time'] = now
-            return True, None
-        
-        attempts['count'] += 1
-        
-        if attempts['count'] >= self.RATE_LIMITS['login']['max_attempts']:
-            attempts['locked_until'] = now + self.RATE_LIMITS['login']['lockout_seconds']
-            self._log_attack('BRUTE_FORCE_ATTEMPT', {'username': username, 'ip': ip})
-            return False, f"登录失败次数过多，账户已锁定，请 {self.RATE_LIMITS['login']['lockout_seconds']} 秒后再试"
+        # 与普通限流相反，登录在计数存储出错时拒绝：无法限制暴力破解时宁可暂停登录
+        try:
+            locked_until = self.store.get(f"lock:{key}")
+            if locked_until and locked_until > now:
+                remaining = int(locked_until - now)
+                return False, f"账户已锁定，请 {remaining} 秒后再试"
+            
+            allowed, count = self.store.hit(key, limits['max_attempts'], limits['window_seconds'])
+            if not allowed or count >= limits['max_attempts']:
+                self.store.put(f"lock:{key}", now + limits['lockout_seconds'], ttl=limits['lockout_seconds'])
+                self._log_attack('BRUTE_FORCE_ATTEMPT', {'username': username, 'ip': ip})
+                return False, f"登录失败次数过多，账户已锁定，请 {limits['lockout_seconds']} 秒后再试"
+        except Exception as e:
+            self._log_store_error('login lockout', e)
+            return False, "登录服务暂时不可用，请稍后再试"
         
         return True, None
     
@@ -292,19 +282,23 @@ class SecurityMiddleware:
     
     def get_security_stats(self):
         return {
-            'blacklisted_ips': len(self.ip_blacklist),
+            'counter_backend': self.store.backend,
+            'blacklisted_ips': len(self.get_blacklist()),
             'total_attacks': len(self.attack_log),
             'honeypot_captures': len(self.honeypot_captures),
             'recent_attacks': self.attack_log[-10:],
         }
     
+    def get_blacklist(self):
+        """{ip: {'expires', 'reason'}}"""
+        return {key[len('blacklist:'):]: info for key, info in self.store.scan('blacklist:').items()}
+    
     def clear_blacklist(self):
-        self.ip_blacklist.clear()
+        self.store.clear('blacklist:')
         return {'success': True, 'message': '黑名单已清空'}
     
     def whitelist_ip(self, ip):
-        if ip in self.ip_blacklist:
-            del self.ip_blacklist[ip]
+        if self.store.delete(f'blacklist:{ip}'):
             return {'success': True, 'message': f'IP {ip} 已从黑名单移除'}
         return {'success': False, 'message': f'IP {ip} 不在黑名单中'}
 
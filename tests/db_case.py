@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from sqlalchemy import create_engine
+
+from backend import app as blog_app
+
+
+class TempDatabaseTestCase(unittest.TestCase):
+    """把 app 临时切到一个空的 SQLite 文件库（建表并执行启动时的 ensure_* 步骤），
+    清空进程内缓存与限流计数，测试类结束后恢复原来的库。
+    热门榜后台线程不启动，需要时测试直接调用 _refresh_trending"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmpdir = tempfile.TemporaryDirectory()
+        uri = f"sqlite:///{os.path.join(cls._tmpdir.name, 'blog.db')}"
+        app = blog_app.app
+        engines = blog_app.db._app_engines[app]
+        cls._saved = (app.config['SQLALCHEMY_DATABASE_URI'], engines[None], blog_app._db_initialized)
+        engines[None] = create_engine(uri, **blog_app.build_engine_options(uri))
+        app.config['SQLALCHEMY_DATABASE_URI'] = uri
+        blog_app._db_initialized = True
+        cls._reset_process_state()
+        cls._trending_job = mock.patch.object(blog_app, '_ensure_trending_job')
+        cls._trending_job.start()
+        blog_app.bootstrap()
+        cls.client = app.test_client()
+        cls._admin_headers = None
+
+    @classmethod
+    def tearDownClass(cls):
+        blog_app.view_counter.flush()
+        cls._trending_job.stop()
+        app = blog_app.app
+        engines = blog_app.db._app_engines[app]
+        engines[None].dispose()
+        app.config['SQLALCHEMY_DATABASE_URI'], engines[None], blog_app._db_initialized = cls._saved
+        cls._reset_process_state()
+        cls._tmpdir.cleanup()
+
+    @staticmethod
+    def _reset_process_state():
+        blog_app._clear_post_count_cache()
+        blog_app._compressed_cache.clear()
+        blog_app._seen_posts_version = None
+        blog_app.post_summary_index.invalidate()
+        blog_app._related_state.update(model=None, built_at=0.0, version=None)
+        blog_app.counter_store.clear('')
+
+    def setUp(self):
+        blog_app.counter_store.clear('')
+
+    def admin_headers(self):
+        # 登录检查把每次登录都记入失败窗口，同一测试类只登录一次
+        if self._admin_headers is None:
+            credentials = {'username': os.getenv('ADMIN_USERNAME', 'admin'),
+                           'password': os.getenv('ADMIN_PASSWORD', 'admin')}
+            response = self.client.post('/api/auth/login', json=credentials)
+            type(self)._admin_headers = {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+        return self._admin_headers
+
+    def create_post(self, title='测试文章', status='published', **fields):
+        response = self.client.post('/api/admin/posts', headers=self.admin_headers(),
+                                    json=dict(fields, title=title, status=status))
+        self.assertEqual(response.status_code, 200, response.get_json())
+        return response.get_json()['data']['id']
@@ -0,0 +1,60 @@
+import signal
+import threading
+import unittest
+
+from backend.background import BoundedExecutor, exit_on_sigterm
+
+
+class BoundedExecutorTest(unittest.TestCase):
+    def setUp(self):
+        self.gate = threading.Event()
+        self.started = threading.Event()
+        self.calls = []
+
+    def block(self):
+        self.started.set()
+        self.gate.wait(5)
+
+    def test_coalesce_merges_queued_task(self):
+        executor = BoundedExecutor('test', max_queue=2, overflow='coalesce')
+        executor.submit(self.block)
+        self.started.wait(5)
+        for ids in ([1], [2], [1, 3]):
+            executor.submit(self.calls.append, ids, key='refresh',
+                            merge=lambda old, new: (sorted(set(old[0]) | set(new[0])),))
+        self.gate.set()
+
+        self.assertEqual(executor.drain(5), 0)
+        self.assertEqual(self.calls, [[1, 2, 3]])
+        stats = executor.stats()
+        self.assertEqual((stats['submitted'], stats['coalesced'], stats['completed']), (2, 2, 2))
+
+    def test_drop_counts_overflow_and_rejects_after_drain(self):
+        executor = BoundedExecutor('test', max_queue=1, overflow='drop')
+        executor.submit(self.block)
+        self.started.wait(5)
+        self.assertTrue(executor.submit(self.calls.append, 'a'))
+        self.assertFalse(executor.submit(self.calls.append, 'b'))
+        self.gate.set()
+
+        self.assertEqual(executor.drain(5), 0)
+        self.assertFalse(executor.submit(self.calls.append, 'c'))
+        self.assertEqual(self.calls, ['a'])
+        self.assertEqual(executor.stats()['dropped'], 2)
+
+
+
+class ExitOnSigtermTest(unittest.TestCase):
+    def test_handler_only_raises_system_exit(self):
+        original = signal.getsignal(signal.SIGTERM)
+        self.addCleanup(signal.signal, signal.SIGTERM, original)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+        self.assertTrue(exit_on_sigterm())
+        self.assertFalse(exit_on_sigterm())
+        with self.assertRaises(SystemExit) as raised:
+            signal.getsignal(signal.SIGTERM)(signal.SIGTERM, None)
+        self.assertEqual(raised.exception.code, 128 + signal.SIGTERM)
+
+if __name__ == "__main__":
+    unittest.main()
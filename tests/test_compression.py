@@ -0,0 +1,84 @@
+import gzip
+import unittest
+from unittest import mock
+
+from backend import app as blog_app
+from tests.db_case import TempDatabaseTestCase
+
+
+class CompressionTest(unittest.TestCase):
+    def test_gzip_chosen_when_brotli_not_accepted(self):
+        with blog_app.app.test_request_context(headers={'Accept-Encoding': 'gzip;q=0.8, deflate'}):
+            self.assertEqual(blog_app._negotiate_encoding(), 'gzip')
+
+        with blog_app.app.test_request_context(headers={'Accept-Encoding': 'identity'}):
+            self.assertIsNone(blog_app._negotiate_encoding())
+
+    def test_large_json_is_compressed_and_etag_gets_suffix(self):
+        payload = '{"content": "%s"}' % ('x' * 4096)
+        with blog_app.app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+            response = blog_app.app.response_class(payload, mimetype='application/json')
+            response.set_etag('abc')
+            response = blog_app.compress_response(response)
+
+            self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+            self.assertEqual(response.get_etag(), ('abc-gzip', False))
+            self.assertEqual(gzip.decompress(response.get_data()).decode(), payload)
+
+    def test_small_payload_is_left_alone(self):
+        with blog_app.app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+            response = blog_app.app.response_class('{}', mimetype='application/json')
+            response = blog_app.compress_response(response)
+
+            self.assertNotIn('Content-Encoding', response.headers)
+            self.assertIn('Accept-Encoding', response.vary)
+
+
+    def test_precompressed_cache_is_keyed_by_host(self):
+        bodies = {}
+        for host in ('a.example', 'b.example'):
+            payload = '<urlset>%s</urlset>' % (f'<loc>https://{host}/posts/1</loc>' * 100)
+            with blog_app.app.test_request_context(base_url=f'https://{host}', headers={'Accept-Encoding': 'gzip'}):
+                blog_app.g.precompress = True
+                response = blog_app.app.response_class(payload, mimetype='application/xml')
+                response.set_etag('same-etag')
+                bodies[host] = gzip.decompress(blog_app.compress_response(response).get_data()).decode()
+
+        self.assertIn('https://b.example/', bodies['b.example'])
+        self.assertNotIn('a.example', bodies['b.example'])
+
+
+class NotModifiedCacheControlTest(TempDatabaseTestCase):
+    def test_304_repeats_the_200_cache_control(self):
+        self.create_post(category='笔记')
+        first = self.client.get('/api/categories/published')
+        revalidated = self.client.get('/api/categories/published', headers={'If-None-Match': first.headers['ETag']})
+
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(first.headers['Cache-Control'], 'public, max-age=60, stale-while-revalidate=300')
+        self.assertEqual(revalidated.headers['Cache-Control'], first.headers['Cache-Control'])
+
+
+class SitemapHostTest(TempDatabaseTestCase):
+    def test_sitemap_is_not_shared_across_hosts(self):
+        self.create_post('站点地图')
+        headers = {'Accept-Encoding': 'gzip'}
+        with mock.patch.dict('os.environ', {'SITE_URL': ''}):
+            first = self.client.get('/sitemap.xml', base_url='https://a.example', headers=headers)
+            second = self.client.get('/sitemap.xml', base_url='https://b.example', headers=headers)
+            revalidated = self.client.get('/sitemap.xml', base_url='https://b.example',
+                                          headers=dict(headers, **{'If-None-Match': first.headers['ETag']}))
+
+        def text(response):
+            data = response.get_data()
+            return (gzip.decompress(data) if 'Content-Encoding' in response.headers else data).decode()
+
+        self.assertIn('https://a.example/post/', text(first))
+        self.assertIn('https://b.example/post/', text(second))
+        self.assertNotIn('a.example', text(second))
+        self.assertNotEqual(first.headers['ETag'], second.headers['ETag'])
+        self.assertEqual(revalidated.status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+from unittest import mock
+
+from backend import app as blog_app
+from tests.db_case import TempDatabaseTestCase
+
+
+class ConditionalGetTest(TempDatabaseTestCase):
+    def test_matching_etag_returns_304_without_running_the_view(self):
+        self.create_post('条件请求')
+        first = self.client.get('/api/posts/published')
+        etag = first.headers['ETag']
+
+        with mock.patch.object(blog_app, '_post_list_response', side_effect=AssertionError('view ran')):
+            revalidated = self.client.get('/api/posts/published', headers={'If-None-Match': etag})
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.headers['ETag'], etag)
+        self.assertEqual(revalidated.data, b'')
+
+        other_query = self.client.get('/api/posts/published?per_page=1', headers={'If-None-Match': etag})
+        self.assertEqual(other_query.status_code, 200)
+        self.assertNotEqual(other_query.headers['ETag'], etag)
+
+    def test_admin_write_changes_the_etag(self):
+        first = self.client.get('/api/posts/published')
+        with blog_app.app.app_context():
+            before = blog_app._content_versions(['posts'])['posts'][0]
+
+        post_id = self.create_post('新写入')
+        with blog_app.app.app_context():
+            self.assertGreater(blog_app._content_versions(['posts'])['posts'][0], before)
+        response = self.client.get('/api/posts/published', headers={'If-None-Match': first.headers['ETag']})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], first.headers['ETag'])
+        self.assertIn(post_id, [item['id'] for item in response.get_json()['data']['items']])
+
+    def test_touch_content_bumps_only_named_resources(self):
+        with blog_app.app.app_context():
+            before = blog_app._content_versions(['posts', 'music'])
+            blog_app._touch_content('music')
+            blog_app.db.session.commit()
+            after = blog_app._content_versions(['posts', 'music'])
+
+        self.assertEqual(after['posts'], before['posts'])
+        self.assertEqual(after['music'][0], before['music'][0] + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
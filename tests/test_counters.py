@@ -0,0 +1,128 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from backend import app as blog_app
+from backend import counters
+from backend.security import SecurityMiddleware
+
+try:
+    import fakeredis
+    import lupa  # noqa: F401  fakeredis 靠 lupa 执行 Lua 脚本
+except ImportError:
+    fakeredis = None
+
+
+class CounterStoreContract:
+    def make_store(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.store = self.make_store()
+        self.store.clear('')
+
+    def test_sliding_window_rejects_without_recording(self):
+        results = [self.store.hit('rate:a', 2, 0.3) for _ in range(3)]
+
+        self.assertEqual(results, [(True, 1), (True, 2), (False, 2)])
+        self.assertEqual(self.store.hit('rate:b', 2, 0.3), (True, 1))
+        time.sleep(0.35)
+        self.assertEqual(self.store.hit('rate:a', 2, 0.3), (True, 1))
+
+    def test_values_expire_and_scan_by_prefix(self):
+        self.store.put('blacklist:1.1.1.1', {'reason': 'x'}, ttl=60)
+        self.store.put('blacklist:2.2.2.2', {'reason': 'y'}, ttl=0.2)
+        self.store.put('lock:k', 123.5)
+        time.sleep(0.25)
+
+        self.assertEqual(self.store.scan('blacklist:'), {'blacklist:1.1.1.1': {'reason': 'x'}})
+        self.assertEqual(self.store.get('lock:k'), 123.5)
+        self.assertTrue(self.store.delete('blacklist:1.1.1.1'))
+        self.assertFalse(self.store.delete('blacklist:1.1.1.1'))
+        self.store.clear('lock:')
+        self.assertIsNone(self.store.get('lock:k'))
+
+
+class MemoryCounterStoreTest(CounterStoreContract, unittest.TestCase):
+    def make_store(self):
+        return counters.MemoryCounterStore()
+
+
+class SQLiteCounterStoreTest(CounterStoreContract, unittest.TestCase):
+    def make_store(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        return counters.SQLiteCounterStore(os.path.join(self.tmp.name, 'counters.db'))
+
+    def test_purge_runs_once_per_interval_across_threads(self):
+        due = []
+        with mock.patch.object(counters.SQLiteCounterStore, '_PURGE_EVERY', 7):
+            workers = [threading.Thread(target=lambda: due.extend(
+                self.store._due_for_purge(1)[0] for _ in range(250))) for _ in range(8)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+        self.assertEqual(sum(due), 2000 // 7)
+
+    def test_limit_is_shared_between_store_instances(self):
+        other = counters.SQLiteCounterStore(self.store.path)
+        self.store.hit('guest:x', 2, 60)
+        other.hit('guest:x', 2, 60)
+
+        self.assertEqual(self.store.hit('guest:x', 2, 60), (False, 2))
+
+
+@unittest.skipUnless(os.getenv('TEST_REDIS_URL') and counters.redis, 'TEST_REDIS_URL 未配置')
+class RedisCounterStoreTest(CounterStoreContract, unittest.TestCase):
+    def make_store(self):
+        client = counters.redis.Redis.from_url(os.getenv('TEST_REDIS_URL'))
+        return counters.RedisCounterStore(client, namespace='blog-test:')
+
+
+
+@unittest.skipUnless(fakeredis, '需要 fakeredis[lua]（pip install "fakeredis[lua]"）')
+class FakeRedisCounterStoreTest(CounterStoreContract, unittest.TestCase):
+    """fakeredis 借助 lupa 真正执行 _REDIS_HIT_SCRIPT，脚本本身的错误会在这里暴露"""
+
+    def make_store(self):
+        return counters.RedisCounterStore(fakeredis.FakeStrictRedis(), namespace='blog-test:')
+
+    def test_script_keeps_one_sorted_set_member_per_accepted_hit(self):
+        self.store.hit('rate:z', 3, 60)
+        self.store.hit('rate:z', 3, 60)
+        client = self.store._client
+        key = self.store._key('hits:rate:z')
+
+        self.assertEqual(client.zcard(key), 2)
+        self.assertEqual([self.store.hit('rate:z', 3, 60) for _ in range(2)], [(True, 3), (False, 3)])
+        self.assertEqual(client.zcard(key), 3)
+        self.assertGreater(client.pttl(key), 0)
+
+
+class FailingStore(counters.MemoryCounterStore):
+    def hit(self, key, limit, window):
+        raise counters.sqlite3.OperationalError('database is locked')
+
+
+class StoreFailurePolicyTest(unittest.TestCase):
+    def test_rate_limits_fail_open_and_login_fails_closed(self):
+        middleware = SecurityMiddleware()
+        middleware.app, middleware.store = blog_app.app, FailingStore()
+        with blog_app.app.test_request_context('/api/auth/login', method='POST'):
+            self.assertTrue(middleware._check_rate_limit('api_1.2.3.4', 100, 60))
+            allowed, message = middleware._check_login_attempts('admin', '1.2.3.4')
+
+        self.assertFalse(allowed)
+        self.assertIn('暂时不可用', message)
+
+    def test_guestbook_rate_limit_fails_open(self):
+        with mock.patch.object(blog_app, 'counter_store', FailingStore()):
+            self.assertTrue(blog_app._check_guest_rate('ip-hash'))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,8 @@
+import sqlite3
 import unittest
 
 from backend import app as blog_app
+from tests.db_case import TempDatabaseTestCase
 
 
 class DatabaseModeTest(unittest.TestCase):
@@ -32,5 +34,35 @@ class DatabaseModeTest(unittest.TestCase):
         self.assertEqual(options["poolclass"].__name__, "NullPool")
 
 
+class SQLiteJournalModeTest(TempDatabaseTestCase):
+    def journal_mode(self):
+        conn = sqlite3.connect(blog_app._sqlite_db_path())
+        try:
+            return conn.execute('PRAGMA journal_mode').fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_bootstrap_switches_to_wal(self):
+        self.assertEqual(self.journal_mode(), 'wal')
+
+    def test_read_connection_does_not_change_journal_mode(self):
+        # 切换日志模式需要独占：先关掉引擎连接池与本线程的读连接
+        with blog_app.app.app_context():
+            blog_app.db.engine.dispose()
+        reader = getattr(blog_app._sqlite_local, 'conn', None)
+        if reader is not None:
+            reader.close()
+            blog_app._sqlite_local.conn = None
+        conn = sqlite3.connect(blog_app._sqlite_db_path())
+        conn.execute('PRAGMA journal_mode = DELETE')
+        conn.close()
+        blog_app._get_read_connection().execute('SELECT COUNT(*) FROM posts').fetchone()
+
+        self.assertEqual(self.journal_mode(), 'delete')
+        with blog_app.app.app_context():
+            blog_app.ensure_sqlite_wal()
+        self.assertEqual(self.journal_mode(), 'wal')
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,35 @@
+import json
+import unittest
+from unittest import mock
+
+from backend import app as blog_app
+from tests.db_case import TempDatabaseTestCase
+
+
+class NdjsonExportTest(TempDatabaseTestCase):
+    def test_export_streams_published_posts_across_batches(self):
+        published = [self.create_post(f'导出 {n}', content=f'正文 {n}') for n in range(3)]
+        draft = self.create_post('草稿', status='draft')
+
+        with mock.patch.object(blog_app, '_EXPORT_BATCH_SIZE', 2):
+            response = self.client.get('/api/admin/export.ndjson', headers=self.admin_headers())
+            self.assertTrue(response.is_streamed)
+            body = response.get_data(as_text=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual(response.headers['Cache-Control'], 'no-store')
+        self.assertRegex(response.headers['Content-Disposition'], r'^attachment; filename="export-\d{14}\.ndjson"$')
+        self.assertTrue(body.endswith('\n'))
+        lines = [json.loads(line) for line in body.splitlines()]
+        posts = [line['data'] for line in lines if line['type'] == 'post']
+        self.assertEqual([p['id'] for p in posts], published)
+        self.assertNotIn(draft, [p['id'] for p in posts])
+        self.assertEqual(posts[0]['content'], '正文 0')
+
+    def test_export_requires_admin(self):
+        self.assertEqual(self.client.get('/api/admin/export.ndjson').status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+
+from backend import app as blog_app
+from tests.db_case import TempDatabaseTestCase
+
+
+class GuestbookCountsTest(unittest.TestCase):
+    def test_state_moves_from_pending_to_approved(self):
+        message = blog_app.GuestMessage(author_name='访客', content='你好', is_approved=False)
+        before = blog_app._guestbook_state(message)
+        message.is_approved = True
+        after = blog_app._guestbook_state(message)
+
+        self.assertEqual(before, {'pending': 1})
+        self.assertEqual(after, {'approved': 1})
+
+    def test_index_covers_keyset_order(self):
+        indexes = {index.name: [c.name for c in index.columns] for index in blog_app.GuestMessage.__table__.indexes}
+
+        self.assertEqual(indexes['ix_guest_messages_approved_created_id'], ['is_approved', 'created_at', 'id'])
+
+
+class GuestbookEndpointTest(TempDatabaseTestCase):
+    def post_message(self, n):
+        response = self.client.post('/api/guestbook/messages', json={'author_name': f'访客{n}', 'content': f'留言 {n}'},
+                                    headers={'X-Forwarded-For': f'10.2.0.{n}'})
+        self.assertEqual(response.status_code, 200, response.get_json())
+        return response.get_json()['data']['id']
+
+    def admin_counts(self):
+        return self.client.get('/api/admin/guestbook/messages', headers=self.admin_headers()).get_json()['data']['counts']
+
+    def actual_counts(self):
+        with blog_app.app.app_context():
+            rows = blog_app.GuestMessage.query.all()
+        return {'approved': sum(m.is_approved for m in rows), 'pending': sum(not m.is_approved for m in rows)}
+
+    def test_counters_follow_create_approve_and_delete(self):
+        base = self.actual_counts()
+        ids = [self.post_message(n) for n in range(1, 4)]
+        self.assertEqual(self.admin_counts(), {'approved': base['approved'], 'pending': base['pending'] + 3})
+
+        for msg_id in ids[:2]:
+            self.client.put(f'/api/admin/guestbook/messages/{msg_id}/approve', headers=self.admin_headers())
+        self.client.put(f'/api/admin/guestbook/messages/{ids[0]}/approve', headers=self.admin_headers())
+        self.client.delete(f'/api/admin/guestbook/messages/{ids[1]}', headers=self.admin_headers())
+        self.client.delete(f'/api/admin/guestbook/messages/{ids[2]}', headers=self.admin_headers())
+
+        self.assertEqual(self.admin_counts(), self.actual_counts())
+        self.assertEqual(self.admin_counts(), {'approved': base['approved'] + 1, 'pending': base['pending']})
+        public = self.client.get('/api/guestbook/messages?cursor=').get_json()['data']
+        self.assertEqual(public['total'], base['approved'] + 1)
+
+    def test_rebuilding_post_counts_keeps_guestbook_counts(self):
+        self.post_message(10)
+        before = self.admin_counts()
+        with blog_app.app.app_context():
+            blog_app.db.session.query(blog_app.TaxonomyCount).filter_by(kind='month').delete()
+            blog_app.db.session.commit()
+            blog_app.ensure_taxonomy_counts()
+
+        self.assertEqual(self.admin_counts(), before)
+
+    def test_cursor_pages_through_tied_timestamps(self):
+        ids = [self.post_message(n) for n in range(20, 25)]
+        with blog_app.app.app_context():
+            table = blog_app.GuestMessage.__table__
+            blog_app.db.session.execute(table.update().where(table.c.id.in_(ids))
+                                        .values(created_at=blog_app.datetime(2030, 1, 1), is_approved=True))
+            blog_app.db.session.commit()
+
+        seen, cursor = [], ''
+        while cursor is not None:
+            data = self.client.get('/api/guestbook/messages', query_string={'per_page': 2, 'cursor': cursor}).get_json()['data']
+            seen.extend(item['id'] for item in data['items'])
+            cursor = data['next_cursor']
+
+        self.assertEqual(seen[:5], sorted(ids, reverse=True))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_invalid_cursor_is_rejected(self):
+        self.assertEqual(self.client.get('/api/guestbook/messages?cursor=zzz').status_code, 400)
+        response = self.client.get('/api/admin/guestbook/messages?cursor=zzz', headers=self.admin_headers())
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+
+from backend.hll import HyperLogLog
+
+
+class HyperLogLogTest(unittest.TestCase):
+    def test_estimate_is_close_and_ignores_duplicates(self):
+        sketch = HyperLogLog()
+        for i in range(5000):
+            sketch.add(f'reader-{i % 2000}')
+
+        self.assertLess(abs(sketch.count() - 2000), 2000 * 0.05)
+
+    def test_merge_is_idempotent_union(self):
+        a, b = HyperLogLog(), HyperLogLog()
+        for i in range(300):
+            a.add(f'r{i}')
+        for i in range(200, 500):
+            b.add(f'r{i}')
+        a.merge(b)
+        once = a.count()
+        a.merge(b)
+
+        self.assertEqual(a.count(), once)
+        self.assertLess(abs(once - 500), 500 * 0.05)
+
+    def test_blob_round_trip_is_compact(self):
+        sketch = HyperLogLog()
+        sketch.add('only-reader')
+        blob = sketch.to_bytes()
+
+        self.assertLess(len(blob), 100)
+        restored = HyperLogLog.from_bytes(blob)
+        self.assertEqual((restored.precision, restored.registers), (sketch.precision, sketch.registers))
+        self.assertEqual(restored.count(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import re
+import unittest
+
+from sqlalchemy import event
+
+from backend import app as blog_app
+from tests.db_case import TempDatabaseTestCase
+
+
+class LikeEndpointTest(TempDatabaseTestCase):
+    def like(self, post_id, ip):
+        return self.client.post(f'/api/posts/{post_id}/like', headers={'X-Forwarded-For': ip})
+
+    def test_like_toggles_per_reader(self):
+        post_id = self.create_post()
+
+        self.assertEqual(self.like(post_id, '10.2.0.1').get_json()['data'], {'liked': True, 'count': 1})
+        self.assertEqual(self.like(post_id, '10.2.0.2').get_json()['data'], {'liked': True, 'count': 2})
+        self.assertEqual(self.like(post_id, '10.2.0.1').get_json()['data'], {'liked': False, 'count': 1})
+        status = self.client.get(f'/api/posts/{post_id}/like', headers={'X-Forwarded-For': '10.2.0.2'})
+        self.assertEqual(status.get_json()['data'], {'liked': True, 'count': 1})
+
+    def test_liking_missing_post_is_404_without_like_row(self):
+        response = self.like(987654, '10.2.0.3')
+
+        self.assertEqual(response.status_code, 404)
+        with blog_app.app.app_context():
+            self.assertEqual(blog_app.Like.query.filter_by(post_id=987654).count(), 0)
+
+    def test_toggle_touches_posts_and_likes_with_few_statements(self):
+        post_id = self.create_post()
+        self.like(post_id, '10.2.0.6')
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if re.match(r'(DELETE FROM|INSERT INTO|UPDATE|SELECT .*? FROM) (posts|likes)\b', statement, re.S):
+                statements.append(' '.join(statement.split()[:3]))
+
+        with blog_app.app.app_context():
+            engine = blog_app.db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            self.like(post_id, '10.2.0.5')
+            liked = list(statements)
+            statements.clear()
+            self.like(post_id, '10.2.0.5')
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+
+        # 不再先查文章是否存在，也不在 UPDATE 之后重读计数
+        self.assertEqual(liked, ['DELETE FROM likes', 'INSERT INTO likes', 'UPDATE posts SET'])
+        self.assertEqual(statements, ['DELETE FROM likes', 'UPDATE posts SET'])
+
+    def test_bulk_status_keeps_request_order(self):
+        first, second = self.create_post(title='第一篇'), self.create_post(title='第二篇')
+        self.like(second, '10.2.0.4')
+
+        response = self.client.get(f'/api/posts/likes?ids={second},987654,{first}',
+                                   headers={'X-Forwarded-For': '10.2.0.4'})
+        self.assertEqual(response.get_json()['data'], [
+            {'id': second, 'liked': True, 'count': 1}, None, {'id': first, 'liked': False, 'count': 0},
+        ])
+        self.assertEqual(self.client.get('/api/posts/likes?ids=1,x').status_code, 400)
+        self.assertEqual(self.client.get('/api/posts/likes').status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
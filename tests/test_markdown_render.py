@@ -0,0 +1,46 @@
+import unittest
+from unittest import mock
+
+from backend import app as blog_app
+from tests.db_case import TempDatabaseTestCase
+
+
+@unittest.skipIf(blog_app.MarkdownIt is None, 'markdown-it-py not installed')
+class MarkdownRenderTest(unittest.TestCase):
+    def test_headings_get_unique_anchors_and_outline(self):
+        html, toc = blog_app._render_markdown('# 简介\n\n## Setup `pip`\n\n## Setup `pip`\n')
+
+        self.assertEqual([(h['level'], h['id']) for h in toc], [(1, '简介'), (2, 'setup-pip'), (2, 'setup-pip-2')])
+        self.assertIn('<h2 id="setup-pip-2">Setup <code>pip</code></h2>', html)
+
+    def test_raw_html_is_escaped(self):
+        html, _ = blog_app._render_markdown('hi <script>alert(1)</script>')
+
+        self.assertNotIn('<script>', html)
+        self.assertIn('&lt;script&gt;', html)
+
+    def test_render_key_tracks_content(self):
+        self.assertEqual(blog_app._post_render_key('# 标题'), blog_app._post_render_key('# 标题'))
+        self.assertNotEqual(blog_app._post_render_key('# 标题'), blog_app._post_render_key('# 标题\n'))
+
+
+@unittest.skipIf(blog_app.MarkdownIt is None, 'markdown-it-py not installed')
+class RenderCacheTest(TempDatabaseTestCase):
+    def test_counter_updates_keep_cached_render(self):
+        post_id = self.create_post(content='# 简介\n\n正文')
+        self.assertIn('content_html', self.client.get(f'/api/posts/{post_id}?render=html').get_json()['data'])
+        with blog_app.app.app_context():
+            cached_key = blog_app.db.session.get(blog_app.PostRender, post_id).render_key
+
+        self.client.post(f'/api/posts/{post_id}/like', headers={'X-Forwarded-For': '10.1.0.1'})
+        blog_app.view_counter.add(post_id, 2)
+        blog_app.view_counter.flush()
+        with mock.patch.object(blog_app, '_render_markdown', side_effect=AssertionError('re-rendered')):
+            data = self.client.get(f'/api/posts/{post_id}?render=html').get_json()['data']
+
+        self.assertIn('<h1 id="简介">', data['content_html'])
+        with blog_app.app.app_context():
+            self.assertEqual(blog_app.db.session.get(blog_app.PostRender, post_id).render_key, cached_key)
+
+if __name__ == '__main__':
+    unittest.main()
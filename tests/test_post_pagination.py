@@ -0,0 +1,40 @@
+import unittest
+from unittest import mock
+
+from backend import app as blog_app
+
+
+class PostCursorTest(unittest.TestCase):
+    def test_cursor_round_trip(self):
+        cursor = blog_app._encode_post_cursor('2025-03-01 10:00:00.000000', 42)
+
+        self.assertNotIn('=', cursor)
+        self.assertEqual(blog_app._decode_post_cursor(cursor), ('2025-03-01 10:00:00.000000', 42))
+
+    def test_datetime_cursor_is_encoded_as_isoformat(self):
+        published_at = blog_app.datetime(2025, 3, 1, 10, 0, 0)
+        cursor = blog_app._encode_post_cursor(published_at, 7)
+
+        self.assertEqual(blog_app._decode_post_cursor(cursor), ('2025-03-01T10:00:00', 7))
+
+    def test_malformed_cursor_raises_value_error(self):
+        for cursor in ('zzz', blog_app._encode_post_cursor('2025-03-01', 1)[:-3], 'WzEsMl0'):
+            with self.assertRaises(ValueError):
+                blog_app._decode_post_cursor(cursor)
+
+
+class PostCountCacheTest(unittest.TestCase):
+    def test_distinct_searches_are_bounded_by_lru(self):
+        blog_app._clear_post_count_cache()
+        with mock.patch.object(blog_app, '_POST_COUNT_CACHE_SIZE', 3):
+            for term in ('a', 'b', 'c'):
+                blog_app._cached_post_count((None, None, term), lambda: 1)
+            blog_app._cached_post_count((None, None, 'a'), lambda: 2)
+            blog_app._cached_post_count((None, None, 'd'), lambda: 1)
+
+        self.assertEqual(list(blog_app._post_count_cache), [(None, None, 'c'), (None, None, 'a'), (None, None, 'd')])
+        blog_app._clear_post_count_cache()
+
+
+if __name__ == "__main__":
+    unittest.main()
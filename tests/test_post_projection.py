@@ -0,0 +1,34 @@
+import unittest
+
+from backend import app as blog_app
+
+
+class PostProjectionTest(unittest.TestCase):
+    def test_fields_always_include_id_and_reject_unknown(self):
+        self.assertEqual(blog_app._parse_post_fields('title, tags,title', ()), ('id', 'title', 'tags'))
+        self.assertEqual(blog_app._parse_post_fields('', ('id', 'slug')), ('id', 'slug'))
+        with self.assertRaises(ValueError):
+            blog_app._parse_post_fields('title,password', ())
+
+    def test_row_projection_normalises_values(self):
+        row = (5, '["a"]', None, blog_app.datetime(2025, 3, 1, 10, 0))
+        self.assertEqual(blog_app._project_post_row(row, ('id', 'tags', 'views', 'updated_at')), {
+            'id': 5, 'tags': ['a'], 'views': 0, 'updated_at': '2025-03-01T10:00:00',
+        })
+
+    def test_sparse_fieldset_defaults_to_full_representation(self):
+        self.assertIsNone(blog_app._parse_fields(' , ', blog_app._MUSIC_FIELDS))
+        self.assertEqual(blog_app._parse_fields('photo_count', blog_app._ALBUM_FIELDS), ('id', 'photo_count'))
+        with self.assertRaises(ValueError):
+            blog_app._parse_fields('updated_at', blog_app._FRIEND_FIELDS)
+
+    def test_projected_row_reads_missing_columns_as_none(self):
+        class Row:
+            _mapping = {'id': 3, 'cover_url': 'http://img'}
+
+        item = blog_app._music_to_dict(blog_app._ProjectedRow(Row()))
+        self.assertEqual((item['id'], item['cover_url'], item['tags'], item['title']), (3, 'https://img', [], None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+
+from sqlalchemy import text
+
+from backend import app as blog_app
+from tests.db_case import TempDatabaseTestCase
+
+
+class PostSlugBaseTest(unittest.TestCase):
+    def test_ascii_title_keeps_alnum_runs(self):
+        self.assertEqual(blog_app._slug_base('  Hello, Flask & SQLite!  '), 'Hello-Flask-SQLite')
+
+    def test_cjk_title_uses_stable_hash(self):
+        slug = blog_app._slug_base('你好世界')
+
+        self.assertRegex(slug, r'^post-[0-9a-f]{6,8}$')
+        self.assertEqual(slug, blog_app._slug_base('你好世界'))
+
+    def test_long_title_is_truncated(self):
+        self.assertEqual(len(blog_app._slug_base('a' * 300)), 100)
+
+
+class PostSlugEndpointTest(TempDatabaseTestCase):
+    def slug_of(self, post_id):
+        with blog_app.app.app_context():
+            return blog_app.db.session.get(blog_app.Post, post_id).slug
+
+    def rename(self, post_id, title):
+        response = self.client.put(f'/api/admin/posts/{post_id}', headers=self.admin_headers(), json={'title': title})
+        self.assertEqual(response.status_code, 200, response.get_json())
+
+    def test_colliding_titles_get_numbered_suffixes(self):
+        ids = [self.create_post('Slug Collision') for _ in range(3)]
+
+        self.assertEqual([self.slug_of(i) for i in ids], ['Slug-Collision', 'Slug-Collision-2', 'Slug-Collision-3'])
+        with blog_app.app.app_context():
+            self.assertEqual(blog_app._next_free_slug('Slug-Collision', taken={'Slug-Collision-4'}), 'Slug-Collision-5')
+            self.assertEqual(blog_app._next_free_slug('Slug-Unused'), 'Slug-Unused')
+
+    def test_rename_records_history_and_old_slug_redirects(self):
+        post_id = self.create_post('Before Rename')
+        self.rename(post_id, 'Before Rename!')
+        self.assertEqual(self.slug_of(post_id), 'Before-Rename')
+
+        self.rename(post_id, 'After Rename')
+        self.assertEqual(self.slug_of(post_id), 'After-Rename')
+        with blog_app.app.app_context():
+            history = blog_app.db.session.get(blog_app.PostSlugHistory, 'Before-Rename')
+            self.assertEqual(history.post_id, post_id)
+
+        response = self.client.get('/api/posts/by-slug/Before-Rename?render=html')
+        self.assertEqual(response.status_code, 301)
+        self.assertTrue(response.headers['Location'].endswith('/api/posts/by-slug/After-Rename?render=html'))
+        current = self.client.get('/api/posts/by-slug/After-Rename')
+        self.assertEqual(current.get_json()['data']['id'], post_id)
+        self.assertEqual(self.client.get('/api/posts/by-slug/Never-Existed').status_code, 404)
+
+    def test_renaming_back_reclaims_the_old_slug(self):
+        post_id = self.create_post('Round Trip')
+        self.rename(post_id, 'Round Trip Detour')
+        self.rename(post_id, 'Round Trip')
+
+        self.assertEqual(self.slug_of(post_id), 'Round-Trip')
+        self.assertEqual(self.client.get('/api/posts/by-slug/Round-Trip').status_code, 200)
+        self.assertEqual(self.client.get('/api/posts/by-slug/Round-Trip-Detour').status_code, 301)
+        with blog_app.app.app_context():
+            self.assertIsNone(blog_app.db.session.get(blog_app.PostSlugHistory, 'Round-Trip'))
+
+    def test_dedupe_repairs_existing_duplicates(self):
+        ids = [self.create_post(f'Legacy Dup {n}') for n in range(3)]
+        blank = self.create_post('Legacy Blank')
+        with blog_app.app.app_context():
+            session = blog_app.db.session
+            session.execute(text('DROP INDEX uq_posts_slug'))
+            session.execute(text("UPDATE posts SET slug = 'Legacy-Dup' WHERE id IN (%s)" % ','.join(map(str, ids))))
+            session.execute(text("UPDATE posts SET slug = '' WHERE id = :id"), {'id': blank})
+            session.commit()
+            blog_app._dedupe_post_slugs()
+            blog_app.ensure_post_listing_schema()
+
+        self.assertEqual([self.slug_of(i) for i in ids], ['Legacy-Dup', 'Legacy-Dup-1', 'Legacy-Dup-2'])
+        self.assertIsNone(self.slug_of(blank))
+        with blog_app.app.app_context():
+            indexes = {ix['name']: ix['unique'] for ix in blog_app.db.inspect(blog_app.db.engine).get_indexes('posts')}
+        self.assertTrue(indexes['uq_posts_slug'])
+
+
+if __name__ == '__main__':
+    unittest.main()
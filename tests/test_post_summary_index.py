@@ -0,0 +1,147 @@
+import unittest
+from unittest import mock
+
+from backend import app as blog_app
+
+
+def _summary_row(post_id, published_at, category='c', tags='[]'):
+    return (post_id, f'title {post_id}', f'slug-{post_id}', '', category, tags,
+            None, 1, 0, 0, published_at, published_at)
+
+
+class PostSummaryIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.rows = {
+            i: _summary_row(i, f'2025-01-{i:02d} 00:00:00', category='odd' if i % 2 else 'even',
+                            tags='["all", "t%d"]' % (i % 3))
+            for i in range(1, 11)
+        }
+
+        def loader(post_id=None):
+            if post_id is None:
+                return list(self.rows.values())
+            return [self.rows[post_id]] if post_id in self.rows else []
+
+        self.index = blog_app.PostSummaryIndex(loader, ttl=3600)
+
+    def test_pages_are_newest_first_with_filters(self):
+        result = self.index.page(2, 3)
+        self.assertEqual([i['id'] for i in result['items']], [7, 6, 5])
+        self.assertEqual((result['total'], result['pages']), (10, 4))
+
+        result = self.index.page(1, 10, category='odd', tag='t0')
+        self.assertEqual([i['id'] for i in result['items']], [9, 3])
+
+    def test_fields_are_projected_inside_the_index(self):
+        fields = ('id', 'title')
+        self.assertEqual(self.index.page(1, 2, fields=fields)['items'], [
+            {'id': 10, 'title': 'title 10'}, {'id': 9, 'title': 'title 9'},
+        ])
+        result = self.index.after(2, self.index.after(2)['next_cursor'], fields=fields)
+        self.assertEqual(result['items'], [{'id': 8, 'title': 'title 8'}, {'id': 7, 'title': 'title 7'}])
+
+    def test_cursor_walks_every_item_once(self):
+        seen, cursor = [], None
+        while True:
+            result = self.index.after(4, cursor, tag='all')
+            seen.extend(i['id'] for i in result['items'])
+            cursor = result['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, list(range(10, 0, -1)))
+
+    def test_refresh_and_remove_patch_the_snapshot(self):
+        self.index.page(1, 10)
+        self.rows[11] = _summary_row(11, '2025-02-01 00:00:00', tags='["new"]')
+        self.index.refresh_post(11)
+        del self.rows[4]
+        self.index.refresh_post(4)
+
+        result = self.index.page(1, 20)
+        self.assertEqual(result['items'][0]['id'], 11)
+        self.assertNotIn(4, [i['id'] for i in result['items']])
+        self.assertEqual(self.index.page(1, 10, tag='new')['total'], 1)
+
+    def test_patches_match_a_full_rebuild_without_rebuilding(self):
+        self.index.suggest('t')
+        edits = [
+            (11, _summary_row(11, '2025-02-01 00:00:00', category='odd', tags='["new", "all"]')),
+            (3, _summary_row(3, '2025-01-03 00:00:00', category='fresh', tags='["t0"]')),
+            (5, None),
+            (11, _summary_row(11, '2025-01-05 00:00:00', category='odd', tags='["all"]')),
+            (7, _summary_row(7, '2025-01-07 00:00:00', category='', tags='[]')),
+            (404, None),
+        ]
+        with mock.patch.object(blog_app.PostSummaryIndex, '_build', side_effect=AssertionError('rebuilt')):
+            for post_id, row in edits:
+                if row is None:
+                    self.rows.pop(post_id, None)
+                else:
+                    self.rows[post_id] = row
+                self.index.refresh_post(post_id)
+
+        patched = self.index._snapshot
+        rebuilt = blog_app.PostSummaryIndex._build(blog_app.PostSummaryIndex._rows_to_items(self.rows.values()))
+        self.assertEqual(patched, rebuilt)
+        self.assertEqual([i['id'] for i in self.index.page(1, 20, category='fresh')['items']], [3])
+        self.assertEqual(self.index.suggest('fre'), [{'type': 'category', 'text': 'fresh', 'count': 1}])
+
+    def test_reload_racing_a_write_is_not_marked_fresh(self):
+        self.index.page(1, 10)
+        loader = self.index._loader
+
+        def racing_loader(post_id=None):
+            rows = loader(post_id)
+            # 读完旧数据后、装入快照前发生写入
+            self.rows[11] = _summary_row(11, '2025-02-01 00:00:00')
+            self.index._loader = loader
+            self.index.mark_stale()
+            return rows
+
+        self.index._loader = racing_loader
+        self.index.mark_stale()
+        self.assertEqual(self.index.page(1, 20)['total'], 10)
+        self.assertEqual(self.index.page(1, 20)['total'], 11)
+
+    def test_suggest_matches_title_words_tags_and_categories(self):
+        self.rows[11] = _summary_row(11, '2025-02-01 00:00:00', category='Odyssey', tags='["odd-tag"]')
+        self.rows[11] = (11, 'Hello World 你好', 'hello-world') + self.rows[11][3:]
+        self.index.reload()
+
+        result = self.index.suggest('OD', limit=3)
+        self.assertEqual([(r['type'], r['text']) for r in result],
+                         [('category', 'odd'), ('category', 'Odyssey'), ('tag', 'odd-tag')])
+        self.assertEqual(result[0]['count'], 5)
+
+        self.assertEqual(self.index.suggest('wor'), [
+            {'type': 'post', 'text': 'Hello World 你好', 'id': 11, 'slug': 'hello-world'}
+        ])
+        self.assertEqual([r['id'] for r in self.index.suggest('你好')], [11])
+        self.assertEqual(self.index.suggest('   '), [])
+
+    def test_suggest_ranks_the_whole_match_range(self):
+        for i in range(11, 31):
+            row = _summary_row(i, f'2025-02-{i - 10:02d} 00:00:00', category=f'topic-{i:02d}')
+            self.rows[i] = row[:8] + (i * 10,) + row[9:]
+        self.index.reload()
+
+        with mock.patch.object(blog_app, '_SUGGEST_SCAN_LIMIT', 10 ** 6):
+            expected = {q: self.index.suggest(q, limit=4) for q in ('t', 'title', 'topic-1', 'e', 'odd')}
+        with mock.patch.object(blog_app, '_SUGGEST_SCAN_LIMIT', 3):
+            for q, result in expected.items():
+                self.assertEqual(self.index.suggest(q, limit=4), result, q)
+        self.assertEqual([r['text'] for r in expected['title']][:2], ['title 30', 'title 29'])
+
+    def test_archive_bucket_is_a_contiguous_range(self):
+        self.rows[11] = _summary_row(11, '2025-02-01 00:00:00')
+        self.index.reload()
+
+        result = self.index.archive(3, '2025-01', '2025-02', with_total=True)
+        self.assertEqual(([i['id'] for i in result['items']], result['total']), ([10, 9, 8], 10))
+        result = self.index.archive(3, '2025-01', '2025-02', cursor=result['next_cursor'])
+        self.assertEqual([i['id'] for i in result['items']], [7, 6, 5])
+        self.assertEqual([i['id'] for i in self.index.archive(5, '2025-02', '2025-03')['items']], [11])
+
+
+if __name__ == "__main__":
+    unittest.main()
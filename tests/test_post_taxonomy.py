@@ -0,0 +1,73 @@
+import unittest
+
+from backend import app as blog_app
+from tests.db_case import TempDatabaseTestCase
+
+
+class PostTaxonomyStateTest(unittest.TestCase):
+    def test_published_post_contributes_category_and_tags(self):
+        post = blog_app.Post(status='published', category='随笔', tags='["a", " a ", "b"]')
+
+        self.assertEqual(blog_app._post_taxonomy_state(post), {
+            ('category', '随笔'): 1, ('tag', 'a'): 1, ('tag', 'b'): 1,
+        })
+
+    def test_published_at_adds_archive_month(self):
+        post = blog_app.Post(status='published', tags='[]', published_at=blog_app.datetime(2025, 3, 9))
+
+        self.assertEqual(blog_app._post_taxonomy_state(post), {('month', '2025-03'): 1})
+
+    def test_draft_contributes_nothing(self):
+        post = blog_app.Post(status='draft', category='随笔', tags='["a"]')
+
+        self.assertEqual(blog_app._post_taxonomy_state(post), {})
+
+
+class PostTaxonomyStorageTest(TempDatabaseTestCase):
+    def post_tags(self, post_id):
+        with blog_app.app.app_context():
+            rows = blog_app.PostTag.query.filter_by(post_id=post_id).all()
+        return sorted(row.tag for row in rows)
+
+    def counts(self, kind):
+        return {item['name']: item['count'] for item in self.client.get(f'/api/{kind}/published').get_json()['data']}
+
+    def assert_counts_match_posts(self):
+        # 计数表必须与按已发布文章重新统计的结果一致
+        with blog_app.app.app_context():
+            expected = {}
+            for post in blog_app.Post.query.all():
+                for key, n in blog_app._post_taxonomy_state(post).items():
+                    expected[key] = expected.get(key, 0) + n
+            stored = {(row.kind, row.name): row.count for row in blog_app.TaxonomyCount.query.all() if row.count}
+        self.assertEqual(stored, expected)
+
+    def test_tags_and_counts_follow_create_edit_and_delete(self):
+        first = self.create_post('分类一', category='笔记', tags=['flask', 'sqlite'])
+        second = self.create_post('分类二', category='笔记', tags=['flask'])
+        draft = self.create_post('草稿', status='draft', category='草稿箱', tags=['draft-only'])
+        self.assertEqual(self.post_tags(first), ['flask', 'sqlite'])
+        self.assertEqual(self.counts('categories')['笔记'], 2)
+        self.assertEqual((self.counts('tags')['flask'], self.counts('tags')['sqlite']), (2, 1))
+        self.assertNotIn('draft-only', self.counts('tags'))
+        self.assert_counts_match_posts()
+
+        headers = self.admin_headers()
+        self.client.put(f'/api/admin/posts/{first}', headers=headers, json={'category': '随笔', 'tags': ['sqlite', 'wal']})
+        self.client.put(f'/api/admin/posts/{second}', headers=headers, json={'status': 'draft'})
+        self.client.put(f'/api/admin/posts/{draft}', headers=headers, json={'status': 'published'})
+        self.assertEqual(self.post_tags(first), ['sqlite', 'wal'])
+        self.assertNotIn('笔记', self.counts('categories'))
+        self.assertEqual((self.counts('categories')['随笔'], self.counts('categories')['草稿箱']), (1, 1))
+        self.assertNotIn('flask', self.counts('tags'))
+        self.assert_counts_match_posts()
+
+        self.client.delete(f'/api/admin/posts/{first}', headers=headers)
+        self.assertEqual(self.post_tags(first), [])
+        self.assertNotIn('wal', self.counts('tags'))
+        self.assertNotIn('随笔', self.counts('categories'))
+        self.assert_counts_match_posts()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+from unittest import mock
+
+from backend import app as blog_app
+from backend.related import RelatedPostsModel
+from tests.db_case import TempDatabaseTestCase
+
+
+def _doc(title, content='', tags=(), category=None):
+    return {'title': title, 'content': content, 'tags': list(tags), 'category': category}
+
+
+class RelatedPostsModelTest(unittest.TestCase):
+    def setUp(self):
+        self.docs = {
+            1: _doc('flask caching', 'etag gzip headers', tags=['flask'], category='tech'),
+            2: _doc('flask routing', 'blueprints views', tags=['flask'], category='tech'),
+            3: _doc('sqlite indexes', 'btree pages', tags=['sqlite'], category='tech'),
+            4: _doc('beach trip', 'sunset waves', tags=['travel'], category='life'),
+            5: _doc('mountain trip', 'snow hiking', tags=['travel'], category='life'),
+            6: _doc('reading notes', 'novels essays', tags=['books'], category='life'),
+        }
+        self.model = RelatedPostsModel(str.split, top_k=3)
+        self.model.build(self.docs)
+
+    def related(self, post_id):
+        return [related_id for _, related_id in self.model.top[post_id]]
+
+    def test_build_ranks_shared_terms_and_tags_first(self):
+        self.assertEqual(self.related(1)[0], 2)
+        self.assertEqual(self.related(4)[0], 5)
+        self.assertNotIn(4, self.related(1))
+
+    def test_update_adds_new_post_to_neighbours(self):
+        changed = self.model.update(7, _doc('flask etag caching', 'gzip headers', tags=['flask'], category='tech'))
+
+        self.assertIn(7, changed)
+        self.assertIn(1, changed)
+        self.assertEqual(self.related(7)[0], 1)
+        self.assertEqual(self.related(1)[0], 7)
+
+    def test_removing_post_drops_it_from_every_list(self):
+        changed = self.model.update(2)
+
+        self.assertNotIn(2, self.model.top)
+        self.assertIn(1, changed)
+        self.assertIn(2, changed)
+        self.assertTrue(all(2 not in self.related(pid) for pid in self.model.top))
+
+    def test_growing_past_drift_threshold_matches_full_build(self):
+        model = RelatedPostsModel(str.split, top_k=3, drift_threshold=0.25)
+        model.build(self.docs)
+        added = {
+            7: _doc('flask etag caching', 'gzip headers', tags=['flask'], category='tech'),
+            8: _doc('flask sessions', 'cookies headers', tags=['flask'], category='tech'),
+        }
+
+        model.update(7, added[7])
+        self.assertEqual(model._indexed_size, 6)
+        changed = model.update(8, added[8])
+
+        fresh = RelatedPostsModel(str.split, top_k=3, drift_threshold=0.25)
+        fresh.build({**self.docs, **added})
+        self.assertEqual(model._indexed_size, 8)
+        self.assertEqual(model.top, fresh.top)
+        self.assertLessEqual({1, 2, 7, 8}, changed)
+
+class RelatedRefreshTest(TempDatabaseTestCase):
+    def related_rows(self, post_id):
+        with blog_app.app.app_context():
+            return [related_id for related_id, _ in blog_app._load_related_rows(post_id)]
+
+    def test_unpublish_clears_rows_and_foreign_writes_force_rebuild(self):
+        with mock.patch.object(blog_app, '_submit_related_refresh'):
+            first = self.create_post(title='flask caching etag', content='etag gzip headers', tags=['flask'])
+            second = self.create_post(title='flask routing etag', content='etag blueprints', tags=['flask'])
+            blog_app._refresh_related_posts()
+            model = blog_app._related_state['model']
+            self.assertEqual(self.related_rows(first), [second])
+
+            # 本进程撤回一篇：增量更新，撤回文章自己的行也被删掉
+            self.client.put(f'/api/admin/posts/{second}', headers=self.admin_headers(), json={'status': 'draft'})
+            blog_app._refresh_related_posts([second], 1)
+            self.assertIs(blog_app._related_state['model'], model)
+            self.assertEqual((self.related_rows(first), self.related_rows(second)), ([], []))
+
+            # 另一个 worker 发布的文章不在本进程模型里：版本号对不上，全量重建
+            third = self.create_post(title='flask caching headers', content='gzip etag', tags=['flask'])
+            self.client.put(f'/api/admin/posts/{first}', headers=self.admin_headers(), json={'excerpt': 'etag'})
+            blog_app._refresh_related_posts([first], 1)
+
+        self.assertIsNot(blog_app._related_state['model'], model)
+        self.assertEqual(self.related_rows(first), [third])
+
+
+if __name__ == '__main__':
+    unittest.main()
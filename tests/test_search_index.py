@@ -0,0 +1,89 @@
+import unittest
+
+from sqlalchemy import text
+
+from backend import app as blog_app
+from tests.db_case import TempDatabaseTestCase
+
+
+class SearchTokenizeTest(unittest.TestCase):
+    def test_cjk_runs_are_indexed_as_unigrams_and_bigrams(self):
+        tokens = blog_app._search_tokens('博客系统 Flask')
+
+        self.assertIn('博', tokens)
+        self.assertIn('博客', tokens)
+        self.assertIn('系统', tokens)
+        self.assertIn('flask', tokens)
+
+    def test_query_uses_bigrams_and_prefixes_trailing_word(self):
+        self.assertEqual(blog_app._build_search_match('博客系统'), '"博客" "客系" "系统"')
+        self.assertEqual(blog_app._build_search_match('flask pyth'), '"flask" "pyth"*')
+        self.assertEqual(blog_app._build_search_match('博'), '"博"')
+
+    def test_query_without_tokens_returns_none(self):
+        self.assertIsNone(blog_app._build_search_match('!! ??'))
+
+    def test_snippet_centres_on_first_hit(self):
+        content = '开头' * 40 + ' 这里讨论调度器实现 ' + '结尾' * 40
+        snippet = blog_app._search_snippet('调度器', content, width=30)
+
+        self.assertTrue(snippet.startswith('…') and snippet.endswith('…'))
+        self.assertIn('调度器', snippet)
+        self.assertEqual(blog_app._search_snippet('missing', '', 'Short title'), 'Short title')
+
+    def test_snippet_is_built_from_plain_text(self):
+        content = ('## 调度器设计\n\n> 见 [官方文档](https://example.com/doc) 与 ![架构图](/img/a.png)\n\n'
+                   '- **抢占式** 调度，入口 `run_queue()`\n\n```python\nsched.run()\n```\n\n| 列 | 值 |\n|---|---|\n| a | 1 |')
+        snippet = blog_app._search_snippet('调度', content, width=200)
+
+        self.assertEqual(snippet, '调度器设计 见 官方文档 与 架构图 抢占式 调度，入口 run_queue() sched.run() 列 值 a 1')
+
+
+class SearchIndexQueryTest(TempDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        if not blog_app._fts_available:
+            self.skipTest('SQLite built without FTS5')
+
+    def search(self, q):
+        response = self.client.get('/api/search', query_string={'search': q})
+        return [item['id'] for item in response.get_json()['data']['items']]
+
+    def test_title_hits_rank_above_body_hits(self):
+        body_hit = self.create_post('运维笔记', content='顺便提到 kubernetes 一次')
+        title_hit = self.create_post('Kubernetes 调度器', content='正文')
+
+        self.assertEqual(self.search('kubernetes'), [title_hit, body_hit])
+        self.assertEqual(self.search('调度'), [title_hit])
+
+    def test_updates_and_deletes_keep_index_in_step(self):
+        post_id = self.create_post('索引同步', content='包含 zeppelin 的正文')
+        self.assertEqual(self.search('zeppelin'), [post_id])
+
+        self.client.put(f'/api/admin/posts/{post_id}', headers=self.admin_headers(), json={'content': '改成 dirigible'})
+        self.assertEqual(self.search('zeppelin'), [])
+        self.assertEqual(self.search('dirigible'), [post_id])
+
+        self.client.delete(f'/api/admin/posts/{post_id}', headers=self.admin_headers())
+        self.assertEqual(self.search('dirigible'), [])
+        with blog_app.app.app_context():
+            rows = blog_app.db.session.execute(text('SELECT COUNT(*) FROM posts_fts WHERE rowid = :id'),
+                                               {'id': post_id}).scalar()
+        self.assertEqual(rows, 0)
+
+    def test_startup_check_reindexes_rows_edited_outside_the_app(self):
+        post_id = self.create_post('库外修改', content='原来的 marmot')
+        with blog_app.app.app_context():
+            # 行数不变、updated_at 也不变，只有内容变了
+            blog_app.db.session.execute(text("UPDATE posts SET content = '后来的 wombat' WHERE id = :id"), {'id': post_id})
+            blog_app.db.session.commit()
+        self.assertEqual(self.search('wombat'), [])
+
+        with blog_app.app.app_context():
+            blog_app.ensure_search_index()
+        self.assertEqual(self.search('wombat'), [post_id])
+        self.assertEqual(self.search('marmot'), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from backend import build_snapshot
+from tests.db_case import TempDatabaseTestCase
+
+
+class SnapshotWriteTest(unittest.TestCase):
+    def test_unchanged_body_is_not_rewritten(self):
+        with tempfile.TemporaryDirectory() as out_dir:
+            self.assertTrue(build_snapshot.write_file(out_dir, 'api/posts/1.json', b'{"id":1}'))
+            self.assertFalse(build_snapshot.write_file(out_dir, 'api/posts/1.json', b'{"id":1}'))
+            self.assertTrue(build_snapshot.write_file(out_dir, 'api/posts/1.json', b'{"id":2}'))
+
+            with open(os.path.join(out_dir, 'api', 'posts', '1.json'), 'rb') as f:
+                self.assertEqual(f.read(), b'{"id":2}')
+            self.assertEqual(os.listdir(os.path.join(out_dir, 'api', 'posts')), ['1.json'])
+
+    def test_missing_manifest_starts_empty(self):
+        with tempfile.TemporaryDirectory() as out_dir:
+            self.assertEqual(build_snapshot.load_manifest(out_dir), {'files': {}})
+
+
+
+class SnapshotBuildTest(TempDatabaseTestCase):
+    def test_sitemap_uses_base_url_and_manifest_records_it(self):
+        post_id = self.create_post(title='快照文章')
+        with tempfile.TemporaryDirectory() as out_dir, mock.patch.dict(os.environ, {'SITE_URL': ''}):
+            with self.assertRaises(ValueError):
+                build_snapshot.build_snapshot(out_dir)
+            stats = build_snapshot.build_snapshot(out_dir, base_url='https://blog.example/')
+
+            with open(os.path.join(out_dir, 'sitemap.xml'), encoding='utf-8') as f:
+                sitemap = f.read()
+            with open(os.path.join(out_dir, '_manifest.json'), encoding='utf-8') as f:
+                manifest = json.load(f)
+            rebuilt = build_snapshot.build_snapshot(out_dir, base_url='https://blog.example')
+
+        self.assertEqual(stats['failed'], 0)
+        self.assertIn('https://blog.example/', sitemap)
+        self.assertNotIn('localhost', sitemap)
+        self.assertEqual(manifest['base_url'], 'https://blog.example')
+        self.assertIn(f'api/posts/{post_id}.json', manifest['files'])
+        self.assertEqual(rebuilt['written'], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
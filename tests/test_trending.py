@@ -0,0 +1,104 @@
+import unittest
+from datetime import datetime, timedelta
+
+from backend import app as blog_app
+from tests.db_case import TempDatabaseTestCase
+
+
+class TrendingScoreTest(unittest.TestCase):
+    def test_scores_decay_and_respect_window(self):
+        now = datetime(2025, 5, 10, 12, 30)
+        rows = [
+            (1, 'hour', datetime(2025, 5, 10, 12), 10, 0),
+            (2, 'hour', datetime(2025, 5, 10, 0), 10, 0),
+            (3, 'hour', datetime(2025, 5, 6, 12), 50, 2),
+            (4, 'day', datetime(2025, 4, 1), 1000, 0),
+        ]
+        ranked = blog_app._trending_scores(rows, now)
+
+        self.assertEqual([post_id for _, post_id in ranked['24h']], [1, 2])
+        self.assertEqual(ranked['24h'][0][0], 10)
+        self.assertAlmostEqual(ranked['24h'][1][0], 10 * 0.5 ** (12 / 6))
+        self.assertEqual([post_id for _, post_id in ranked['7d']], [3, 1, 2])
+
+    def test_engagement_hour_truncates_to_naive_utc(self):
+        hour = blog_app._engagement_hour(datetime(2025, 5, 10, 20, 45, tzinfo=blog_app.timezone(timedelta(hours=8))))
+
+        self.assertEqual(hour, datetime(2025, 5, 10, 12))
+
+
+
+class EngagementStorageTest(TempDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        with blog_app.app.app_context():
+            blog_app.db.session.execute(blog_app.PostEngagement.__table__.delete())
+            blog_app.db.session.execute(blog_app.PostTrending.__table__.delete())
+            blog_app.db.session.execute(blog_app.JobLease.__table__.delete())
+            blog_app.db.session.commit()
+
+    def engagement(self, span):
+        with blog_app.app.app_context():
+            return {(post_id, bucket): (views, likes) for post_id, bucket, views, likes in
+                    blog_app.PostEngagement.query.filter_by(span=span).with_entities(
+                        blog_app.PostEngagement.post_id, blog_app.PostEngagement.bucket,
+                        blog_app.PostEngagement.views, blog_app.PostEngagement.likes)}
+
+    def test_bump_upserts_one_row_per_bucket(self):
+        bucket = datetime(2025, 5, 10, 12)
+        with blog_app.app.app_context():
+            blog_app._bump_engagement({1: (2, 0), 2: (1, 0)}, bucket=bucket)
+            blog_app._bump_engagement({1: (3, 1), 2: (0, 0)}, bucket=bucket)
+            blog_app.db.session.commit()
+
+        self.assertEqual(self.engagement('hour'), {(1, bucket): (5, 1), (2, bucket): (1, 0)})
+
+    def test_compaction_merges_whole_days_before_cutoff(self):
+        now = datetime(2025, 5, 20, 15, 45)
+        with blog_app.app.app_context():
+            for hour, views, likes in ((datetime(2025, 5, 10, 3), 3, 0), (datetime(2025, 5, 10, 7), 4, 1),
+                                       (datetime(2025, 5, 11, 23), 5, 0), (datetime(2025, 5, 12, 0), 6, 0)):
+                blog_app._bump_engagement({1: (views, likes)}, bucket=hour)
+            blog_app.db.session.commit()
+            blog_app._compact_engagement(now)
+
+        self.assertEqual(self.engagement('day'), {(1, datetime(2025, 5, 10)): (7, 1),
+                                                  (1, datetime(2025, 5, 11)): (5, 0)})
+        self.assertEqual(self.engagement('hour'), {(1, datetime(2025, 5, 12)): (6, 0)})
+
+    def test_endpoint_serves_refreshed_ranking(self):
+        quiet, busy = self.create_post(title='冷门文章'), self.create_post(title='热门文章')
+        with blog_app.app.app_context():
+            blog_app._bump_engagement({quiet: (1, 0), busy: (5, 2)})
+            blog_app.db.session.commit()
+        blog_app._refresh_trending()
+        with blog_app.app.app_context():
+            version = blog_app._content_versions(['trending'])['trending'][0]
+
+        response = self.client.get('/api/posts/trending?window=24h')
+        self.assertEqual([item['id'] for item in response.get_json()['data']], [busy, quiet])
+        self.assertEqual(self.client.get('/api/posts/trending?window=30d').status_code, 400)
+
+        # 排名不变时不提升版本，客户端的 ETag 继续有效
+        blog_app._refresh_trending()
+        with blog_app.app.app_context():
+            self.assertEqual(blog_app._content_versions(['trending'])['trending'][0], version)
+        revalidated = self.client.get('/api/posts/trending?window=24h',
+                                      headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_refresh_skips_while_another_worker_holds_the_lease(self):
+        post_id = self.create_post()
+        with blog_app.app.app_context():
+            blog_app.db.session.add(blog_app.JobLease(name='trending', owner='other-host:1',
+                                                      expires_at=datetime.now() + timedelta(days=1)))
+            blog_app._bump_engagement({post_id: (3, 0)})
+            blog_app.db.session.commit()
+        blog_app._refresh_trending()
+
+        with blog_app.app.app_context():
+            self.assertEqual(blog_app.PostTrending.query.count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
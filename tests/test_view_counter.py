@@ -0,0 +1,71 @@
+import unittest
+from unittest import mock
+
+from sqlalchemy.exc import OperationalError
+
+from backend import app as blog_app
+from tests.db_case import TempDatabaseTestCase
+
+
+class ViewCounterBufferTest(unittest.TestCase):
+    def test_views_are_aggregated_per_post(self):
+        buffer = blog_app.ViewCounterBuffer(interval=3600, threshold=10 ** 9)
+        for post_id in (1, 2, 1, 1):
+            buffer.add(post_id)
+        buffer.add(2, 3)
+
+        self.assertEqual(buffer.pending(), {1: 3, 2: 4})
+
+    def test_new_posts_beyond_cap_are_dropped_and_counted(self):
+        buffer = blog_app.ViewCounterBuffer(interval=3600, threshold=10 ** 9, max_posts=2)
+        self.assertTrue(buffer.add(1))
+        self.assertTrue(buffer.add(2))
+        self.assertFalse(buffer.add(3, 4))
+        self.assertTrue(buffer.add(1, 2))
+
+        self.assertEqual(buffer.pending(), {1: 3, 2: 1})
+        stats = buffer.stats()
+        self.assertEqual((stats['dropped_views'], stats['pending_posts'], stats['pending_views']), (4, 2, 4))
+
+
+class ViewCounterFlushTest(TempDatabaseTestCase):
+    def test_failed_flush_requeues_increments(self):
+        buffer = blog_app.ViewCounterBuffer(interval=3600, threshold=10 ** 9)
+        buffer.add(1, 2, reader='reader-a')
+        failure = OperationalError('UPDATE posts', {}, Exception('database is locked'))
+        with mock.patch.object(blog_app.db.session, 'execute', side_effect=failure):
+            self.assertEqual(buffer.flush(), 0)
+        buffer.add(1)
+
+        self.assertEqual(buffer.pending(), {1: 3})
+        self.assertEqual(buffer.stats()['failed_flushes'], 1)
+        self.assertIn(1, buffer._sketches)
+
+    def test_flush_writes_views_without_bumping_content_version(self):
+        post_id = self.create_post()
+        with blog_app.app.app_context():
+            before = blog_app._content_versions(['post_stats'])['post_stats'][0]
+        buffer = blog_app.ViewCounterBuffer(interval=3600, threshold=10 ** 9)
+        buffer.add(post_id, 3)
+
+        self.assertEqual(buffer.flush(), 3)
+        with blog_app.app.app_context():
+            self.assertEqual(blog_app.db.session.get(blog_app.Post, post_id).views, 3)
+            self.assertEqual(blog_app._content_versions(['post_stats'])['post_stats'][0], before)
+
+
+    def test_flushes_from_two_buffers_merge_reader_sketches(self):
+        post_id = self.create_post()
+        for readers in (range(0, 50), range(25, 75)):
+            buffer = blog_app.ViewCounterBuffer(interval=3600, threshold=10 ** 9)
+            for i in readers:
+                buffer.add(post_id, reader=f'reader-{i}')
+            buffer.flush()
+
+        with blog_app.app.app_context():
+            self.assertAlmostEqual(blog_app._load_unique_readers([post_id])[post_id], 75, delta=3)
+            self.assertEqual(blog_app.db.session.get(blog_app.Post, post_id).views, 100)
+
+
+if __name__ == "__main__":
+    unittest.main()